@@ -0,0 +1,158 @@
+"""
+Benchmark of diff_yaml and release_series on large synthetic reports.
+
+Two plain reports are generated from a seed, the second with a fraction of the edge groups and predicates changed,
+and diff_yaml is timed on them with and without show_all. release_series is timed on a number of releases, each
+changed from the one before. Run from the root of the repository with
+
+    python benchmarks/diff_benchmark.py --groups 2000 --predicates 50
+"""
+
+import argparse
+import copy
+import json
+import random
+import time
+from typing import Dict, List
+
+from monarch_qc_reports.qc_diff_utils import diff_yaml, release_series
+
+
+def names(prefix: str, count: int) -> List[str]:
+    """Create count names starting with prefix."""
+    return [f"{prefix}{i}" for i in range(count)]
+
+
+def make_report(groups: int, predicates: int, namespaces: int, seed: int = 0) -> Dict:
+    """
+    Create a plain report with the sections and entries of a qc report.
+
+    Params:
+        groups (int): number of node and edge groups
+        predicates (int): number of predicates of each edge group
+        namespaces (int): number of namespaces to draw from
+        seed (int, optional): seed of the random values. Defaults to 0.
+
+    Returns
+    -------
+        Dict of the report, as `read_report` returns it
+    """
+    rng = random.Random(seed)  # noqa: S311, not for security
+    all_namespaces = names("NS", namespaces)
+
+    def sample(count: int) -> List[str]:
+        return sorted(rng.sample(all_namespaces, min(count, namespaces)))
+
+    nodes = {}
+    for name in names("nodes_", groups):
+        nodes[name] = {
+            "name": name,
+            "namespaces": sample(3),
+            "categories": ["biolink:Gene"],
+            "total_number": rng.randrange(1, 10**6),
+            "taxon": ["NCBITaxon:9606"],
+        }
+    edges = {}
+    for name in names("edges_", groups):
+        edges[name] = {
+            "name": name,
+            "namespaces": sample(5),
+            "categories": ["biolink:Association"],
+            "total_number": rng.randrange(1, 10**7),
+            "missing_old": rng.randrange(100),
+            "missing": rng.randrange(100),
+            "predicates": {
+                predicate: {
+                    "uri": predicate,
+                    "total_number": rng.randrange(1, 10**5),
+                    "missing_subjects": rng.randrange(10),
+                    "missing_objects": rng.randrange(10),
+                    "missing_subject_namespaces": sample(rng.randrange(3)),
+                    "missing_object_namespaces": sample(rng.randrange(3)),
+                }
+                for predicate in names("biolink:predicate_", predicates)
+            },
+            "node_types": {
+                node_type: {
+                    "name": node_type,
+                    "namespaces": sample(2),
+                    "categories": ["biolink:Gene"],
+                    "total_number": rng.randrange(1, 10**6),
+                    "missing": 0,
+                    "missing_objects": 0,
+                    "missing_subjects": 0,
+                    "taxon": ["NCBITaxon:9606"],
+                }
+                for node_type in rng.sample(list(nodes), min(5, groups))
+            },
+            "missing_subject_namespaces": sample(2),
+            "missing_object_namespaces": sample(2),
+        }
+    return {"nodes": nodes, "duplicate_nodes": {}, "edges": edges, "dangling_edges": {}, "duplicate_edges": {}}
+
+
+def change_report(report: Dict, fraction: float, seed: int = 1) -> Dict:
+    """
+    Copy a report made by `make_report` with a fraction of its edge groups changed, added or removed.
+
+    Params:
+        report (Dict): report to change
+        fraction (float): fraction of the edge groups to change
+        seed (int, optional): seed of the changes. Defaults to 1.
+
+    Returns
+    -------
+        Dict of the changed report
+    """
+    rng = random.Random(seed)  # noqa: S311, not for security
+    changed = copy.deepcopy(report)
+    edges = changed["edges"]
+    for name in rng.sample(list(edges), int(len(edges) * fraction)):
+        change = rng.randrange(4)
+        if change == 0:
+            del edges[name]
+        elif change == 1:
+            edges[name + "_new"] = copy.deepcopy(edges[name])
+            edges[name + "_new"]["name"] = name + "_new"
+        else:
+            predicate = rng.choice(list(edges[name]["predicates"]))
+            edges[name]["predicates"][predicate]["total_number"] += 1
+            edges[name]["namespaces"] = edges[name]["namespaces"] + ["NS_new"]
+    return changed
+
+
+def main():
+    """Time diff_yaml on synthetic reports."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", type=int, default=2000)
+    parser.add_argument("--predicates", type=int, default=50)
+    parser.add_argument("--namespaces", type=int, default=200)
+    parser.add_argument("--changed", type=float, default=0.01, help="Fraction of edge groups changed.")
+    parser.add_argument("--releases", type=int, default=5, help="Number of releases for release_series.")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    a_report = make_report(args.groups, args.predicates, args.namespaces)
+    # share no objects between the reports, like reports read from two files
+    b_report = json.loads(json.dumps(change_report(a_report, args.changed)))
+    for show_all in (False, True):
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            diff_yaml(a_report, b_report, show_all)
+            times.append(time.perf_counter() - start)
+        print(f"diff_yaml show_all={show_all}: {min(times):.3f}s (best of {args.repeat})")
+
+    reports = {"release_0": a_report}
+    for release in range(1, args.releases):
+        reports[f"release_{release}"] = change_report(reports[f"release_{release - 1}"], args.changed, seed=release)
+    times = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        release_series(reports)
+        times.append(time.perf_counter() - start)
+    print(f"release_series of {args.releases} releases: {min(times):.3f}s (best of {args.repeat})")
+
+
+if __name__ == "__main__":
+    main()
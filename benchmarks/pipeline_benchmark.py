@@ -0,0 +1,117 @@
+"""
+Benchmark of the report pipeline on synthetic knowledge graphs at several scales.
+
+For each scale a knowledge graph and its merge qc files are generated from a seed and written in the tar.gz or
+directory layout, then read_kg, read_qc, create_qc_report, the YAML dump of the report and diff_yaml against the
+report of a changed graph are run in turn, each reporting its wall time and peak resident memory. Run from the root
+of the repository with
+
+    python benchmarks/pipeline_benchmark.py --scales small medium --layout tar
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+from typing import Callable, Dict, List
+
+from monarch_qc_reports.file_utils import read_kg, read_qc
+from monarch_qc_reports.model.merged_kg import MergedKG
+from monarch_qc_reports.profiling import Measurement
+from monarch_qc_reports.qc_diff_utils import diff_yaml
+from monarch_qc_reports.qc_utils import create_qc_report
+from monarch_qc_reports.report_io import dump_report, plain_report
+from monarch_qc_reports.synthetic_kg import KG_LAYOUTS, make_kg, write_kg
+
+SCALES = {
+    "tiny": {"nodes": 1000, "edges": 10000},
+    "small": {"nodes": 10000, "edges": 100000},
+    "medium": {"nodes": 50000, "edges": 500000},
+    "large": {"nodes": 200000, "edges": 2000000},
+}
+MB = 1024**2
+
+
+def change_kg(kg: MergedKG, fraction: float) -> MergedKG:
+    """Copy a knowledge graph with the predicate of a fraction of its edges changed."""
+    edges = kg.edges.copy()
+    changed = edges.sample(frac=fraction, random_state=1).index
+    edges.loc[changed, "predicate"] = "biolink:changed_predicate"
+    return MergedKG(kg.nodes, edges)
+
+
+def measure(stage: str, results: List[Dict], function: Callable, *args, **kwargs):
+    """Run a stage of the pipeline, record its time and peak memory in results and return its result."""
+    with Measurement() as measurement:
+        # read_kg and read_qc print the files they read
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = function(*args, **kwargs)
+    results.append(
+        {
+            "stage": stage,
+            "seconds": round(measurement.seconds, 3),
+            "peak_mb": None if measurement.peak_memory is None else round(measurement.peak_memory / MB, 1),
+            "increase_mb": None if measurement.memory_increase is None else round(measurement.memory_increase / MB, 1),
+        }
+    )
+    return result
+
+
+def run_scale(scale: str, layout: str, engine: str, changed: float, seed: int) -> List[Dict]:
+    """
+    Generate, write and run the pipeline on the knowledge graph of a scale.
+
+    Params:
+        scale (str): name of the scale in SCALES
+        layout (str): layout to write the knowledge graph in, see `write_kg`
+        engine (str): parser engine of read_kg and read_qc
+        changed (float): fraction of edges changed in the graph diffed against
+        seed (int): seed of the generated graph
+
+    Returns
+    -------
+        List of the results of each stage
+    """
+    results = []
+    generated_kg, generated_qc = measure("generate", results, make_kg, **SCALES[scale], seed=seed)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        kg_path, qc_dir = measure("write", results, write_kg, generated_kg, generated_qc, tmp_dir, layout=layout)
+        del generated_kg, generated_qc
+        kg = measure("read_kg", results, read_kg, kg_path, engine=engine)
+        qc = measure("read_qc", results, read_qc, qc_dir, engine=engine)
+        report = measure("create_qc_report", results, create_qc_report, kg, qc)
+        measure("yaml_dump", results, dump_report, report, os.path.join(tmp_dir, "qc_report.yaml"), "yaml")
+    changed_report = plain_report(create_qc_report(change_kg(kg, changed), qc))
+    measure("diff_yaml", results, diff_yaml, plain_report(report), changed_report, False)
+    return results
+
+
+def main():
+    """Time the report pipeline on synthetic knowledge graphs."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=["tiny", "small", "medium"])
+    parser.add_argument("--layout", choices=KG_LAYOUTS, default="tar")
+    parser.add_argument("--engine", choices=["c", "pyarrow"], default="c")
+    parser.add_argument("--changed", type=float, default=0.01, help="Fraction of edges changed for diff_yaml.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    all_results = {}
+    for scale in args.scales:
+        all_results[scale] = run_scale(scale, args.layout, args.engine, args.changed, args.seed)
+        print(f"{scale}: {SCALES[scale]['nodes']} nodes, {SCALES[scale]['edges']} edges, {args.layout} layout")
+        print(f"  {'stage':<18}{'seconds':>9}{'peak MB':>10}{'+MB':>9}")
+        for result in all_results[scale]:
+            peak = "" if result["peak_mb"] is None else result["peak_mb"]
+            increase = "" if result["increase_mb"] is None else result["increase_mb"]
+            print(f"  {result['stage']:<18}{result['seconds']:>9}{peak:>10}{increase:>9}")
+    if args.json:
+        with open(args.json, "w") as json_file:
+            json.dump({"layout": args.layout, "engine": args.engine, "scales": all_results}, json_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,24 @@
 """Command line interface for Monarch_QC_Reports."""
+import contextlib
+import importlib.util
+import json
 import logging
 import os
+from typing import List
 
 import click
-import requests
-import yaml
 
-from monarch_qc_reports import __version__
-from monarch_qc_reports.file_utils import read_kg, read_qc
+from monarch_qc_reports import __version__, profiling
+from monarch_qc_reports.download_utils import FAILED, download_files, make_session, open_stream
+from monarch_qc_reports.file_utils import ENGINES, read_kg, read_qc
 from monarch_qc_reports.main import demo
-from monarch_qc_reports.qc_utils import create_qc_report
+from monarch_qc_reports.profiling import Profiler, profile_path
+from monarch_qc_reports.qc_diff_utils import release_series
+from monarch_qc_reports.qc_incremental import create_incremental_qc_report, fingerprints_path, load_report
+from monarch_qc_reports.qc_parallel import create_parallel_qc_report
+from monarch_qc_reports.qc_utils import create_chunked_qc_report, create_qc_report
+from monarch_qc_reports.report_cache import REPORT_CACHE_DIR, ReportCache
+from monarch_qc_reports.report_io import REPORT_FORMATS, dump_report, read_report, report_path
 
 __all__ = [
     "main",
@@ -18,11 +27,13 @@ __all__ = [
 logger = logging.getLogger(__name__)
 
 BASE_URL = "https://data.monarchinitiative.org/monarch-kg-dev/"
+DANGLING_EDGES_FILE = "qc/monarch-kg-dangling-edges.tsv.gz"
+DUPLICATE_NODES_FILE = "qc/monarch-kg-duplicate-nodes.tsv.gz"
 FILES = [
     "monarch-kg.tar.gz",
     "qc_report.yaml",
-    "qc/monarch-kg-dangling-edges.tsv.gz",
-    "qc/monarch-kg-duplicate-nodes.tsv.gz",
+    DANGLING_EDGES_FILE,
+    DUPLICATE_NODES_FILE,
 ]
 
 
@@ -47,36 +58,182 @@ def main(verbose: int, quiet: bool):
         logger.setLevel(level=logging.ERROR)
 
 
-def download_file(url, destination):
-    """Download a file from a URL."""
-    response = requests.get(url, stream=True, timeout=10)
-    if response.status_code == 200:
-        with open(destination, "wb") as file:
-            for chunk in response.iter_content(chunk_size=8192):
-                file.write(chunk)
-    else:
-        logger.error(f"Failed to download {url}")
-
-
 @main.command()
 @click.option("-d", "--date", default="2023-06-04", help="Specify the date in the format YYYY-MM-DD or latest.")
-def run(date: str):
+@click.option(
+    "-c", "--chunksize", type=int, default=None, help="Read edges in chunks of this many rows to bound memory use."
+)
+@click.option("-w", "--workers", type=int, default=1, help="Compute the report sections on this many worker processes.")
+@click.option(
+    "-e", "--engine", type=click.Choice(ENGINES), default="c", help="Parser for the TSV files, pyarrow needs pyarrow."
+)
+@click.option(
+    "--cache/--no-cache",
+    default=importlib.util.find_spec("pyarrow") is not None,
+    help="Load the KG and QC tables from the columnar cache next to the downloaded files, needs pyarrow.",
+)
+@click.option("--rebuild-cache", is_flag=True, help="Read the downloaded files and write the cache again.")
+@click.option("--download-workers", type=int, default=4, help="Download this many files at the same time.")
+@click.option(
+    "--stream", is_flag=True, help="Parse the KG and QC files while they download instead of saving them first."
+)
+@click.option(
+    "--report-cache/--no-report-cache",
+    default=True,
+    help=f"Reuse report sections computed from the same data, cached in {REPORT_CACHE_DIR}.",
+)
+@click.option("--clear-report-cache", is_flag=True, help="Remove all cached report sections before running.")
+@click.option(
+    "--previous-report",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Only compute the groups changed since this qc_report.yaml, written by a run with --fingerprints.",
+)
+@click.option(
+    "--fingerprints", is_flag=True, help="Write the fingerprints of the report groups next to it for --previous-report."
+)
+@click.option(
+    "-f",
+    "--format",
+    "report_format",
+    type=click.Choice(list(REPORT_FORMATS)),
+    default="yaml",
+    help="Format of the report written to output/, json and msgpack hold plain data, msgpack needs msgpack.",
+)
+@click.option(
+    "--compact/--no-compact",
+    default=True,
+    help="Hold the node ids and low cardinality columns of the KG as categoricals, which takes less memory.",
+)
+@click.option(
+    "--find-dangling-edges",
+    is_flag=True,
+    help="Find the dangling edges in the KG instead of downloading and reading the merge QC dangling edges file.",
+)
+@click.option(
+    "--find-duplicates",
+    is_flag=True,
+    help="Find the duplicate nodes and edges in the KG instead of reading the merge QC duplicate nodes file, which has "
+    "no duplicate edges. As in that file, every row of an id that is not unique is a duplicate.",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Print the time, rows and peak memory of each stage and write them next to the report as .profile.json.",
+)
+@click.option(
+    "--profile-stage",
+    default=None,
+    help="Run the stages with this name or path, such as create_qc_report/edges, under cProfile, implies --profile.",
+)
+@click.option(
+    "--trace-malloc", is_flag=True, help="Also measure Python allocations with tracemalloc, slower, implies --profile."
+)
+def run(
+    date: str,
+    chunksize: int,
+    workers: int,
+    engine: str,
+    cache: bool,
+    rebuild_cache: bool,
+    download_workers: int,
+    stream: bool,
+    report_cache: bool,
+    clear_report_cache: bool,
+    previous_report: str,
+    fingerprints: bool,
+    report_format: str,
+    compact: bool,
+    find_dangling_edges: bool,
+    find_duplicates: bool,
+    profile: bool,
+    profile_stage: str,
+    trace_malloc: bool,
+):
     """Run Monarch_QC_Reports from the command line."""
+    if (previous_report is not None or fingerprints) and report_format != "yaml":
+        raise click.BadParameter(
+            "--previous-report and --fingerprints need the yaml format, which is loaded again as the previous report.",
+            param_hint="--format",
+        )
+    if (previous_report is not None or fingerprints) and (chunksize is not None or workers > 1):
+        raise click.BadParameter(
+            "--previous-report and --fingerprints cannot be combined with --chunksize or --workers.",
+            param_hint="--previous-report",
+        )
+    if stream and chunksize is not None:
+        raise click.BadParameter("--chunksize cannot be combined with --stream.", param_hint="--chunksize")
+    if stream and rebuild_cache:
+        raise click.BadParameter("--rebuild-cache cannot be combined with --stream.", param_hint="--rebuild-cache")
+    if chunksize is not None and workers > 1:
+        raise click.BadParameter("--workers cannot be combined with --chunksize.", param_hint="--workers")
+    if chunksize is not None and engine != "c":
+        raise click.BadParameter("--chunksize is only supported by the c engine.", param_hint="--engine")
     demo()
 
-    kg_path = fetch_kg_data(date)
+    if clear_report_cache:
+        ReportCache().clear()
+
+    profiler = Profiler(trace_malloc, profile_stage) if profile or profile_stage or trace_malloc else None
+    with profiler or contextlib.nullcontext():
+        if stream:
+            create_kg_qc_report(
+                BASE_URL + date,
+                workers=workers,
+                engine=engine,
+                stream=True,
+                report_cache=report_cache,
+                previous_report=previous_report,
+                fingerprints=fingerprints,
+                report_format=report_format,
+                compact=compact,
+                find_dangling_edges=find_dangling_edges,
+                find_duplicates=find_duplicates,
+            )
+        else:
+            with profiling.stage("fetch_kg_data"):
+                kg_path = fetch_kg_data(date, download_workers, qc_files(find_dangling_edges, find_duplicates))
+
+            # kg_path = os.path.join("kg_data", date)
+            create_kg_qc_report(
+                kg_path,
+                chunksize,
+                workers,
+                engine,
+                cache or rebuild_cache,
+                rebuild_cache,
+                report_cache=report_cache,
+                previous_report=previous_report,
+                fingerprints=fingerprints,
+                report_format=report_format,
+                compact=compact,
+                find_dangling_edges=find_dangling_edges,
+                find_duplicates=find_duplicates,
+            )
+    if profiler is not None:
+        profiler.write(profile_path("output/qc_report.yaml"))
+        click.echo(profiler.summary())
 
-    # kg_path = os.path.join("kg_data", date)
-    create_kg_qc_report(kg_path)
 
+def qc_files(find_dangling_edges: bool = False, find_duplicates: bool = False) -> List[str]:
+    """Get the FILES to download, without the merge qc files of the tables found in the KG instead."""
+    skipped = {DANGLING_EDGES_FILE: find_dangling_edges, DUPLICATE_NODES_FILE: find_duplicates}
+    return [file for file in FILES if not skipped.get(file, False)]
 
-def fetch_kg_data(date: str) -> str:
-    """Fetch the knowledge graph data for a given date."""
+
+def fetch_kg_data(date: str, workers: int = 4, files: List[str] = None) -> str:
+    """
+    Fetch the knowledge graph data for a given date.
+
+    The files, FILES unless given, are downloaded concurrently, files that are unchanged on the server are not
+    downloaded again and interrupted downloads are resumed, see `download_file`.
+    """
     date_directory = os.path.join("kg_data", date)
     qc_directory = os.path.join(date_directory, "qc")
     os.makedirs(qc_directory, exist_ok=True)
 
-    for file in FILES:
+    downloads = {}
+    for file in FILES if files is None else files:
         url = BASE_URL + date + "/" + file
         filename = os.path.basename(file)
 
@@ -86,20 +243,123 @@ def fetch_kg_data(date: str) -> str:
             destination = os.path.join(date_directory, filename)
 
         logger.info(f"Downloading {filename} from {url}")
-        download_file(url, destination)
-        logger.info(f"{filename} downloaded successfully")
+        downloads[url] = destination
+
+    for url, result in download_files(downloads, workers=workers).items():
+        if result != FAILED:
+            logger.info(f"{os.path.basename(url)} {result}")
 
     return date_directory
 
 
-def create_kg_qc_report(path: str):
-    """Create a QC report for a knowledge graph."""
-    kg = read_kg(path + "/monarch-kg.tar.gz")
-    qc = read_qc(path + "/qc")
-    qc_report = create_qc_report(kg, qc)
+def create_kg_qc_report(
+    path: str,
+    chunksize: int = None,
+    workers: int = 1,
+    engine: str = "c",
+    cache: bool = False,
+    rebuild_cache: bool = False,
+    stream: bool = False,
+    report_cache: bool = False,
+    previous_report: str = None,
+    fingerprints: bool = False,
+    report_format: str = "yaml",
+    compact: bool = False,
+    find_dangling_edges: bool = False,
+    find_duplicates: bool = False,
+):
+    """
+    Create a QC report for a knowledge graph.
+
+    The edges are streamed in chunks if chunksize is given, and the report sections are computed on a pool of worker
+    processes if workers is more than one. The files are parsed with the given engine, see `read_df`, or loaded from
+    the columnar cache next to them if cache is set. If stream is set, path is the url of the release and the files
+    are parsed as they download, without writing them to disk. If report_cache is set, sections computed before from
+    the same data are read from the report cache, see `ReportCache`, which is only used by the serial report.
+    If previous_report is given, only the groups changed since that report are computed, see
+    `create_incremental_qc_report`, and the fingerprints of the groups are written next to the report with it or if
+    fingerprints is set. If compact is set, the KG is held compactly, see `MergedKG.compact`. If find_dangling_edges
+    or find_duplicates is set, the dangling edges or the duplicate nodes and edges files are not read and the tables
+    are found in the KG, see `MergeQC.complete`. The report is written to output/ in report_format, see
+    `dump_report`. Each of these steps is a stage of the active profiler, see `Profiler`.
+    """
+    if stream:
+        session = make_session()
+        with profiling.stage("read_kg"):
+            kg = read_kg(open_stream(path + "/monarch-kg.tar.gz", session), engine=engine, compact=compact)
+        qc_streams = {
+            os.path.basename(file): open_stream(path + "/" + file, session, decompress=True)
+            for file in qc_files(find_dangling_edges, find_duplicates)
+            if file.startswith("qc/")
+        }
+        with profiling.stage("read_qc"):
+            qc = read_qc(
+                qc_streams, engine=engine, dangling_edges=not find_dangling_edges, duplicates=not find_duplicates
+            )
+    else:
+        with profiling.stage("read_kg"):
+            kg = read_kg(
+                path + "/monarch-kg.tar.gz",
+                chunksize=chunksize,
+                engine=engine,
+                cache=cache,
+                rebuild_cache=rebuild_cache,
+                compact=compact,
+            )
+        with profiling.stage("read_qc"):
+            qc = read_qc(
+                path + "/qc",
+                chunksize=chunksize,
+                engine=engine,
+                cache=cache,
+                rebuild_cache=rebuild_cache,
+                dangling_edges=not find_dangling_edges,
+                duplicates=not find_duplicates,
+            )
+    report_fingerprints = None
+    with profiling.stage("create_qc_report"):
+        if previous_report is not None or fingerprints:
+            previous_report, previous_fingerprints = load_report(previous_report) if previous_report else (None, None)
+            qc_report, report_fingerprints = create_incremental_qc_report(
+                kg, qc, previous_report, previous_fingerprints
+            )
+        elif chunksize is not None:
+            qc_report = create_chunked_qc_report(kg, qc)
+        elif workers > 1:
+            qc_report = create_parallel_qc_report(kg, qc, workers=workers)
+        else:
+            qc_report = create_qc_report(kg, qc, cache=ReportCache() if report_cache else None)
     os.makedirs("output", exist_ok=True)
-    with open("output/qc_report.yaml", "w") as report_file:
-        yaml.dump(qc_report, report_file)
+    with profiling.stage("dump_report"):
+        dump_report(qc_report, report_path("output/qc_report.yaml", report_format), report_format)
+    if report_fingerprints is not None:
+        with open(fingerprints_path("output/qc_report.yaml"), "w") as fingerprints_file:
+            json.dump(report_fingerprints, fingerprints_file)
+
+
+@main.command()
+@click.argument("reports", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option("-o", "--output", default="output/qc_series.yaml", help="Path to write the series to.")
+@click.option(
+    "-f",
+    "--format",
+    "report_format",
+    type=click.Choice(list(REPORT_FORMATS)),
+    default="yaml",
+    help="Format of the series, which replaces the extension of the output path.",
+)
+def series(reports: tuple, output: str, report_format: str):
+    """
+    Collect the counts of the qc reports of several releases into one time series per metric.
+
+    REPORTS are qc reports in any format written by run, or published qc_report.yaml files, in release order. Each
+    is read once, and every count of an entry, such as the total_number of a predicate of a provided_by, becomes a
+    series with one value per report, see `release_series`.
+    """
+    release_reports = {path: read_report(path) for path in reports}
+    output = report_path(output, report_format)
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    dump_report(release_series(release_reports), output, report_format)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,356 @@
+"""Module for downloading knowledge graph release files."""
+
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1 << 16
+TIMEOUT = (10, 60)
+RETRY_STATUS = [429, 500, 502, 503, 504]
+# Hidden directory next to the downloaded files holding partial downloads and the manifest of their validators
+DOWNLOAD_DIR = ".download"
+MANIFEST_LOCK = threading.Lock()
+
+# Download results
+DOWNLOADED = "downloaded"
+RESUMED = "resumed"
+NOT_MODIFIED = "not modified"
+FAILED = "failed"
+
+
+def make_session(pool_size: int = 8, retries: int = 3, backoff_factor: float = 0.5) -> requests.Session:
+    """
+    Create a session with a pool of reusable connections that retries failed requests with backoff.
+
+    Params:
+        pool_size (int, optional): number of connections kept open per host. Defaults to 8.
+        retries (int, optional): number of retries of a request. Defaults to 3.
+        backoff_factor (float, optional): base of the exponential backoff between retries, in seconds.
+            Defaults to 0.5.
+
+    Returns
+    -------
+        requests.Session
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=["GET", "HEAD"],
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def file_sha256(path: str) -> str:
+    """
+    Get the sha256 checksum of a file.
+
+    Params:
+        path (str): path to the file
+
+    Returns
+    -------
+        hex digest of the file
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        while block := fh.read(CHUNK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def download_path(destination: str, name: str) -> str:
+    """
+    Get the path of a file in the hidden download directory next to a downloaded file.
+
+    Params:
+        destination (str): path to the downloaded file
+        name (str): name of the file in the download directory
+
+    Returns
+    -------
+        path of the file
+    """
+    return os.path.join(os.path.dirname(destination), DOWNLOAD_DIR, name)
+
+
+def partial_path(destination: str) -> str:
+    """
+    Get the path the data of a file is written to until its download is complete.
+
+    Params:
+        destination (str): path to the downloaded file
+
+    Returns
+    -------
+        path of the partial file
+    """
+    return download_path(destination, os.path.basename(destination) + ".part")
+
+
+def read_manifest(destination: str) -> Dict:
+    """
+    Read the manifest of the validators saved with the files downloaded to the directory of a file.
+
+    Params:
+        destination (str): path to a downloaded file
+
+    Returns
+    -------
+        Dict of the saved headers of each file name, empty if there are none
+    """
+    try:
+        with open(download_path(destination, "manifest.json")) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def read_validators(destination: str, partial: bool = False) -> Dict:
+    """
+    Read the ETag and Last-Modified headers saved with a downloaded file.
+
+    Params:
+        destination (str): path to the downloaded file
+        partial (bool, optional): read the headers of the partial download of the file. Defaults to False.
+
+    Returns
+    -------
+        Dict of saved headers, empty if there are none
+    """
+    name = os.path.basename(partial_path(destination) if partial else destination)
+    return read_manifest(destination).get(name, {})
+
+
+def update_validators(destination: str, validators: Dict[str, Optional[Dict]]):
+    """
+    Save or remove the headers of files in the manifest of the directory of a downloaded file.
+
+    The manifest is shared by the files of a directory that are downloaded concurrently, so it is updated under a
+    lock and replaced in one step.
+
+    Params:
+        destination (str): path to a downloaded file
+        validators (Dict[str, Optional[Dict]]): headers of each file name, None to remove the headers of a file
+    """
+    path = download_path(destination, "manifest.json")
+    with MANIFEST_LOCK:
+        manifest = read_manifest(destination)
+        for name, headers in validators.items():
+            if headers is None:
+                manifest.pop(name, None)
+            else:
+                manifest[name] = headers
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "w") as fh:
+            json.dump(manifest, fh, indent=2, sort_keys=True)
+        os.replace(path + ".tmp", path)
+
+
+def write_validators(destination: str, response: requests.Response):
+    """
+    Save the ETag and Last-Modified headers of a response as those of the partial download of a file.
+
+    Params:
+        destination (str): path to the downloaded file
+        response (requests.Response): response the file is downloaded from
+    """
+    validators = {
+        header: response.headers[header] for header in ["ETag", "Last-Modified"] if header in response.headers
+    }
+    update_validators(destination, {os.path.basename(partial_path(destination)): validators})
+
+
+def download_file(
+    url: str,
+    destination: str,
+    session: Optional[requests.Session] = None,
+    sha256: Optional[str] = None,
+    attempts: int = 3,
+    backoff_factor: float = 0.5,
+) -> str:
+    """
+    Download a file, skipping it if the copy on disk is current and resuming a partial download.
+
+    A file on disk is kept if it matches the given checksum, or if the server answers 304 Not Modified to a request
+    with the ETag and Last-Modified headers saved from the last download. Data is written to a partial file in the
+    hidden DOWNLOAD_DIR next to the destination and moved into place once complete, a partial file left by an
+    interrupted download is resumed with a Range request that only applies if the file on the server is unchanged.
+    The headers are saved in the manifest of DOWNLOAD_DIR, so the directory of the destination only ever holds
+    complete files. Interrupted transfers are retried with exponential backoff.
+
+    Params:
+        url (str): url of the file
+        destination (str): path to write the file to
+        session (requests.Session, optional): session to download with. Defaults to a new session.
+        sha256 (str, optional): expected checksum of the file
+        attempts (int, optional): number of attempts at the transfer. Defaults to 3.
+        backoff_factor (float, optional): base of the exponential backoff between attempts, in seconds.
+            Defaults to 0.5.
+
+    Returns
+    -------
+        DOWNLOADED, RESUMED, NOT_MODIFIED or FAILED
+    """
+    session = session or make_session()
+    if sha256 is not None and os.path.exists(destination) and file_sha256(destination) == sha256:
+        return NOT_MODIFIED
+    validators = read_validators(destination) if os.path.exists(destination) and sha256 is None else {}
+    partial = partial_path(destination)
+    os.makedirs(os.path.dirname(partial), exist_ok=True)
+    result = DOWNLOADED
+    for attempt in range(attempts):
+        if attempt > 0:
+            time.sleep(backoff_factor * 2 ** (attempt - 1))
+        headers = {}
+        if "ETag" in validators:
+            headers["If-None-Match"] = validators["ETag"]
+        if "Last-Modified" in validators:
+            headers["If-Modified-Since"] = validators["Last-Modified"]
+        offset = os.path.getsize(partial) if os.path.exists(partial) else 0
+        partial_validators = read_validators(destination, partial=True)
+        if offset > 0 and partial_validators:
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = partial_validators.get("ETag", partial_validators.get("Last-Modified"))
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=TIMEOUT) as response:
+                if response.status_code == 304:
+                    return NOT_MODIFIED
+                if response.status_code == 416:
+                    os.remove(partial)
+                    continue
+                if response.status_code not in (200, 206):
+                    logger.error(f"Failed to download {url}: HTTP {response.status_code}")
+                    return FAILED
+                if response.status_code == 206:
+                    result = RESUMED
+                write_validators(destination, response)
+                with open(partial, "ab" if response.status_code == 206 else "wb") as file:
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        file.write(chunk)
+        except requests.RequestException as error:
+            logger.warning(f"Download of {url} interrupted: {error}")
+            continue
+        if sha256 is not None and file_sha256(partial) != sha256:
+            logger.error(f"Checksum of {url} does not match")
+            os.remove(partial)
+            update_validators(destination, {os.path.basename(partial): None})
+            return FAILED
+        os.replace(partial, destination)
+        name = os.path.basename(destination)
+        update_validators(destination, {name: read_validators(destination, partial=True), name + ".part": None})
+        return result
+    logger.error(f"Failed to download {url} after {attempts} attempts")
+    return FAILED
+
+
+def download_files(
+    downloads: Dict[str, str],
+    workers: int = 4,
+    session: Optional[requests.Session] = None,
+    checksums: Optional[Dict[str, str]] = None,
+) -> Dict[str, str]:
+    """
+    Download files concurrently over one pool of connections.
+
+    Params:
+        downloads (Dict[str, str]): destination path for each url
+        workers (int, optional): number of concurrent transfers. Defaults to 4.
+        session (requests.Session, optional): session to download with. Defaults to a new session with a
+            connection pool of the size of workers.
+        checksums (Dict[str, str], optional): expected sha256 checksum for urls that have one
+
+    Returns
+    -------
+        Dict of the result of `download_file` for each url
+    """
+    session = session or make_session(pool_size=workers)
+    checksums = checksums or {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            url: pool.submit(download_file, url, destination, session, checksums.get(url))
+            for url, destination in downloads.items()
+        }
+        return {url: future.result() for url, future in futures.items()}
+
+
+class URLStream(io.RawIOBase):
+
+    """
+    Unseekable stream of the body of a url, for parsing a file while it downloads.
+
+    The request is only sent when the stream is first read, so streams can be opened ahead of time without holding
+    idle connections. The body is read once and not written to disk, so an interrupted transfer cannot be resumed.
+
+    Params:
+        url (str): url of the file
+        session (requests.Session, optional): session to download with. Defaults to a new session.
+        decompress (bool, optional): decompress a gzip file. Defaults to False.
+    """
+
+    def __init__(self, url: str, session: Optional[requests.Session] = None, decompress: bool = False):
+        """Initialize URLStream object."""
+        self.url = url
+        self.session = session
+        self.decompress = decompress
+        self.response = None
+        self.fh = None
+
+    def readable(self) -> bool:
+        """Return True, the body can be read."""
+        return True
+
+    def seekable(self) -> bool:
+        """Return False, the body can only be read once from start to end."""
+        return False
+
+    def readinto(self, buffer) -> int:
+        """Read the next bytes of the body into buffer, sending the request first if needed."""
+        if self.fh is None:
+            self.response = (self.session or make_session()).get(self.url, stream=True, timeout=TIMEOUT)
+            self.response.raise_for_status()
+            self.response.raw.decode_content = True
+            self.fh = gzip.GzipFile(fileobj=self.response.raw) if self.decompress else self.response.raw
+        data = self.fh.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def close(self):
+        """Close the connection."""
+        if self.response is not None:
+            self.response.close()
+        super().close()
+
+
+def open_stream(url: str, session: Optional[requests.Session] = None, decompress: bool = False) -> IO[bytes]:
+    """
+    Open a url for reading while it downloads, see `URLStream`.
+
+    Params:
+        url (str): url of the file
+        session (requests.Session, optional): session to download with. Defaults to a new session.
+        decompress (bool, optional): decompress a gzip file. Defaults to False.
+
+    Returns
+    -------
+        Buffered unseekable stream of the body
+    """
+    return io.BufferedReader(URLStream(url, session, decompress), buffer_size=1 << 20)
@@ -1,14 +1,152 @@
 """Utility functions for listing, reading, and writing files."""
 
 import csv
+import io
 import os
+import re
 import tarfile
 from pathlib import Path
-from typing import IO, List, Optional, Union
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
+import numpy as np
 import pandas as pd
 
+from monarch_qc_reports import profiling
 from monarch_qc_reports.model.merged_kg import MergedKG, MergeQC
+from monarch_qc_reports.table_cache import cache_key, read_cache, write_cache, write_ipc
+
+TSV_OPTIONS = {"sep": "\t", "dtype": "string", "lineterminator": "\n", "quoting": csv.QUOTE_NONE, "comment": "#"}
+ENGINES = ["c", "pyarrow"]
+# Columns of the node, edge and qc files used by create_qc_report
+REPORT_COLUMNS = ["id", "category", "in_taxon", "provided_by", "subject", "predicate", "object"]
+# Default na_values of pandas.read_csv, read as missing by the pyarrow engine too
+NA_VALUES = [
+    "",
+    "#N/A",
+    "#N/A N/A",
+    "#NA",
+    "-1.#IND",
+    "-1.#QNAN",
+    "-NaN",
+    "-nan",
+    "1.#IND",
+    "1.#QNAN",
+    "<NA>",
+    "N/A",
+    "NA",
+    "NULL",
+    "NaN",
+    "None",
+    "n/a",
+    "nan",
+    "null",
+]
+# Names of the merge qc files of each table, other files such as download leftovers are not read
+QC_FILE_PATTERNS = {
+    "duplicate_nodes": re.compile(r".*duplicate-nodes\.tsv(\.gz)?"),
+    "dangling_edges": re.compile(r".*dangling-edges\.tsv(\.gz)?"),
+    "duplicate_edges": re.compile(r".*duplicate-edges\.tsv(\.gz)?"),
+}
+
+
+class TableChunks:
+
+    """
+    Table read from a TSV file one chunk at a time.
+
+    The file is opened again each time the chunks are iterated, so only one chunk is held in memory at once. A tar
+    archive is read as a stream up to the member, without building the list of all members first.
+
+    Params:
+        source (Union[str, Tuple[str, str]]): path to the file, or path to a tar archive and name of the member
+        chunksize (int): number of rows per chunk
+        add_source_col (str, optional): Name of column to add to each chunk with the name of the file.
+        source_col_value (str, optional): Value to add to the source column.
+        columns (List[str], optional): Columns to read, columns not in the file are skipped. Defaults to all.
+    """
+
+    def __init__(
+        self,
+        source: Union[str, Tuple[str, str]],
+        chunksize: int,
+        add_source_col: Optional[str] = None,
+        source_col_value: Optional[str] = None,
+        columns: Optional[List[str]] = None,
+    ):
+        """Initialize TableChunks object."""
+        self.source = source
+        self.chunksize = chunksize
+        self.add_source_col = add_source_col
+        self.source_col_value = source_col_value
+        self.columns = columns
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        """Read the table one chunk at a time."""
+        if isinstance(self.source, tuple):
+            tar_path, member_name = self.source
+            with tarfile.open(tar_path, "r|*") as tar:
+                for member in tar:
+                    if member.name == member_name:
+                        yield from read_df_chunks(
+                            stream_member(tar, member),
+                            self.chunksize,
+                            self.add_source_col,
+                            self.source_col_value,
+                            self.columns,
+                        )
+                        return
+        else:
+            yield from read_df_chunks(
+                self.source, self.chunksize, self.add_source_col, self.source_col_value, self.columns
+            )
+
+
+class TarMemberStream(io.RawIOBase):
+
+    """
+    Unseekable stream of a member of a tar archive opened in stream mode.
+
+    The file objects of tarfile in stream mode fail when asked whether they are seekable, so the member is wrapped in
+    a stream that says it is not.
+
+    Params:
+        fh (IO[bytes]): file object of the member
+    """
+
+    def __init__(self, fh: IO[bytes]):
+        """Initialize TarMemberStream object."""
+        self.fh = fh
+
+    def readable(self) -> bool:
+        """Return True, the member can be read."""
+        return True
+
+    def seekable(self) -> bool:
+        """Return False, the member can only be read once from start to end."""
+        return False
+
+    def readinto(self, buffer) -> int:
+        """Read the next bytes of the member into buffer."""
+        with profiling.timed("decompress_seconds"):
+            data = self.fh.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+def stream_member(tar: tarfile.TarFile, member: tarfile.TarInfo) -> IO[bytes]:
+    """
+    Open a member of a tar archive opened in stream mode for reading.
+
+    Args:
+    ----
+    tar (tarfile.TarFile): Tarfile object opened in stream mode.
+    member (tarfile.TarInfo): Member at the current position of the stream.
+
+    Returns:
+    -------
+    IO[bytes]: Buffered unseekable stream of the member.
+    """
+    return io.BufferedReader(TarMemberStream(tar.extractfile(member)), buffer_size=1 << 20)
 
 
 def get_files(filepath: str, nodes_match: str = "_nodes", edges_match: str = "_edges"):
@@ -56,29 +194,47 @@ def read_dfs(files: List[str], add_source_col: Optional[str] = "provided_by") ->
     return dataframes
 
 
-def read_tar_dfs(tar: tarfile.TarFile, type_name, add_source_col: str = "provided_by") -> List[pd.DataFrame]:
+def read_tar_dfs(
+    tar: tarfile.TarFile,
+    type_name,
+    add_source_col: str = "provided_by",
+    engine: str = "c",
+    columns: Optional[List[str]] = None,
+) -> List[pd.DataFrame]:
     """
     Read a tar archive into dataframes.
 
+    The members are read in the order of the archive as it is iterated, so an archive opened in stream mode is read
+    in one pass like `read_tar_stream` reads it.
+
     Args:
     ----
     tar (tarfile.TarFile): Tarfile object.
     type_name (str): String to match for node or edge files.
     add_source_col (str, optional): Name of column to add to each dataframe with the name of the file.
+    engine (str, optional): Parser to use, see `read_df`.
+    columns (List[str], optional): Columns to read, see `read_df`.
 
     Returns:
     -------
     List[pandas.DataFrame]: List of dataframes.
     """
+    # the file object of an archive opened in stream mode cannot seek
+    stream = not hasattr(tar.fileobj, "seekable")
     dataframes = []
-    for member in tar.getmembers():
+    for member in tar:
         if member.isfile() and type_name in member.name:
-            dataframes.append(read_df(tar.extractfile(member), add_source_col, member.name))
+            fh = stream_member(tar, member) if stream else tar.extractfile(member)
+            dataframes.append(read_df(fh, add_source_col, member.name, engine, columns))
     return dataframes
 
 
 def read_df(
-    fh: Union[str, IO[bytes]], add_source_col: Optional[str] = "provided_by", source_col_value: Optional[str] = None
+    fh: Union[str, IO[bytes]],
+    add_source_col: Optional[str] = "provided_by",
+    source_col_value: Optional[str] = None,
+    engine: str = "c",
+    columns: Optional[List[str]] = None,
 ) -> pd.DataFrame:
     """
     Read a file into a dataframe.
@@ -88,17 +244,295 @@ def read_df(
     fh (str, io.TextIOWrapper): File handle.
     add_source_col (str, optional): Name of column to add to the dataframe with the name of the file.
     source_col_value (Any, optional): Value to add to the source column.
+    engine (str, optional): Parser to use, "c" for the pandas C parser or "pyarrow" for the multithreaded pyarrow
+        reader with Arrow-backed string columns.
+    columns (List[str], optional): Columns to read, in the order of the file, columns not in the file are skipped.
+        The other columns are never converted to values. Defaults to all columns.
 
     Returns:
     -------
     pandas.DataFrame: Dataframe.
     """
-    df = pd.read_csv(fh, sep="\t", dtype="string", lineterminator="\n", quoting=csv.QUOTE_NONE, comment="#")
+    if engine not in ENGINES:
+        raise ValueError(f"engine must be one of {ENGINES}, got '{engine}'")
+    name = source_col_value if isinstance(source_col_value, str) else fh if isinstance(fh, str) else "stream"
+    with profiling.stage(f"read_df {os.path.basename(name)}") as read_stage:
+        if engine == "c":
+            df = pd.read_csv(fh, usecols=use_columns(columns), **TSV_OPTIONS)
+        else:
+            df = read_arrow_df(fh, columns)
+        read_stage.add_rows(len(df))
     if add_source_col is not None:
         df[add_source_col] = source_col_value
     return df
 
 
+def use_columns(columns: Optional[List[str]]):
+    """
+    Get the usecols argument of pandas.read_csv that selects columns, skipping columns not in the file.
+
+    Args:
+    ----
+    columns (List[str], optional): Columns to read, or None for all columns.
+
+    Returns:
+    -------
+    Optional[Callable[[str], bool]]: Column filter, or None for all columns.
+    """
+    if columns is None:
+        return None
+    column_set = set(columns)
+    return lambda column: column in column_set
+
+
+def read_arrow_df(fh: Union[str, IO[bytes]], columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Read a file into a dataframe of Arrow-backed string columns with the pyarrow CSV reader.
+
+    The result is the same as reading with `TSV_OPTIONS` except for the string storage. pyarrow has no comment
+    option, so lines starting with "#" are skipped while parsing and values holding a "#" are cut afterwards the way
+    the C parser does. As a "#" cuts the rest of its row, the columns before the last column asked for are read
+    too and dropped once the comments are cut. Files the pyarrow reader cannot parse, such as lines with too few
+    fields before a comment, are read again with the C parser, or raise io.UnsupportedOperation if they are streams
+    that cannot be rewound. The tables are allocated from the system memory pool, which hands the reader's working
+    buffers back once the table is built.
+
+    Args:
+    ----
+    fh (str, io.TextIOWrapper): File handle.
+    columns (List[str], optional): Columns to read, see `read_df`.
+
+    Returns:
+    -------
+    pandas.DataFrame: Dataframe.
+    """
+    try:
+        import pyarrow as pa
+        from pyarrow import csv as pa_csv
+    except ImportError as error:
+        raise ImportError("The pyarrow engine requires pyarrow, install it with the 'arrow' extra.") from error
+
+    if isinstance(fh, str):
+        source = io.BufferedReader(pa.input_stream(fh))
+    else:
+        source = fh
+        start = source.tell() if source.seekable() else None
+    names = source.readline().rstrip(b"\n").decode().split("\t")
+    last = max((i + 1 for i, name in enumerate(names) if columns is None or name in columns), default=0)
+    parse_options = pa_csv.ParseOptions(
+        delimiter="\t",
+        quote_char=False,
+        invalid_row_handler=lambda row: "skip" if row.text.startswith("#") else "error",
+    )
+    convert_options = pa_csv.ConvertOptions(
+        column_types={name: pa.string() for name in names},
+        null_values=NA_VALUES,
+        strings_can_be_null=True,
+        include_columns=names[:last],
+    )
+    try:
+        if len(set(names)) < len(names) or any("#" in name for name in names) or names == [""] or last == 0:
+            raise pa.ArrowInvalid("header needs the C parser")
+        table = pa_csv.read_csv(
+            source,
+            read_options=pa_csv.ReadOptions(column_names=names, use_threads=True),
+            parse_options=parse_options,
+            convert_options=convert_options,
+            memory_pool=pa.system_memory_pool(),
+        )
+    except pa.ArrowInvalid as error:
+        if not isinstance(fh, str):
+            if start is None:
+                raise io.UnsupportedOperation("the file needs the C parser and cannot be read again") from error
+            source.seek(start)
+        df = pd.read_csv(fh if isinstance(fh, str) else source, usecols=use_columns(columns), **TSV_OPTIONS)
+        return df.astype(pd.StringDtype("pyarrow"))
+    finally:
+        if isinstance(fh, str):
+            source.close()
+    df = table.to_pandas(types_mapper={pa.string(): pd.StringDtype("pyarrow")}.get, memory_pool=pa.system_memory_pool())
+    df = cut_comments(df)
+    return df if columns is None else df[[name for name in names[:last] if name in columns]]
+
+
+def cut_comments(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cut each row at its first "#" like the C parser with `comment="#"` does.
+
+    The rest of the value holding the "#" is removed and the following columns of the row are set to missing, rows
+    left empty are dropped.
+
+    Args:
+    ----
+    df (pandas.DataFrame): Dataframe of string columns.
+
+    Returns:
+    -------
+    pandas.DataFrame: Dataframe without comments.
+    """
+    commented = np.zeros(len(df), dtype=bool)
+    for col in df.columns:
+        commented |= df[col].str.contains("#", regex=False).fillna(False).to_numpy(dtype=bool)
+    rows = np.flatnonzero(commented)
+    if len(rows) == 0:
+        return df
+    positions = df.iloc[rows].apply(lambda col: col.str.find("#")).fillna(-1).to_numpy(dtype=int)
+    drop = []
+    for row, row_positions in zip(rows, positions, strict=True):
+        col = np.flatnonzero(row_positions >= 0)[0]
+        value = df.iat[row, col][: row_positions[col]]
+        if col == 0 and value == "":
+            drop.append(row)
+            continue
+        df.iloc[row, col] = pd.NA if value in NA_VALUES else value
+        df.iloc[row, col + 1 :] = pd.NA
+    return df.drop(index=df.index[drop]).reset_index(drop=True)
+
+
+def read_df_chunks(
+    fh: Union[str, IO[bytes]],
+    chunksize: int,
+    add_source_col: Optional[str] = "provided_by",
+    source_col_value: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Read a file into dataframes of at most chunksize rows.
+
+    Args:
+    ----
+    fh (str, io.TextIOWrapper): File handle.
+    chunksize (int): Number of rows per chunk.
+    add_source_col (str, optional): Name of column to add to the dataframe with the name of the file.
+    source_col_value (Any, optional): Value to add to the source column.
+    columns (List[str], optional): Columns to read, see `read_df`.
+
+    Returns:
+    -------
+    Iterator[pandas.DataFrame]: Dataframes.
+    """
+    with pd.read_csv(fh, chunksize=chunksize, usecols=use_columns(columns), **TSV_OPTIONS) as reader:
+        for df in reader:
+            if add_source_col is not None:
+                df[add_source_col] = source_col_value
+            yield df
+
+
+def read_table(
+    fh: Union[str, IO[bytes]],
+    add_source_col: Optional[str] = "provided_by",
+    source_col_value: Optional[str] = None,
+    chunksize: Optional[int] = None,
+    engine: str = "c",
+    columns: Optional[List[str]] = None,
+) -> Union[pd.DataFrame, TableChunks]:
+    """
+    Read a file into a dataframe, or into TableChunks if chunksize is given.
+
+    Args:
+    ----
+    fh (str, io.TextIOWrapper): File handle, or path to the file if chunksize is given.
+    add_source_col (str, optional): Name of column to add to the dataframe with the name of the file.
+    source_col_value (Any, optional): Value to add to the source column.
+    chunksize (int, optional): Number of rows per chunk.
+    engine (str, optional): Parser to use, see `read_df`. Chunks are always read with the C parser.
+    columns (List[str], optional): Columns to read, see `read_df`.
+
+    Returns:
+    -------
+    Union[pandas.DataFrame, TableChunks]: Dataframe or chunked table.
+    """
+    if chunksize is None:
+        return read_df(fh, add_source_col, source_col_value, engine, columns)
+    if engine != "c":
+        raise ValueError("chunksize is only supported by the 'c' engine")
+    return TableChunks(fh, chunksize, add_source_col, source_col_value, columns)
+
+
+def read_tar_stream(
+    source: Union[str, IO[bytes]],
+    type_names: Dict[str, Union[str, re.Pattern]],
+    chunksize: Optional[int] = None,
+    chunked: Iterable[str] = (),
+    add_source_col: Optional[str] = "provided_by",
+    engine: str = "c",
+    columns: Optional[List[str]] = None,
+) -> Dict[str, List[Union[pd.DataFrame, TableChunks]]]:
+    """
+    Read the tables of a tar archive in one sequential pass.
+
+    The archive is opened in stream mode, so it is decompressed once and never rewound, and each matching member is
+    parsed as it goes past. Tables read in chunks are only recorded here and streamed when they are iterated. The
+    archive can also be a stream such as a download, which is read once and can therefore not be read in chunks.
+
+    Args:
+    ----
+    source (str, IO[bytes]): Path to the tar archive, or stream of the archive.
+    type_names (Dict[str, Union[str, re.Pattern]]): String to match in the member names for each table, or pattern
+        the file name of the members has to match.
+    chunksize (int, optional): Number of rows per chunk of the chunked tables.
+    chunked (Iterable[str], optional): Tables to read as TableChunks if chunksize is given.
+    add_source_col (str, optional): Name of column to add to each dataframe with the name of the file.
+    engine (str, optional): Parser to use, see `read_df`. Chunks are always read with the C parser.
+    columns (List[str], optional): Columns to read, see `read_df`.
+
+    Returns:
+    -------
+    Dict[str, List[Union[pandas.DataFrame, TableChunks]]]: Dataframes or chunked tables of the matching members of
+        each table.
+    """
+    chunked = set(chunked) if chunksize is not None else set()
+    if chunked and engine != "c":
+        raise ValueError("chunksize is only supported by the 'c' engine")
+    if chunked and not isinstance(source, str):
+        raise ValueError("chunksize is not supported when reading from a stream")
+    tables = {table: [] for table in type_names}
+    with tarfile.open(source, "r|*") if isinstance(source, str) else tarfile.open(fileobj=source, mode="r|*") as tar:
+        for member in tar:
+            matches = [
+                table
+                for table, type_name in type_names.items()
+                if member.isfile() and matches_name(type_name, member.name)
+            ]
+            df = None
+            for table in matches:
+                if table in chunked:
+                    tables[table].append(
+                        TableChunks((source, member.name), chunksize, add_source_col, member.name, columns)
+                    )
+                    continue
+                if df is None:
+                    try:
+                        df = read_df(stream_member(tar, member), add_source_col, member.name, engine, columns)
+                    except io.UnsupportedOperation as error:
+                        if not isinstance(source, str):
+                            raise ValueError(f"{member.name} needs the 'c' engine to be read from a stream") from error
+                        with tarfile.open(source, "r:*") as member_tar:
+                            df = read_df(
+                                member_tar.extractfile(member.name), add_source_col, member.name, engine, columns
+                            )
+                tables[table].append(df)
+    return tables
+
+
+def matches_name(type_name: Union[str, re.Pattern], name: str) -> bool:
+    """
+    Check if a file belongs to a table.
+
+    Args:
+    ----
+    type_name (str, re.Pattern): String to match in the name, or pattern the whole file name has to match.
+    name (str): Path or archive member name of the file.
+
+    Returns:
+    -------
+    bool: True if the file belongs to the table.
+    """
+    if isinstance(type_name, re.Pattern):
+        return type_name.fullmatch(os.path.basename(name)) is not None
+    return type_name in name
+
+
 def write_df(df: pd.DataFrame, filename: str):
     """
     Write a dataframe to a file.
@@ -139,7 +573,7 @@ def write_tar(tar_path: str, files: List[str], delete_files=True):
 
 
 def read_kg(
-    source: str = None,
+    source: Union[str, IO[bytes]] = None,
     node_match: str = "_node",
     edge_match: str = "_edge",
     node_file: str = None,
@@ -147,13 +581,20 @@ def read_kg(
     duplicate_node_file: str = None,
     dangling_edge_file: str = None,
     add_source_col: str = None,
+    chunksize: int = None,
+    engine: str = "c",
+    cache: bool = False,
+    rebuild_cache: bool = False,
+    columns: Optional[List[str]] = REPORT_COLUMNS,
+    compact: bool = False,
 ) -> MergedKG:
     """
     Read a knowledge graph from a directory or tar archive.
 
     Args:
     ----
-    source (str): Path to directory or tar archive.
+    source (str, IO[bytes]): Path to directory or tar archive, or stream of a tar archive such as a download, which
+        is parsed as it is read without being written to disk.
     node_match (str): String to match for node files.
     edge_match (str): String to match for edge files.
     node_file (str, optional): Path to node file.
@@ -161,11 +602,31 @@ def read_kg(
     duplicate_node_file (str, optional): Path to duplicate node file.
     dangling_edge_file (str, optional): Path to dangling edge file.
     add_source_col (str, optional): Name of column to add to each dataframe with the name of the file.
+    chunksize (int, optional): Read the edges as TableChunks of this many rows instead of one dataframe.
+    engine (str, optional): Parser to use, "c" or "pyarrow" for Arrow-backed string columns, see `read_df`.
+    cache (bool, optional): Load the nodes and edges from the columnar cache next to the source, writing it on the
+        first load. Not used when reading edges in chunks.
+    rebuild_cache (bool, optional): Read the source and write the cache again even if it exists.
+    columns (List[str], optional): Columns of the node and edge files to read, the other columns are never
+        materialized. Defaults to the columns used by `create_qc_report`, None reads all columns.
+    compact (bool, optional): Encode the node ids, subjects, objects and low cardinality columns as categoricals once
+        the tables are read, see `MergedKG.compact`, which takes several times less memory and makes the report
+        faster. The cache holds the plain tables. Not used when reading edges in chunks.
 
     Returns:
     -------
     MergedKG: MergedKG object.
     """
+    compact = compact and chunksize is None
+    if cache and isinstance(source, str) and chunksize is None and os.path.exists(source):
+        key = cache_key(source, node_match, edge_match, add_source_col, columns)
+        tables = None if rebuild_cache else read_cache(source, key, ["nodes", "edges"], engine)
+        if tables is None:
+            kg = read_kg(source, node_match, edge_match, add_source_col=add_source_col, engine=engine, columns=columns)
+            write_cache(source, key, {"nodes": kg.nodes, "edges": kg.edges})
+        else:
+            kg = MergedKG(tables["nodes"], tables["edges"])
+        return compact_kg(kg) if compact else kg
     if source is not None:
         if (
             node_file is not None
@@ -174,61 +635,136 @@ def read_kg(
             or dangling_edge_file is not None
         ):
             raise ValueError("Wrong attributes: source and files cannot both be specified")
-        elif os.path.isdir(source):
+        elif isinstance(source, str) and os.path.isdir(source):
             [node_file], [edge_file] = get_files(source)
-            nodes = read_df(node_file, add_source_col, node_file)
-            edges = read_df(edge_file, add_source_col, edge_file)
-        elif tarfile.is_tarfile(source):
-            tar = tarfile.open(source, "r:*")
-            [nodes] = read_tar_dfs(tar, node_match, add_source_col)
-            [edges] = read_tar_dfs(tar, edge_match, add_source_col)
+            nodes = read_df(node_file, add_source_col, node_file, engine, columns)
+            edges = read_table(edge_file, add_source_col, edge_file, chunksize, engine, columns)
+        elif not isinstance(source, str) or tarfile.is_tarfile(source):
+            tables = read_tar_stream(
+                source,
+                {"nodes": node_match, "edges": edge_match},
+                chunksize,
+                ["edges"],
+                add_source_col,
+                engine,
+                columns,
+            )
+            [nodes], [edges] = tables["nodes"], tables["edges"]
         else:
             raise ValueError("source is not an archive or directory")
     elif node_file is not None and edge_file is not None:
-        nodes = read_df(node_file, add_source_col, node_file)
-        edges = read_df(edge_file, add_source_col, node_file)
+        nodes = read_df(node_file, add_source_col, node_file, engine, columns)
+        edges = read_table(edge_file, add_source_col, node_file, chunksize, engine, columns)
     else:
         raise ValueError("Must specify either nodes & edges or source")
     kg = MergedKG(nodes, edges)
-    return kg
+    return compact_kg(kg) if compact else kg
 
 
-def read_qc(source: str = None) -> MergeQC:
+def compact_kg(kg: MergedKG) -> MergedKG:
+    """
+    Encode a knowledge graph compactly as a stage of the active profiler, see `MergedKG.compact`.
+
+    Args:
+    ----
+    kg (MergedKG): Knowledge graph of plain tables.
+
+    Returns:
+    -------
+    MergedKG: Compact knowledge graph.
+    """
+    with profiling.stage("compact") as compact_stage:
+        compact_stage.add_rows(len(kg.nodes) + len(kg.edges))
+        return kg.compact()
+
+
+def read_qc(
+    source: Union[str, Dict[str, IO[bytes]]] = None,
+    chunksize: int = None,
+    engine: str = "c",
+    cache: bool = False,
+    rebuild_cache: bool = False,
+    columns: Optional[List[str]] = REPORT_COLUMNS,
+    dangling_edges: bool = True,
+    duplicates: bool = True,
+) -> MergeQC:
     """
     Read a MergeQC object from a directory or tar archive.
 
+    The tables keep the provided_by column of the qc files, the source of each row in the merged knowledge graph.
+
     Args:
     ----
-    source (str): Path to directory or tar archive.
+    source (str, Dict[str, IO[bytes]]): Path to directory or tar archive, or uncompressed streams of the qc files by
+        file name, such as downloads, which are parsed as they are read without being written to disk.
+    chunksize (int, optional): Read the dangling and duplicate edges as TableChunks of this many rows.
+    engine (str, optional): Parser to use, "c" or "pyarrow" for Arrow-backed string columns, see `read_df`.
+    cache (bool, optional): Load the qc tables from the columnar cache next to the source, writing it on the first
+        load. Not used when reading edges in chunks.
+    rebuild_cache (bool, optional): Read the source and write the cache again even if it exists.
+    columns (List[str], optional): Columns of the qc files to read, the other columns are never materialized.
+        Defaults to the columns used by `create_qc_report`, None reads all columns.
+    dangling_edges (bool, optional): Read the dangling edges file. If False the file is skipped and the dangling
+        edges are None, to be found in the knowledge graph by `create_qc_report`, see `MergeQC.complete`.
+    duplicates (bool, optional): Read the duplicate nodes and edges files. If False the files are skipped and the
+        duplicate nodes and edges are None, to be found in the knowledge graph like the dangling edges.
 
     Returns:
     -------
     MergeQC: MergeQC object.
     """
-    duplicate_nodes = pd.DataFrame([])
-    dangling_edges = pd.DataFrame([])
-    duplicate_edges = pd.DataFrame([])
+    read_dangling_edges = dangling_edges
+    table_names = ["duplicate_nodes", "dangling_edges", "duplicate_edges"]
+    if not read_dangling_edges:
+        table_names.remove("dangling_edges")
+    if not duplicates:
+        table_names.remove("duplicate_nodes")
+        table_names.remove("duplicate_edges")
+    if cache and isinstance(source, str) and chunksize is None and os.path.exists(source):
+        # keyed by the source column like read_kg, the qc files keep their own provided_by column
+        key = cache_key(source, None, columns)
+        tables = None if rebuild_cache else read_cache(source, key, table_names, engine)
+        if tables is None:
+            qc = read_qc(
+                source, engine=engine, columns=columns, dangling_edges=read_dangling_edges, duplicates=duplicates
+            )
+            write_cache(source, key, {table: getattr(qc, table) for table in table_names})
+            return qc
+        return MergeQC(tables.get("duplicate_nodes"), tables.get("duplicate_edges"), tables.get("dangling_edges"))
+    duplicate_nodes = pd.DataFrame([]) if duplicates else None
+    dangling_edges = pd.DataFrame([]) if read_dangling_edges else None
+    duplicate_edges = pd.DataFrame([]) if duplicates else None
     if source is not None:
-        if os.path.isdir(source):
-            qc_files = os.listdir(source)
-            for qc_file in qc_files:
-                if "duplicate-nodes" in qc_file:
-                    duplicate_nodes = read_df(source + "/" + qc_file)
-                elif "dangling-edges" in qc_file:
-                    dangling_edges = read_df(source + "/" + qc_file)
-                elif "duplicate-edges" in qc_file:
-                    duplicate_edges = read_df(source + "/" + qc_file)
+        if isinstance(source, dict) or os.path.isdir(source):
+            if isinstance(source, dict):
+                if chunksize is not None:
+                    raise ValueError("chunksize is not supported when reading from a stream")
+                qc_files = source
+            else:
+                qc_files = {qc_file: source + "/" + qc_file for qc_file in os.listdir(source)}
+            for qc_file, fh in qc_files.items():
+                if matches_name(QC_FILE_PATTERNS["duplicate_nodes"], qc_file) and duplicates:
+                    duplicate_nodes = read_df(fh, None, engine=engine, columns=columns)
+                elif matches_name(QC_FILE_PATTERNS["dangling_edges"], qc_file) and read_dangling_edges:
+                    dangling_edges = read_table(fh, None, chunksize=chunksize, engine=engine, columns=columns)
+                elif matches_name(QC_FILE_PATTERNS["duplicate_edges"], qc_file) and duplicates:
+                    duplicate_edges = read_table(fh, None, chunksize=chunksize, engine=engine, columns=columns)
         elif tarfile.is_tarfile(source):
-            tar = tarfile.open(source, "r:*")
-            tar_duplicate_nodes = read_tar_dfs(tar, "duplicate-nodes")
-            if len(tar_duplicate_nodes) == 1:
-                [duplicate_nodes] = tar_duplicate_nodes
-            tar_dangling_edges = read_tar_dfs(tar, "dangling-edges")
-            if len(tar_dangling_edges) == 1:
-                [dangling_edges] = tar_dangling_edges
-            tar_duplicate_edges = read_tar_dfs(tar, "duplicate-edges")
-            if len(tar_duplicate_edges) == 1:
-                [duplicate_edges] = tar_duplicate_edges
+            tables = read_tar_stream(
+                source,
+                {table: QC_FILE_PATTERNS[table] for table in table_names},
+                chunksize,
+                ["dangling_edges", "duplicate_edges"],
+                add_source_col=None,
+                engine=engine,
+                columns=columns,
+            )
+            if len(tables.get("duplicate_nodes", [])) == 1:
+                [duplicate_nodes] = tables["duplicate_nodes"]
+            if len(tables.get("dangling_edges", [])) == 1:
+                [dangling_edges] = tables["dangling_edges"]
+            if len(tables.get("duplicate_edges", [])) == 1:
+                [duplicate_edges] = tables["duplicate_edges"]
         else:
             raise ValueError("source is not an archive or directory")
     else:
@@ -260,3 +796,22 @@ def write(kg: MergedKG, name: str, output_dir: str):
     write_df(df=kg.edges, filename=edges_path)
 
     write_tar(tar_path, [nodes_path, edges_path])
+
+
+def write_arrow(kg: MergedKG, name: str, output_dir: str):
+    """
+    Write a knowledge graph to Arrow IPC (Feather) files that can be memory-mapped with `MergedKG.from_ipc`.
+
+    Args:
+    ----
+    kg (MergedKG): MergedKG object.
+    name (str): Name of knowledge graph.
+    output_dir (str): Path to directory.
+
+    Returns:
+    -------
+    None
+    """
+    Path(output_dir).mkdir(exist_ok=True, parents=True)
+    write_ipc(kg.nodes, f"{output_dir}/{name}_nodes.arrow")
+    write_ipc(kg.edges, f"{output_dir}/{name}_edges.arrow")
@@ -1,8 +1,495 @@
 """MergedKG and MergeQC classes."""
+from functools import cached_property
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
 from pandas.core.frame import DataFrame
 
+from monarch_qc_reports.table_cache import read_ipc
+
+EDGE_NAMESPACE_COLUMNS = ["subject", "object"]
+NODE_NAMESPACE_COLUMNS = ["id"]
+# Columns of few distinct values stored as categoricals of their sorted values by `MergedKG.compact`
+CATEGORICAL_COLUMNS = ["provided_by", "predicate", "category", "in_taxon"]
+# Columns of the key shared by duplicate nodes or edges, the id as in the duplicate files of the merge qc
+NODE_KEY_COLUMNS = ["id"]
+# Not the (subject, predicate, object) triple: cat-merge lists the edges of a repeated id, and edges of the same triple
+# under different ids, such as the same association from two sources, are separate edges of the merged graph
+EDGE_KEY_COLUMNS = ["id"]
+
+
+def arrow_strings(values: Union[List, pd.Series, pd.Index]):
+    """
+    Get the Arrow array backing a column of Arrow-backed strings without copying it.
+
+    Params:
+        values (Union[List, pd.Series, pd.Index]): values to look at
+
+    Returns
+    -------
+        pyarrow.ChunkedArray of the values, or None if they are not Arrow-backed strings
+    """
+    dtype = getattr(values, "dtype", None)
+    if isinstance(dtype, pd.StringDtype) and dtype.storage == "pyarrow":
+        return values.array.__arrow_array__()
+    return None
+
+
+class NodeIndex:
+
+    """
+    Hashed membership index over the node ids of a knowledge graph.
+
+    The hash table is built once from the unique node ids and reused for every membership test, instead of
+    rebuilding a Python set from the node id column for each check. If the node ids are a categorical, such as the
+    ids of a compact `MergedKG`, the position of every category is kept too, so values that are categoricals of the
+    same categories are looked up by their integer codes without hashing any string.
+    """
+
+    def __init__(self, ids: pd.Series):
+        """Initialize NodeIndex object."""
+        self.categories = None
+        if isinstance(ids.dtype, pd.CategoricalDtype):
+            codes = pd.unique(ids.cat.codes.to_numpy())
+            codes = codes[codes >= 0]
+            self.categories = ids.cat.categories
+            # position of each category in the index, with a last -1 for the missing code -1
+            self.category_codes = np.full(len(self.categories) + 1, -1, dtype=np.intp)
+            self.category_codes[codes] = np.arange(len(codes))
+            self.index = self.categories.take(codes)
+        else:
+            self.index = pd.Index(pd.unique(ids))
+
+    def __len__(self) -> int:
+        """Return the number of unique node ids."""
+        return len(self.index)
+
+    def __contains__(self, value) -> bool:
+        """Check if a single value is a node id."""
+        return value in self.index
+
+    @cached_property
+    def arrow_index(self):
+        """Unique node ids as an Arrow array, built the first time Arrow-backed values are looked up."""
+        import pyarrow as pa
+
+        return pa.array(self.index, type=pa.large_string())
+
+    def codes(self, values: Union[List, pd.Series]) -> np.ndarray:
+        """
+        Get the position of values in the index of unique node ids.
+
+        Arrow-backed values, such as memory-mapped columns, are looked up in Arrow so that they are never converted to
+        Python strings. Categorical values are looked up by category, and only take their codes if they have the
+        categories of the node ids.
+
+        Params:
+            values (Union[List, pd.Series]): values to look up
+
+        Returns
+        -------
+            integer array of node positions, -1 where the value is not a node id
+        """
+        if len(values) == 0:
+            return np.zeros(0, dtype=np.intp)
+        if isinstance(getattr(values, "dtype", None), pd.CategoricalDtype):
+            categories = values.cat.categories
+            if self.categories is not None and (categories is self.categories or categories.equals(self.categories)):
+                mapping = self.category_codes
+            else:
+                mapping = np.append(self.codes(pd.Series(categories)), -1)
+            return mapping[values.cat.codes.to_numpy()]
+        arrow_values = arrow_strings(values)
+        if arrow_values is not None:
+            import pyarrow.compute as pc
+
+            codes = pc.index_in(arrow_values, value_set=self.arrow_index).fill_null(-1)
+            return codes.to_numpy().astype(np.intp)
+        return self.index.get_indexer(values)
+
+    def contains(self, values: Union[List, pd.Series]) -> np.ndarray:
+        """
+        Check which values are node ids.
+
+        Params:
+            values (Union[List, pd.Series]): values to look up
+
+        Returns
+        -------
+            boolean array, True where the value is a node id
+        """
+        return self.codes(values) >= 0
+
+    def difference(self, values: Union[List, pd.Series]) -> Union[List, pd.Series]:
+        """
+        Get the sorted unique values that are not node ids.
+
+        Params:
+            values (Union[List, pd.Series]): values to look up
+
+        Returns
+        -------
+            Union[List, pd.Series]: same result as `get_difference(values, node_ids)`
+        """
+        return self._select(values, ~self.contains(values))
+
+    def intersection(self, values: Union[List, pd.Series]) -> Union[List, pd.Series]:
+        """
+        Get the sorted unique values that are node ids.
+
+        Params:
+            values (Union[List, pd.Series]): values to look up
+
+        Returns
+        -------
+            Union[List, pd.Series]: same result as `get_intersection(values, node_ids)`
+        """
+        return self._select(values, self.contains(values))
+
+    @staticmethod
+    def _select(values: Union[List, pd.Series], mask: np.ndarray) -> Union[List, pd.Series]:
+        """Return the sorted unique values selected by mask, as a list or a Series matching the input."""
+        if isinstance(values, list):
+            return sorted({value for value, keep in zip(values, mask, strict=True) if keep})
+        elif isinstance(values, pd.Series):
+            dtype = values.cat.categories.dtype if isinstance(values.dtype, pd.CategoricalDtype) else values.dtype
+            return pd.Series(sorted(set(values[mask])), dtype=dtype, name=values.name)
+        raise ValueError("NodeIndex: values must be of type list or pandas.Series")
+
+
+def namespace_categorical(col: pd.Series) -> pd.Series:
+    """
+    Dictionary-encode the namespaces (CURIE prefixes) of a column.
+
+    The prefix is split off once per unique value rather than once per row, and the result is a categorical with
+    lexically sorted categories, so sorting and deduplicating namespaces works on the category codes.
+
+    Params:
+        col (pd.Series): column of CURIEs, plain or categorical
+
+    Returns
+    -------
+        categorical pd.Series of namespaces aligned with the column
+    """
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        if len(col.cat.categories) > len(col):
+            # only split the values used by a short column of many categories, such as the node-ID dictionary
+            col = col.cat.remove_unused_categories()
+        codes, uniques = col.cat.codes.to_numpy(), col.cat.categories
+    else:
+        codes, uniques = pd.factorize(col)
+    prefixes = curie_prefixes(uniques)
+    categories = pd.Index(sorted(prefixes.dropna().unique()), dtype="string")
+    if len(categories) > 0:
+        codes = np.where(codes >= 0, categories.get_indexer(prefixes)[codes], -1)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=categories), index=col.index, name=col.name)
+
+
+def curie_prefixes(values: Union[pd.Index, pd.api.extensions.ExtensionArray]) -> pd.Series:
+    """
+    Split the namespace (CURIE prefix) off each value.
+
+    Params:
+        values (Union[pd.Index, pd.api.extensions.ExtensionArray]): values to split, Arrow-backed values are split in
+            Arrow
+
+    Returns
+    -------
+        string pd.Series of prefixes, missing where the value is missing
+    """
+    arrow_values = arrow_strings(values)
+    if arrow_values is not None:
+        import pyarrow.compute as pc
+
+        prefixes = pc.list_element(pc.split_pattern(arrow_values, ":", max_splits=1), 0)
+        return pd.Series(pd.arrays.ArrowStringArray(prefixes))
+    values = pd.Series(values, dtype="string")
+    return values.str.split(":").str[0] if len(values) > 0 else values
+
+
+def encode_namespaces(df: DataFrame, cols: List[str]) -> DataFrame:
+    """
+    Dictionary-encode the namespaces of several columns with one shared list of categories.
+
+    Params:
+        df (DataFrame): table holding the columns
+        cols (List[str]): columns of CURIEs to encode
+
+    Returns
+    -------
+        DataFrame of categorical namespaces, one column per encoded column, aligned with the table
+    """
+    namespaces = {col: namespace_categorical(df[col]) for col in cols}
+    categories = pd.Index(sorted(set().union(*(ns.cat.categories for ns in namespaces.values()))), dtype="string")
+    return DataFrame({col: ns.cat.set_categories(categories) for col, ns in namespaces.items()}, index=df.index)
+
+
+def factorize_column(col: pd.Series) -> Tuple[np.ndarray, pd.Index]:
+    """
+    Get the codes and distinct values of a column, using the codes of a categorical as they are.
+
+    Params:
+        col (pd.Series): plain or categorical column
+
+    Returns
+    -------
+        integer array of the code of each value, -1 where it is missing, and the values the codes point to
+    """
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        return col.cat.codes.to_numpy(), col.cat.categories
+    codes, uniques = pd.factorize(col)
+    return codes, pd.Index(uniques)
+
+
+def recode_categorical(col: pd.Series, categories: pd.Index) -> pd.Series:
+    """
+    Encode a column as a categorical of the given categories.
+
+    Only the distinct values of the column are looked up in the categories, the rows just take their codes.
+
+    Params:
+        col (pd.Series): plain or categorical column, all of whose values are in categories
+        categories (pd.Index): unique values of the categorical
+
+    Returns
+    -------
+        categorical pd.Series aligned with the column
+    """
+    codes, values = factorize_column(col)
+    # the last -1 maps the missing code -1 to itself
+    mapping = np.append(categories.get_indexer(values), -1)
+    categorical = pd.Categorical.from_codes(mapping[codes], dtype=pd.CategoricalDtype(categories))
+    return pd.Series(categorical, index=col.index, name=col.name)
+
+
+def sorted_categorical(col: pd.Series) -> pd.Series:
+    """
+    Encode a column as a categorical of its sorted distinct strings, which groups and sorts like the strings.
+
+    Params:
+        col (pd.Series): plain or categorical column
+
+    Returns
+    -------
+        categorical pd.Series aligned with the column
+    """
+    _, values = factorize_column(col)
+    return recode_categorical(col, pd.Index(values, dtype="string").sort_values())
+
+
+def node_dictionary(ids: pd.Series, endpoints: List[pd.Series]) -> pd.Index:
+    """
+    Build the node-ID dictionary of a knowledge graph.
+
+    Params:
+        ids (pd.Series): node ids, plain or categorical
+        endpoints (List[pd.Series]): subjects and objects of the edges, plain or categorical
+
+    Returns
+    -------
+        string pd.Index of the unique node ids in order of first appearance, followed by the sorted ids that are
+        only used as endpoints
+    """
+    codes, values = factorize_column(ids)
+    node_ids = pd.Index(values.take(pd.unique(codes[codes >= 0])), dtype="string")
+    other_ids = []
+    for col in endpoints:
+        _, values = factorize_column(col)
+        values = pd.Index(values, dtype="string")
+        other_ids.append(values[node_ids.get_indexer(values) < 0])
+    if not other_ids:
+        return node_ids
+    return node_ids.append(other_ids[0].append(other_ids[1:]).unique().sort_values())
+
+
+def compact_table(df: DataFrame, dictionary: pd.Index, id_columns: List[str]) -> DataFrame:
+    """
+    Encode the node id and low cardinality columns of a table as categoricals, other columns are kept as they are.
 
-class MergedKG:
+    Params:
+        df (DataFrame): nodes or edges
+        dictionary (pd.Index): node-ID dictionary, see `node_dictionary`
+        id_columns (List[str]): columns of node ids, encoded with the dictionary
+
+    Returns
+    -------
+        DataFrame of the encoded columns
+    """
+    columns = {}
+    for col in df.columns:
+        if col in id_columns:
+            columns[col] = recode_categorical(df[col], dictionary)
+        elif col in CATEGORICAL_COLUMNS:
+            columns[col] = sorted_categorical(df[col])
+        else:
+            columns[col] = df[col]
+    return DataFrame(columns, index=df.index, copy=False)
+
+
+def find_dangling_edges(edges: DataFrame, node_index: NodeIndex) -> DataFrame:
+    """
+    Find the dangling edges, whose subject or object is not a node id.
+
+    The subjects and objects are anti-joined with the node index, one vectorized lookup each, which for the
+    categorical endpoints of a compact `MergedKG` only maps their integer codes.
+
+    Params:
+        edges (DataFrame): edges to look in
+        node_index (NodeIndex): membership index of the node ids
+
+    Returns
+    -------
+        DataFrame of the dangling edges, with a new range index like a table read from a file
+    """
+    if len(edges) == 0:
+        return edges
+    dangling = ~(node_index.contains(edges["subject"]) & node_index.contains(edges["object"]))
+    return edges[dangling].reset_index(drop=True)
+
+
+class DuplicateFinder:
+
+    """
+    Streaming detector of the rows of a table whose key is shared with another row, in the chunks of the table.
+
+    The keys of all chunks are added first, then the duplicates of each chunk are found in a second pass. Like the
+    duplicate files of the merge qc, every row of a key that is not unique is a duplicate, the first one included.
+    Only a 64-bit hash of every distinct key is kept, in a sorted array, instead of the key strings, so the memory
+    used is 8 bytes per distinct key whatever the length of the ids. The hashes are those of
+    `pandas.util.hash_pandas_object`, the same for a categorical as for its strings. Two different keys have the same
+    hash with a chance of about n**2 / 2**65 for n keys, under one in a million for tens of millions of keys.
+
+    Params:
+        columns (List[str]): columns of the key
+    """
+
+    def __init__(self, columns: List[str]):
+        """Initialize DuplicateFinder object."""
+        self.columns = columns
+        self.seen = np.zeros(0, dtype=np.uint64)
+        self.repeated = np.zeros(0, dtype=np.uint64)
+
+    def hashes(self, df: DataFrame) -> np.ndarray:
+        """Hash the key of each row of a chunk."""
+        return pd.util.hash_pandas_object(df[self.columns], index=False).to_numpy()
+
+    def add(self, df: DataFrame):
+        """
+        Add the keys of the next chunk of the table, recording the keys seen more than once.
+
+        Params:
+            df (DataFrame): next chunk of the table
+        """
+        if len(df) == 0:
+            return
+        unique_hashes, counts = np.unique(self.hashes(df), return_counts=True)
+        positions = np.searchsorted(self.seen, unique_hashes)
+        seen_before = np.zeros(len(unique_hashes), dtype=bool)
+        if len(self.seen) > 0:
+            seen_before = self.seen.take(positions, mode="clip") == unique_hashes
+        self.repeated = np.union1d(self.repeated, unique_hashes[seen_before | (counts > 1)])
+        self.seen = np.insert(self.seen, positions[~seen_before], unique_hashes[~seen_before])
+
+    def scan(self, chunks: Iterable[DataFrame]) -> Iterator[DataFrame]:
+        """
+        Pass on the chunks of a table, adding their keys, so the keys are added in a pass made for another purpose.
+
+        Params:
+            chunks (Iterable[DataFrame]): chunks of the table
+
+        Returns
+        -------
+            Iterator over the chunks
+        """
+        for df in chunks:
+            self.add(df)
+            yield df
+
+    def duplicated(self, df: DataFrame) -> np.ndarray:
+        """
+        Check which rows of a chunk have a key seen more than once in the chunks added.
+
+        Params:
+            df (DataFrame): chunk of the table
+
+        Returns
+        -------
+            boolean array, True where the row is a duplicate
+        """
+        if len(df) == 0 or len(self.repeated) == 0:
+            return np.zeros(len(df), dtype=bool)
+        hashes = self.hashes(df)
+        positions = np.searchsorted(self.repeated, hashes)
+        return self.repeated.take(positions, mode="clip") == hashes
+
+    def duplicates(self, df: DataFrame) -> DataFrame:
+        """
+        Get the rows of a chunk that have a key seen more than once, see `duplicated`.
+
+        Params:
+            df (DataFrame): chunk of the table
+
+        Returns
+        -------
+            DataFrame of the duplicate rows, with a new range index like a table read from a file
+        """
+        return df[self.duplicated(df)].reset_index(drop=True)
+
+
+def find_duplicates(table: Union[DataFrame, Iterable[DataFrame]], columns: List[str]) -> DataFrame:
+    """
+    Find the rows of a table whose key is shared with another row, like the duplicate files of the merge qc.
+
+    The keys are added in one pass over the chunks, and only if a key is repeated are the chunks read again for its
+    rows, so chunks such as `TableChunks` have to be iterable twice.
+
+    Params:
+        table (Union[DataFrame, Iterable[DataFrame]]): dataframe, or chunks of a table such as `TableChunks`
+        columns (List[str]): columns of the key
+
+    Returns
+    -------
+        DataFrame of all rows of the repeated keys in table order, empty if there are none
+    """
+    finder = DuplicateFinder(columns)
+    chunks = [table] if isinstance(table, DataFrame) else table
+    for chunk in chunks:
+        finder.add(chunk)
+    if len(finder.repeated) == 0:
+        return DataFrame([])
+    return pd.concat([finder.duplicates(chunk) for chunk in chunks], ignore_index=True)
+
+
+class KGTables:
+
+    """
+    Base class for objects holding knowledge graph tables.
+
+    Provides the namespace columns of the tables, computed the first time they are needed and cached until the table
+    is replaced.
+    """
+
+    def namespaces(self, table: str) -> DataFrame:
+        """
+        Get the categorical namespaces of a table, for the subject and object of edges or the id of nodes.
+
+        Params:
+            table (str): name of the table attribute, i.e. "nodes" or "dangling_edges"
+
+        Returns
+        -------
+            DataFrame with one categorical namespace column for each of the encoded columns present
+        """
+        df = getattr(self, table)
+        cache = self.__dict__.setdefault("_namespaces", {})
+        if table not in cache or cache[table][0] is not df:
+            cols = EDGE_NAMESPACE_COLUMNS if "subject" in df.columns else NODE_NAMESPACE_COLUMNS
+            cache[table] = (df, encode_namespaces(df, [col for col in cols if col in df.columns]))
+        return cache[table][1]
+
+
+class MergedKG(KGTables):
 
     """Class for merged knowledge graph."""
 
@@ -15,13 +502,140 @@ class MergedKG:
         self.nodes = nodes
         self.edges = edges
 
+    @classmethod
+    def from_ipc(cls, nodes_path: str, edges_path: str) -> "MergedKG":
+        """
+        Create a MergedKG from memory-mapped Arrow IPC (Feather) files, e.g. the cache files written by `read_kg`.
+
+        The string columns are Arrow-backed views of the mapped files, which the report functions use without
+        converting them to Python strings.
+
+        Params:
+            nodes_path (str): path to the nodes file
+            edges_path (str): path to the edges file
+
+        Returns
+        -------
+            MergedKG with memory-mapped nodes and edges
+        """
+        return cls(read_ipc(nodes_path), read_ipc(edges_path))
+
+    def compact(self) -> "MergedKG":
+        """
+        Get the knowledge graph with its node ids and low cardinality columns encoded as categoricals.
+
+        The node ids, subjects and objects share one node-ID dictionary, see `node_dictionary`, so every id is stored
+        once and the columns only hold integer codes, int32 for more than 32767 ids. An endpoint is a node if its code
+        points into the node ids, which `NodeIndex` checks without comparing strings. provided_by, predicate, category
+        and in_taxon become categoricals of their sorted values, so they group and sort like the strings they replace
+        and the reports are the same.
+
+        Returns
+        -------
+            MergedKG with compact nodes and edges
+        """
+        endpoints = [self.edges[col] for col in EDGE_NAMESPACE_COLUMNS if col in self.edges.columns]
+        dictionary = node_dictionary(self.nodes["id"], endpoints)
+        return MergedKG(
+            compact_table(self.nodes, dictionary, NODE_NAMESPACE_COLUMNS),
+            compact_table(self.edges, dictionary, EDGE_NAMESPACE_COLUMNS),
+        )
+
+    @cached_property
+    def node_index(self) -> NodeIndex:
+        """Membership index over the node ids, built the first time it is needed."""
+        return NodeIndex(self.nodes["id"])
+
+    def dangling_edges(self) -> DataFrame:
+        """
+        Find the edges whose subject or object is not a node id, the dangling edges table of the merge qc.
+
+        Returns
+        -------
+            DataFrame of the dangling edges, see `find_dangling_edges`
+        """
+        return find_dangling_edges(self.edges, self.node_index)
 
-class MergeQC:
+    def duplicate_nodes(self) -> DataFrame:
+        """
+        Find the nodes whose id is not unique, the duplicate nodes table of the merge qc.
 
-    """Class for merge quality control."""
+        Returns
+        -------
+            DataFrame of the duplicate nodes, see `find_duplicates`
+        """
+        return find_duplicates(self.nodes, NODE_KEY_COLUMNS)
 
-    def __init__(self, duplicate_nodes: DataFrame, duplicate_edges: DataFrame, dangling_edges: DataFrame):
+    def duplicate_edges(self) -> DataFrame:
+        """
+        Find the edges whose id is not unique, the duplicate edges table of the merge qc.
+
+        Returns
+        -------
+            DataFrame of the duplicate edges, see `find_duplicates`
+        """
+        return find_duplicates(self.edges, EDGE_KEY_COLUMNS)
+
+
+class MergeQC(KGTables):
+
+    """
+    Class for merge quality control.
+
+    A table that is None was not read from the merge qc files, and is found in the knowledge graph by `complete`.
+    """
+
+    def __init__(
+        self,
+        duplicate_nodes: Optional[DataFrame],
+        duplicate_edges: Optional[DataFrame],
+        dangling_edges: Optional[DataFrame] = None,
+    ):
         """Initialize MergeQC object."""
         self.duplicate_nodes = duplicate_nodes
         self.duplicate_edges = duplicate_edges
         self.dangling_edges = dangling_edges
+
+    def complete(self, kg: MergedKG, tables: Optional[Iterable[str]] = None) -> "MergeQC":
+        """
+        Get the merge qc with the tables that were not read found in the knowledge graph.
+
+        Params:
+            kg (MergedKG): knowledge graph the merge qc is of, with its edges in memory
+            tables (Iterable[str], optional): names of the tables to find if they were not read, the others are left
+                as they are. Defaults to all tables.
+
+        Returns
+        -------
+            MergeQC without None tables among tables, self if they were all read
+        """
+        tables = ["duplicate_nodes", "duplicate_edges", "dangling_edges"] if tables is None else list(tables)
+        if all(getattr(self, table) is not None for table in tables):
+            return self
+        found = {table: getattr(self, table) for table in ["duplicate_nodes", "duplicate_edges", "dangling_edges"]}
+        for table in tables:
+            if found[table] is None:
+                found[table] = getattr(kg, table)()
+        return MergeQC(**found)
+
+    @classmethod
+    def from_ipc(
+        cls, duplicate_nodes_path: str = None, duplicate_edges_path: str = None, dangling_edges_path: str = None
+    ) -> "MergeQC":
+        """
+        Create a MergeQC from memory-mapped Arrow IPC (Feather) files, tables without a file are empty.
+
+        Params:
+            duplicate_nodes_path (str, optional): path to the duplicate nodes file
+            duplicate_edges_path (str, optional): path to the duplicate edges file
+            dangling_edges_path (str, optional): path to the dangling edges file
+
+        Returns
+        -------
+            MergeQC with memory-mapped tables
+        """
+        duplicate_nodes, duplicate_edges, dangling_edges = (
+            DataFrame([]) if path is None else read_ipc(path)
+            for path in (duplicate_nodes_path, duplicate_edges_path, dangling_edges_path)
+        )
+        return cls(duplicate_nodes, duplicate_edges, dangling_edges)
@@ -0,0 +1,401 @@
+"""
+Measure the time and memory taken by the steps of the report pipeline.
+
+The pipeline marks its stages with `stage`, which does nothing unless a `Profiler` is active, so the stages cost one
+function call when the pipeline is not profiled.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Tuple
+
+PROC_STATUS = "/proc/self/status"
+PROC_CLEAR_REFS = "/proc/self/clear_refs"
+MB = 1024**2
+
+
+def memory_usage() -> Tuple[Optional[int], Optional[int]]:
+    """
+    Get the resident memory of the process.
+
+    The peak is read from /proc on Linux and from the POSIX resource module elsewhere, neither is there on Windows.
+
+    Returns
+    -------
+        current resident memory in bytes, None if it is not known, and the peak resident memory in bytes since the
+        process started or the peak was last reset, see `reset_peak_memory`, None if it is not known
+    """
+    if os.path.exists(PROC_STATUS):
+        values = {}
+        with open(PROC_STATUS) as status:
+            for line in status:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    key, value = line.split(":")
+                    values[key] = int(value.split()[0]) * 1024
+        if "VmRSS" in values and "VmHWM" in values:
+            return values["VmRSS"], values["VmHWM"]
+    try:
+        import resource
+    except ImportError:
+        return None, None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return None, peak if sys.platform == "darwin" else peak * 1024
+
+
+def reset_peak_memory() -> bool:
+    """
+    Reset the peak resident memory of the process to its current resident memory.
+
+    This is only possible on Linux, other systems keep the peak since the process started.
+
+    Returns
+    -------
+        whether the peak was reset
+    """
+    try:
+        with open(PROC_CLEAR_REFS, "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        return False
+    return True
+
+
+class Measurement:
+
+    """
+    Context manager measuring the wall time and the peak resident memory of the code run in it.
+
+    The peak is exact on Linux, where it is reset on entry. Elsewhere it is the peak of the whole process so far,
+    which can be higher than the peak of the measured code.
+
+    Attributes:
+        seconds (float): wall time taken
+        start_memory (int): resident memory in bytes on entry, None if it is not known
+        peak_memory (int): peak resident memory in bytes while entered, None if it is not known
+        exact (bool): whether the peak is of the measured code only
+    """
+
+    def __init__(self):
+        """Initialize Measurement object."""
+        self.seconds = 0.0
+        self.start_memory: Optional[int] = None
+        self.peak_memory: Optional[int] = 0
+        self.exact = False
+        self.start = 0.0
+
+    def __enter__(self) -> "Measurement":
+        """Reset the peak memory and start the clock."""
+        self.exact = reset_peak_memory()
+        self.start_memory, _ = memory_usage()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Stop the clock and read the peak memory."""
+        self.seconds = time.perf_counter() - self.start
+        _, self.peak_memory = memory_usage()
+
+    @property
+    def memory_increase(self) -> Optional[int]:
+        """Get the peak resident memory above the resident memory on entry, in bytes, None if it is not known."""
+        if self.start_memory is None or self.peak_memory is None:
+            return None
+        return max(self.peak_memory - self.start_memory, 0)
+
+
+class NullStage:
+
+    """Stage that records nothing, returned by `stage` when no profiler is active."""
+
+    def __enter__(self) -> "NullStage":
+        """Do nothing."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Do nothing."""
+
+    def add_rows(self, rows: int):
+        """Do nothing."""
+
+
+NULL_STAGE = NullStage()
+
+
+class Stage:
+
+    """
+    Stage of the pipeline measured by a `Profiler`, entered with `stage`.
+
+    The peak memory of a stage includes the peaks of the stages nested in it, although entering a nested stage resets
+    the peak of the process.
+
+    Attributes:
+        name (str): name of the stage
+        path (str): names of the enclosing stages and of the stage, joined by "/"
+        depth (int): number of enclosing stages
+        rows (int): number of rows read or processed, None if the stage does not count them
+        counters (Dict[str, float]): time in seconds spent in parts of the stage, see `timed`
+        measurement (Measurement): wall time and resident memory of the stage
+    """
+
+    def __init__(self, profiler: "Profiler", name: str):
+        """Initialize Stage object."""
+        self.profiler = profiler
+        self.name = name
+        self.parent = profiler.stack[-1] if profiler.stack else None
+        self.path = name if self.parent is None else f"{self.parent.path}/{name}"
+        self.depth = len(profiler.stack)
+        self.rows: Optional[int] = None
+        self.counters: Dict[str, float] = {}
+        self.measurement = Measurement()
+        self.child_peak = 0
+        self.start_traced = 0
+        self.child_traced_peak = 0
+        self.traced_increase: Optional[int] = None
+        self.cprofile = profiler.cprofile_stage in (name, self.path)
+
+    def __enter__(self) -> "Stage":
+        """Start measuring the stage, keeping the peaks of the enclosing stage before they are reset."""
+        if self.parent is not None:
+            self.parent.child_peak = max(self.parent.child_peak, memory_usage()[1] or 0)
+        if tracemalloc.is_tracing():
+            if self.parent is not None:
+                self.parent.child_traced_peak = max(self.parent.child_traced_peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self.start_traced = tracemalloc.get_traced_memory()[0]
+        self.profiler.stages.append(self)
+        self.profiler.stack.append(self)
+        self.measurement.__enter__()
+        if self.cprofile:
+            self.profiler.enable_cprofile()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Stop measuring the stage and pass its peaks on to the enclosing stage."""
+        if self.cprofile:
+            self.profiler.disable_cprofile()
+        self.measurement.__exit__(*exc_info)
+        if self.measurement.peak_memory is not None:
+            self.measurement.peak_memory = max(self.measurement.peak_memory, self.child_peak)
+        if tracemalloc.is_tracing():
+            traced_peak = max(tracemalloc.get_traced_memory()[1], self.child_traced_peak)
+            self.traced_increase = max(traced_peak - self.start_traced, 0)
+            if self.parent is not None:
+                self.parent.child_traced_peak = max(self.parent.child_traced_peak, traced_peak)
+        if self.parent is not None:
+            self.parent.child_peak = max(self.parent.child_peak, self.measurement.peak_memory or 0)
+        self.profiler.stack.pop()
+
+    def add_rows(self, rows: int):
+        """Count rows read or processed by the stage."""
+        self.rows = rows if self.rows is None else self.rows + rows
+
+    def record(self) -> Dict:
+        """Get the measurements of the stage as plain data, with memory in MB."""
+        peak, increase = self.measurement.peak_memory, self.measurement.memory_increase
+        record = {
+            "stage": self.path,
+            "depth": self.depth,
+            "seconds": round(self.measurement.seconds, 4),
+            "rows": self.rows,
+            "rss_peak_mb": None if peak is None else round(peak / MB, 1),
+            "rss_increase_mb": None if increase is None else round(increase / MB, 1),
+        }
+        if self.traced_increase is not None:
+            record["traced_increase_mb"] = round(self.traced_increase / MB, 1)
+        record.update({counter: round(seconds, 4) for counter, seconds in self.counters.items()})
+        return record
+
+
+class Profiler:
+
+    """
+    Context manager profiling the stages of the pipeline run in it.
+
+    Every stage entered with `stage` while the profiler is active records its wall time, rows, peak resident memory
+    and, if trace_malloc is set, the peak of the memory allocated through Python, which is more precise but slows the
+    pipeline down. The stages named cprofile_stage, by name or path, are also run under cProfile.
+
+    Params:
+        trace_malloc (bool, optional): measure allocations with tracemalloc. Defaults to False.
+        cprofile_stage (str, optional): name or path of the stages to run under cProfile. Defaults to None.
+    """
+
+    def __init__(self, trace_malloc: bool = False, cprofile_stage: Optional[str] = None):
+        """Initialize Profiler object."""
+        self.trace_malloc = trace_malloc
+        self.cprofile_stage = cprofile_stage
+        self.cprofile = cProfile.Profile()
+        self.cprofile_depth = 0
+        self.stages: List[Stage] = []
+        self.stack: List[Stage] = []
+        self.previous: Optional[Profiler] = None
+        self.started_tracing = False
+        self.exact = False
+
+    def __enter__(self) -> "Profiler":
+        """Make the profiler the active one."""
+        global _profiler
+        self.previous, _profiler = _profiler, self
+        if self.trace_malloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        self.exact = reset_peak_memory()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Restore the profiler active before."""
+        global _profiler
+        _profiler = self.previous
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def enable_cprofile(self):
+        """Start cProfile, unless a stage it is already running for encloses this one."""
+        if self.cprofile_depth == 0:
+            self.cprofile.enable()
+        self.cprofile_depth += 1
+
+    def disable_cprofile(self):
+        """Stop cProfile when the outermost stage it runs for ends."""
+        self.cprofile_depth -= 1
+        if self.cprofile_depth == 0:
+            self.cprofile.disable()
+
+    @property
+    def profiled_cprofile(self) -> bool:
+        """Whether any stage was run under cProfile."""
+        return any(profiled_stage.cprofile for profiled_stage in self.stages)
+
+    def report(self) -> Dict:
+        """Get the measurements of all stages as plain data, in the order they started."""
+        return {
+            "exact_peak": self.exact,
+            "trace_malloc": self.trace_malloc,
+            "cprofile_stage": self.cprofile_stage,
+            "stages": [profiled_stage.record() for profiled_stage in self.stages],
+        }
+
+    def summary(self, cprofile_lines: int = 20) -> str:
+        """
+        Get the measurements as a table with nested stages indented, followed by the top cProfile entries.
+
+        Params:
+            cprofile_lines (int, optional): number of functions of the cProfile statistics to show. Defaults to 20.
+
+        Returns
+        -------
+            text of the table
+        """
+        traced = " traced MB" if self.trace_malloc else ""
+        lines = [f"{'stage':<48}{'seconds':>10}{'rows':>12}{'peak MB':>10}{'+MB':>9}{traced}"]
+        for profiled_stage in self.stages:
+            record = profiled_stage.record()
+            name = "  " * profiled_stage.depth + profiled_stage.name
+            rows = "" if record["rows"] is None else record["rows"]
+            peak = "" if record["rss_peak_mb"] is None else record["rss_peak_mb"]
+            increase = "" if record["rss_increase_mb"] is None else record["rss_increase_mb"]
+            line = f"{name:<48}{record['seconds']:>10.3f}{rows:>12}{peak:>10}{increase:>9}"
+            if self.trace_malloc:
+                line += f"{record.get('traced_increase_mb', ''):>10}"
+            lines.append(line)
+            for counter in profiled_stage.counters:
+                lines.append(f"{'  ' * (profiled_stage.depth + 1) + '(' + counter + ')':<48}{record[counter]:>10.3f}")
+        if not self.exact:
+            lines.append("peak memory is the peak of the process so far, it cannot be reset on this system")
+        if self.profiled_cprofile:
+            stats = io.StringIO()
+            pstats.Stats(self.cprofile, stream=stats).sort_stats("cumulative").print_stats(cprofile_lines)
+            lines.append(f"cProfile of {self.cprofile_stage}:")
+            lines.append(stats.getvalue().strip("\n"))
+        return "\n".join(lines)
+
+    def write(self, path: str):
+        """
+        Write the measurements to a JSON file, and the cProfile statistics next to it if any stage was profiled.
+
+        Params:
+            path (str): path of the JSON file, see `profile_path`
+        """
+        with open(path, "w") as profile_file:
+            json.dump(self.report(), profile_file, indent=2)
+        if self.profiled_cprofile:
+            self.cprofile.dump_stats(os.path.splitext(path)[0] + ".pstats")
+
+
+_profiler: Optional[Profiler] = None
+
+
+def stage(name: str):
+    """
+    Mark a stage of the pipeline, to be used as a context manager.
+
+    Params:
+        name (str): name of the stage
+
+    Returns
+    -------
+        Stage recorded by the active profiler, or a stage that records nothing if there is none
+    """
+    if _profiler is None:
+        return NULL_STAGE
+    return Stage(_profiler, name)
+
+
+class Timed:
+
+    """Context manager adding the time spent in it to a counter of the innermost stage."""
+
+    def __init__(self, current: Stage, counter: str):
+        """Initialize Timed object."""
+        self.current = current
+        self.counter = counter
+        self.start = 0.0
+
+    def __enter__(self) -> "Timed":
+        """Start the clock."""
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Add the time to the counter."""
+        seconds = time.perf_counter() - self.start
+        self.current.counters[self.counter] = self.current.counters.get(self.counter, 0.0) + seconds
+
+
+def timed(counter: str):
+    """
+    Time a part of a stage that is entered many times, such as reading a block of a compressed file.
+
+    Params:
+        counter (str): name of the counter of the innermost stage to add the time to
+
+    Returns
+    -------
+        context manager timing its body, or doing nothing if no stage is being profiled
+    """
+    if _profiler is None or not _profiler.stack:
+        return NULL_STAGE
+    return Timed(_profiler.stack[-1], counter)
+
+
+def profile_path(report_path: str) -> str:
+    """
+    Get the path of the profile written next to a qc report.
+
+    Params:
+        report_path (str): path to the qc report
+
+    Returns
+    -------
+        path of the profile file
+    """
+    return os.path.splitext(report_path)[0] + ".profile.json"
@@ -1,7 +1,7 @@
 """Module for qc difference functions."""
 
 from functools import wraps
-from typing import Dict, List, Union
+from typing import Any, Dict, List, Tuple, Union
 
 
 def validate_diff_args(f):
@@ -46,24 +46,305 @@ def validate_diff_args(f):
             message = f.__name__ + ": bad flags -- flags dict must contain 'show_all' and 'match' as bool"
             raise KeyError(message)
 
-        if type(a) != type(b) and not (a is None or b is None):
-            message = f.__name__ + ": operands have different types. a: " + str(type(a)) + " b: " + str(type(b))
-            raise TypeError(message)
-
-        if a is None and b is None:
-            message = f.__name__ + ": both values to compare are None, this shouldn't happen."
-            raise ValueError(message)
+        check_operands(f.__name__, a, b)
 
         return f(*args, **kwargs)
 
     return wrapped_diff
 
 
+def check_operands(name: str, a: Any, b: Any):
+    """
+    Check that two values can be compared.
+
+    Params:
+        name: name of the comparing function, for the error message
+        a: value to compare
+        b: value to compare
+
+    Raises
+    ------
+        TypeError: if operands have different types
+        ValueError: if both operands are None
+    """
+    if type(a) != type(b) and not (a is None or b is None):
+        message = name + ": operands have different types. a: " + str(type(a)) + " b: " + str(type(b))
+        raise TypeError(message)
+
+    if a is None and b is None:
+        message = name + ": both values to compare are None, this shouldn't happen."
+        raise ValueError(message)
+
+
+class ReportDiff:
+
+    """
+    Comparison of two reports.
+
+    The arguments are checked once by `diff_yaml`, and each method returns its difference together with whether
+    anything changed, instead of passing a flags dict through the recursion. The differences are the same as those of
+    the `diff_` functions, which wrap these methods.
+
+    Unless show_all is set, equal sections, entries and values are not walked: they are compared as a whole, which
+    Python does without leaving C, and their difference is taken from `unchanged`. Most entries of two releases are
+    the same, so the time taken depends mostly on the size of the change. Values of equal subtrees are therefore not
+    checked for types the comparison does not support.
+
+    Params:
+        show_all (bool): show all data or only differences
+    """
+
+    def __init__(self, show_all: bool):
+        """
+        Initialize a new instance of the `ReportDiff` class.
+
+        Params:
+            show_all (bool): show all data or only differences
+        """
+        self.show_all = show_all
+
+    def diff_yaml(self, a_yaml: Dict, b_yaml: Dict) -> Dict:
+        """
+        Compare two yaml files.
+
+        Params:
+            a_yaml: yaml file to compare
+            b_yaml: yaml file to compare
+
+        Returns
+        -------
+            Dict of differences
+        """
+        yaml_qc_compare = {}
+        for key in dict.fromkeys([*a_yaml, *b_yaml]):
+            a = a_yaml.get(key)
+            b = b_yaml.get(key)
+            check_operands("diff_elem", a, b)
+            if not self.show_all and a == b:
+                continue
+            diff_value, change = self.diff_elem(a, b)
+            if change or self.show_all:
+                yaml_qc_compare[key] = diff_value
+        return yaml_qc_compare
+
+    def diff_elem(self, a: Union[Dict, List, None], b: Union[Dict, List, None]) -> Tuple[Dict, bool]:
+        """
+        Compare two elements of a yaml file.
+
+        Params:
+            a: element to compare
+            b: element to compare
+
+        Returns
+        -------
+            Tuple of the Dict of differences and whether anything changed
+        """
+        show_all = self.show_all
+        node_compare = {}
+        missing = ""
+
+        a_dict = sources_dict(a)
+        b_dict = sources_dict(b)
+
+        change = False
+        for outer_key in dict.fromkeys([*a_dict, *b_dict]):
+            if outer_key not in a_dict:
+                b_source = b_dict[outer_key]
+                a_source = get_empty(b_source)
+                missing = "-"
+            elif outer_key not in b_dict:
+                a_source = a_dict[outer_key]
+                b_source = get_empty(a_source)
+                missing = "+"
+            else:
+                b_source = b_dict[outer_key]
+                a_source = a_dict[outer_key]
+                if not show_all and a_source == b_source:
+                    node_compare[missing + outer_key] = {}
+                    continue
+
+            source = {}
+            for inner_key, a_value in a_source.items():
+                diff_value, inner_change = self.diff_type(a_value, b_source.get(inner_key))
+                if inner_change or show_all:
+                    source[missing + inner_key] = diff_value
+                change = change or inner_change
+
+            node_compare[missing + outer_key] = source
+
+        return node_compare, change
+
+    def diff_type(
+        self, a: Union[List, Dict, str, int, None], b: Union[List, Dict, str, int, None]
+    ) -> Tuple[Union[List, Dict, str, int, None], bool]:
+        """
+        Compare two elements of a given type.
+
+        Params:
+            a: element to compare
+            b: element to compare
+
+        Returns
+        -------
+            Tuple of the Dict, List, str, int of differences, or None if no differences, and whether anything changed
+        """
+        if type(a) is not type(b) or a is None:
+            check_operands("diff_type", a, b)
+        elif not self.show_all and type(a) in (dict, list) and a == b:
+            return self.unchanged(a), False
+        case_type = a if a is not None else b
+        if isinstance(case_type, str):
+            return self.diff_str(a, b)
+        if isinstance(case_type, int):
+            return self.diff_int(a, b)
+        if isinstance(case_type, dict):
+            return self.diff_dict(a, b)
+        if isinstance(case_type, list):
+            if len(case_type) > 0 and type(case_type[0]) is dict:
+                return self.diff_elem(a, b)
+            return self.diff_list(a, b)
+        message = "diff_type: type of operands not implemented: " + str(type(case_type))
+        raise NotImplementedError(message)
+
+    def unchanged(self, value: Union[Dict, List]) -> Union[Dict, List]:
+        """
+        Get the difference of a dict or list with an equal one, without showing all data.
+
+        Params:
+            value: dict or list compared
+
+        Returns
+        -------
+            Dict or List of differences, with an empty entry for each source of a list of sources
+        """
+        if isinstance(value, list):
+            if len(value) > 0 and type(value[0]) is dict:
+                return {key: {} for key in sources_dict(value)}
+            return []
+        return {}
+
+    def diff_dict(self, a: Union[Dict, None], b: Union[Dict, None]) -> Tuple[Dict, bool]:
+        """
+        Compare two dictionaries.
+
+        Params:
+            a: dict to compare
+            b: dict to compare
+
+        Returns
+        -------
+            Tuple of the Dict of differences and whether anything changed
+        """
+        show_all = self.show_all
+        change = a is None or b is None
+
+        diff = {}
+        a = {} if a is None else a
+        b = {} if b is None else b
+
+        missing = ""
+        for key in dict.fromkeys([*a, *b]):
+            if key not in a:
+                missing = "-"
+            elif key not in b:
+                missing = "+"
+
+            a_value = a.get(key)
+            b_value = b.get(key)
+            if a_value is None and b_value is None:
+                diff_value = None
+                key_change = not (key in a and key in b)
+            else:
+                diff_value, key_change = self.diff_type(a_value, b_value)
+
+            if key_change or show_all or missing != "":
+                diff[missing + key] = diff_value
+            change = change or key_change
+
+        return diff, change
+
+    def diff_list(self, a: Union[List, None], b: Union[List, None]) -> Tuple[List, bool]:
+        """
+        Compare two lists.
+
+        Params:
+            a: list to compare
+            b: list to compare
+
+        Returns
+        -------
+            Tuple of the List of differences and whether anything changed
+        """
+        show_all = self.show_all
+        diff = []
+        a = [] if a is None else a
+        b = [] if b is None else b
+
+        # Check if either list contains a list
+        if any(isinstance(n, list) and len(n) == 0 for n in a + b):
+            message = "diff_list: found list containing list, structure not supported."
+            raise NotImplementedError(message)
+
+        a_as_keys = dict(zip(a, a, strict=True))
+        b_as_keys = dict(zip(b, b, strict=True))
+
+        change = False
+        for key in dict.fromkeys(a + b):
+            diff_value, item_change = self.diff_type(a_as_keys.get(key), b_as_keys.get(key))
+            if item_change or show_all:
+                diff.append(diff_value)
+            change = change or item_change
+
+        return diff, change
+
+    def diff_str(self, a: Union[str, None], b: Union[str, None]) -> Tuple[Union[str, List, None], bool]:
+        """
+        Compare two strings.
+
+        Params:
+            a: string to compare
+            b: string to compare
+
+        Returns
+        -------
+            Tuple of the List or str of differences, or None if no differences, and whether anything changed
+        """
+        if a == b:
+            return (a if self.show_all else None), False
+        if a is None:
+            return "-" + b, True
+        if b is None:
+            return "+" + a, True
+        return ["+" + a, "-" + b], True
+
+    def diff_int(self, a: Union[int, None], b: Union[int, None]) -> Tuple[Union[int, str, Dict, None], bool]:
+        """
+        Compare two integers.
+
+        Params:
+            a: integer to compare
+            b: integer to compare
+
+        Returns
+        -------
+            Tuple of the Dict, str, or int of differences, or None if no differences, and whether anything changed
+        """
+        if a == b:
+            return (a if self.show_all else None), False
+        if a is None:
+            return "-" + str(b), True
+        if b is None:
+            return "+" + str(a), True
+        return {"change": a - b, "new": a, "old": b}, True
+
+
 # @validate_diff_args
 def diff_yaml(a_yaml: Dict, b_yaml: Dict, show_all: bool) -> Dict:
     """
     Compare two yaml files.
 
+    The arguments are checked once here, the comparison itself is done by `ReportDiff`.
+
     Params:
         a_yaml: yaml file to compare
         b_yaml: yaml file to compare
@@ -72,17 +353,17 @@ def diff_yaml(a_yaml: Dict, b_yaml: Dict, show_all: bool) -> Dict:
     Returns
     -------
         Dict of differences
-    """
-    flags = {"show_all": show_all, "change": False}
 
-    yaml_qc_compare = {}
-    for key in dict.fromkeys(list(a_yaml.keys()) + list(b_yaml.keys())):
-        diff_value = diff_elem(a_yaml.get(key), b_yaml.get(key), flags)
-        if flags["change"] or flags["show_all"]:
-            yaml_qc_compare[key] = diff_value
-        flags["change"] = False
-
-    return yaml_qc_compare
+    Raises
+    ------
+        KeyError: if show_all is not bool
+        TypeError: if the yaml files are not dicts
+    """
+    if not isinstance(show_all, bool):
+        raise KeyError("diff_yaml: bad flags -- show_all must be bool")
+    if not isinstance(a_yaml, dict) or not isinstance(b_yaml, dict):
+        raise TypeError("diff_yaml: yaml files to compare must be dicts")
+    return ReportDiff(show_all).diff_yaml(a_yaml, b_yaml)
 
 
 @validate_diff_args
@@ -99,40 +380,8 @@ def diff_elem(a: Union[Dict, List, None], b: Union[Dict, List, None], flags: Dic
     -------
         List or Dict of differences, or None if no differences
     """
-    node_compare = {}
-    missing = ""
-
-    a_dict = sources_dict(a)
-    b_dict = sources_dict(b)
-
-    all_keys = dict.fromkeys(list(a_dict.keys()) + list(b_dict.keys()))
-
-    change = False
-    for outer_key in all_keys:
-        if outer_key not in a_dict.keys():
-            b_source = b_dict.get(outer_key)
-            a_source = get_empty(b_dict.get(outer_key))
-            missing = "-"
-        elif outer_key not in b_dict.keys():
-            a_source = a_dict.get(outer_key)
-            b_source = get_empty(a_dict.get(outer_key))
-            missing = "+"
-        else:
-            b_source = b_dict.get(outer_key)
-            a_source = a_dict.get(outer_key)
-
-        source = {}
-        for inner_key in a_source.keys():
-            diff_value = diff_type(a_source.get(inner_key), b_source.get(inner_key), flags)
-            if flags["change"] or flags["show_all"]:
-                source[missing + inner_key] = diff_value
-            change = any([change, flags["change"]])
-            flags["change"] = False
-
-        node_compare[missing + outer_key] = source
-
-    flags["change"] = change
-    return node_compare
+    diff, flags["change"] = ReportDiff(flags["show_all"]).diff_elem(a, b)
+    return diff
 
 
 @validate_diff_args
@@ -151,26 +400,7 @@ def diff_type(
     -------
         Dict, List, str, int of differences, or None if no differences
     """
-    diff: Union[Dict, List, int, str, None]
-    case_type = a if a is not None else b
-    match case_type:
-        case dict():
-            diff = diff_dict(a, b, flags)
-        case list():
-            if len(case_type) > 0 and type(case_type[0]) is dict:
-                diff = diff_elem(a, b, flags)
-            else:
-                diff = diff_list(a, b, flags)
-        case str():
-            diff = diff_str(a, b, flags)
-        case int():
-            diff = diff_int(a, b, flags)
-        case None:
-            diff = None
-        case _:
-            message = "diff_type: type of operands not implemented: " + str(type(case_type))
-            raise NotImplementedError(message)
-
+    diff, flags["change"] = ReportDiff(flags["show_all"]).diff_type(a, b)
     return diff
 
 
@@ -188,35 +418,7 @@ def diff_dict(a: Union[Dict, None], b: Union[Dict, None], flags: Dict) -> Dict:
     -------
         Dict of differences
     """
-    if a is None or b is None:
-        change = True
-    else:
-        change = False
-
-    diff = {}
-    a = {} if a is None else a
-    b = {} if b is None else b
-
-    missing = ""
-    for key in dict.fromkeys(list(a.keys()) + list(b.keys())):
-        if key not in a.keys():
-            missing = "-"
-        elif key not in b.keys():
-            missing = "+"
-
-        if a.get(key) is None and b.get(key) is None:
-            diff_value = None
-            if not (key in a.keys() and key in b.keys()):
-                flags["change"] = True
-        else:
-            diff_value = diff_type(a.get(key), b.get(key), flags)
-
-        if flags["change"] or flags["show_all"] or missing != "":
-            diff[missing + key] = diff_value
-        change = any([change, flags["change"]])
-        flags["change"] = False
-
-    flags["change"] = change
+    diff, flags["change"] = ReportDiff(flags["show_all"]).diff_dict(a, b)
     return diff
 
 
@@ -234,27 +436,7 @@ def diff_list(a: Union[List, None], b: Union[List, None], flags: Dict) -> List:
     -------
         List of differences
     """
-    diff = []
-    a = [] if a is None else a
-    b = [] if b is None else b
-
-    # Check if either list contains a list
-    if any(isinstance(n, list) and len(n) == 0 for n in a + b):
-        message = "diff_list: found list containing list, structure not supported."
-        raise NotImplementedError(message)
-
-    a_as_keys = dict(zip(a, a, strict=True))
-    b_as_keys = dict(zip(b, b, strict=True))
-
-    change = False
-    for key in dict.fromkeys(a + b):
-        diff_value = diff_type(a_as_keys.get(key), b_as_keys.get(key), flags)
-        if flags["change"] or flags["show_all"]:
-            diff.append(diff_value)
-        change = any([change, flags["change"]])
-        flags["change"] = False
-
-    flags["change"] = change
+    diff, flags["change"] = ReportDiff(flags["show_all"]).diff_list(a, b)
     return diff
 
 
@@ -272,20 +454,7 @@ def diff_str(a: Union[str, None], b: Union[str, None], flags: Dict) -> Union[str
     -------
         List or str of differences, or None if no differences
     """
-    flags["change"] = True
-    diff: Union[str, List, None]
-    if a == b:
-        flags["change"] = False
-        if flags["show_all"]:
-            diff = a
-        else:
-            diff = None
-    elif a is None:
-        diff = "-" + b
-    elif b is None:
-        diff = "+" + a
-    else:
-        diff = ["+" + a, "-" + b]
+    diff, flags["change"] = ReportDiff(flags["show_all"]).diff_str(a, b)
     return diff
 
 
@@ -303,20 +472,7 @@ def diff_int(a: Union[int, None], b: Union[int, None], flags: Dict) -> Union[int
     -------
         Dict, str, or int of differences, or None if no differences
     """
-    flags["change"] = True
-    diff: Union[int, str, Dict, None]
-    if a == b:
-        flags["change"] = False
-        if flags["show_all"]:
-            diff = a
-        else:
-            diff = None
-    elif a is None:
-        diff = "-" + str(b)
-    elif b is None:
-        diff = "+" + str(a)
-    else:
-        diff = {"change": a - b, "new": a, "old": b}
+    diff, flags["change"] = ReportDiff(flags["show_all"]).diff_int(a, b)
     return diff
 
 
@@ -395,3 +551,53 @@ def sources_dict(a: Union[Dict, List[Dict]]) -> Dict:
             raise TypeError(message)
 
     return a_dict
+
+
+def release_series(reports: Dict[str, Dict]) -> Dict:
+    """
+    Collect the counts of several releases of a report into one time series per metric.
+
+    Each report is walked once. Its entries are aligned by name or uri the way `sources_dict` does, and every integer
+    value is added to the series at its path, such as the `total_number` of a predicate of a provided_by. A series
+    has one value per release, None for releases without the value.
+
+    Params:
+        reports: plain reports by release, in release order, as `read_report` returns them
+
+    Returns
+    -------
+        Dict of the releases and of the series, nested like the entries of the reports
+
+    Raises
+    ------
+        TypeError: if a value is a count in one release and an entry in another
+    """
+    series: Dict = {}
+    for release, report in enumerate(reports.values()):
+        add_series(series, report, release, len(reports))
+    return {"releases": list(reports), "series": series}
+
+
+def add_series(series: Dict, value: Dict, release: int, releases: int):
+    """
+    Add the integer values of one release of a report to the series.
+
+    Params:
+        series: series of the releases added so far, added to in place
+        value: report, or entry of a report
+        release: index of the release
+        releases: number of releases
+    """
+    for key, item in value.items():
+        if isinstance(item, list) and len(item) > 0 and type(item[0]) is dict:
+            item = sources_dict(item)
+        if isinstance(item, dict):
+            entry_series = series.setdefault(key, {})
+            if not isinstance(entry_series, dict):
+                raise TypeError(f"add_series: {key} is a count in an earlier release and an entry in release {release}")
+            add_series(entry_series, item, release, releases)
+        elif type(item) is int:
+            value_series = series.setdefault(key, [None] * releases)
+            if not isinstance(value_series, list):
+                raise TypeError(f"add_series: {key} is an entry in an earlier release and a count in release {release}")
+            value_series[release] = item
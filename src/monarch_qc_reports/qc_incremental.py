@@ -0,0 +1,332 @@
+"""Module for computing a qc report incrementally from the report of a previous release."""
+
+import json
+import os
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from monarch_qc_reports import __version__
+from monarch_qc_reports.model.merged_kg import MergedKG, MergeQC, NodeIndex, arrow_strings
+from monarch_qc_reports.qc_parallel import EDGE_COLUMNS, NODE_COLUMNS
+from monarch_qc_reports.qc_utils import (
+    ReportContainer,
+    create_edges_report,
+    create_nodes_report,
+    fill_nodes_na,
+)
+from monarch_qc_reports.report_cache import series_args
+from monarch_qc_reports.report_io import YAML_LOADER
+
+NODE_SECTIONS = ["nodes", "duplicate_nodes"]
+FNV_PRIME = 0x100000001B3
+
+
+def column_hashes(col: pd.Series) -> np.ndarray:
+    """
+    Hash every value of a column.
+
+    Arrow-backed strings are dictionary-encoded in Arrow first, so that only their unique values are converted and
+    hashed.
+
+    Params:
+        col (pd.Series): column to hash
+
+    Returns
+    -------
+        np.ndarray of uint64 hashes of the values
+    """
+    if arrow_strings(col) is None:
+        return pd.util.hash_pandas_object(col, index=False).to_numpy()
+    codes, uniques = pd.factorize(col)
+    hashes = pd.util.hash_array(np.append(np.asarray(uniques, dtype=object), None))
+    return hashes[codes]
+
+
+def row_hashes(df: pd.DataFrame, columns: List[str]) -> np.ndarray:
+    """
+    Hash the values of some columns of every row of a table.
+
+    Params:
+        df (pd.DataFrame): table to hash
+        columns (List[str]): columns to hash, columns not in the table are skipped
+
+    Returns
+    -------
+        np.ndarray of uint64 hashes of the column names and values of each row
+    """
+    columns = [col for col in columns if col in df.columns]
+    hashes = np.full(len(df), pd.util.hash_array(np.array([",".join(columns)], dtype=object))[0])
+    for col in columns:
+        hashes = hashes * np.uint64(FNV_PRIME) ^ column_hashes(df[col])
+    return pd.util.hash_array(hashes)
+
+
+def group_sums(groups: np.ndarray, hashes: np.ndarray, group_count: int) -> np.ndarray:
+    """
+    Add up hashes per group, wrapping around at 2**64.
+
+    The sum of the hashes of a group does not depend on the order of its rows, and changes if any row is changed,
+    added or removed.
+
+    Params:
+        groups (np.ndarray): group code of each hash, -1 for no group
+        hashes (np.ndarray): uint64 hashes
+        group_count (int): number of groups
+
+    Returns
+    -------
+        np.ndarray of the uint64 sum of the hashes of each group
+    """
+    sums = np.zeros(group_count, dtype=np.uint64)
+    valid = groups >= 0
+    np.add.at(sums, groups[valid], hashes[valid])
+    return sums
+
+
+def node_id_hashes(nodes: pd.DataFrame, node_index: NodeIndex, group_by: str = "provided_by") -> np.ndarray:
+    """
+    Hash all the node rows of each node id.
+
+    Params:
+        nodes (pd.DataFrame): nodes of the knowledge graph
+        node_index (NodeIndex): membership index of the node ids
+        group_by (str, optional): column the nodes are grouped by in the node types of the edges report.
+            Defaults to "provided_by".
+
+    Returns
+    -------
+        np.ndarray of uint64 hashes, one per node id in the order of the node index
+    """
+    hashes = row_hashes(nodes, NODE_COLUMNS + [group_by])
+    sums = group_sums(node_index.codes(nodes["id"]), hashes, len(node_index))
+    # mix the sums, so that the sums of several ids taken later do not add up linearly
+    return pd.util.hash_array(sums)
+
+
+def partition_fingerprints(
+    df: pd.DataFrame,
+    group_by: str = "provided_by",
+    node_index: NodeIndex = None,
+    node_hashes: np.ndarray = None,
+) -> Dict[str, str]:
+    """
+    Fingerprint every group of a table.
+
+    Only the columns used by the report are hashed, and the number of rows of each group. The fingerprint of a group
+    of edges also covers the node rows of the subjects and objects of its edges, since
+    they make up the `missing` counts and node types of the group. A node id that is added or removed, or a node row
+    of an id that is changed, changes the fingerprints of exactly the edge groups using that id.
+
+    Params:
+        df (pd.DataFrame): table to fingerprint
+        group_by (str, optional): column to group rows by. Defaults to "provided_by".
+        node_index (NodeIndex, optional): membership index of the node ids, needed for edges
+        node_hashes (np.ndarray, optional): `node_id_hashes` of the nodes, needed for edges
+
+    Returns
+    -------
+        Dict of fingerprint by group
+    """
+    if len(df) == 0 or group_by not in df.columns:
+        return {}
+    groups, group_values = pd.factorize(df[group_by])
+    counts = np.bincount(groups[groups >= 0], minlength=len(group_values))
+    columns = EDGE_COLUMNS if "subject" in df.columns else NODE_COLUMNS
+    parts = [counts, group_sums(groups, row_hashes(df, columns), len(group_values))]
+    if "subject" in df.columns:
+        node_count = max(len(node_index), 1)
+        endpoint_groups = np.concatenate([groups, groups]).astype(np.int64)
+        codes = node_index.codes(pd.concat([df["subject"], df["object"]], ignore_index=True))
+        used = (endpoint_groups >= 0) & (codes >= 0)
+        # each node id counts once per group, however many edges of the group use it
+        pairs = pd.unique(endpoint_groups[used] * node_count + codes[used])
+        parts.append(group_sums(pairs // node_count, node_hashes[pairs % node_count], len(group_values)))
+    return {
+        str(group): "-".join(f"{part[code]:x}" for part in parts) for code, group in enumerate(group_values.tolist())
+    }
+
+
+def create_fingerprints(kg: MergedKG, qc: MergeQC, data_type: type = dict, group_by: str = "provided_by") -> Dict:
+    """
+    Fingerprint the groups of every section of the report of a knowledge graph.
+
+    Params:
+        kg (MergedKG): merged kg the report is created for
+        qc (MergeQC): qc data the report is created for
+        data_type (type, optional): Type of data container of the report. Defaults to `dict`.
+        group_by (str, optional): column the report groups by. Defaults to "provided_by".
+
+    Returns
+    -------
+        Dict of the report parameters and the fingerprints of the groups of each section
+    """
+    qc = qc.complete(kg)
+    nodes = fill_nodes_na(kg.nodes)
+    node_hashes = node_id_hashes(nodes, kg.node_index, group_by)
+    sections = {"nodes": nodes, "duplicate_nodes": fill_nodes_na(qc.duplicate_nodes)}
+    sections.update(edges=kg.edges, dangling_edges=qc.dangling_edges, duplicate_edges=qc.duplicate_edges)
+    return {
+        "version": __version__,
+        "data_type": data_type.__name__,
+        "group_by": group_by,
+        "sections": {
+            section: partition_fingerprints(df, group_by, kg.node_index, node_hashes)
+            for section, df in sections.items()
+        },
+    }
+
+
+def rebuild_series(value):
+    """
+    Build the series of a loaded report again the way the report builds them.
+
+    Series loaded from YAML hold copies of objects that the series of a computed report share, which would change
+    the anchors of the report written again.
+
+    Params:
+        value: report, or part of a report
+
+    Returns
+    -------
+        value with every numpy or string series built again
+    """
+    if isinstance(value, dict):
+        return {key: rebuild_series(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [rebuild_series(item) for item in value]
+    if isinstance(value, pd.Series) and isinstance(value.dtype, (np.dtype, pd.StringDtype)):
+        return pd.Series(*series_args(value))
+    return value
+
+
+def fingerprints_path(report_path: str) -> str:
+    """
+    Get the path of the fingerprints written next to a qc report.
+
+    Params:
+        report_path (str): path to the qc report
+
+    Returns
+    -------
+        path of the fingerprints file
+    """
+    return os.path.splitext(report_path)[0] + ".fingerprints.json"
+
+
+def load_report(report_path: str) -> Tuple[Dict, Dict]:
+    """
+    Load a qc report written by `run` and the fingerprints written next to it.
+
+    The report holds pickled Python objects and is loaded with the unsafe YAML loader, so it must be a trusted file.
+
+    Params:
+        report_path (str): path to the qc report
+
+    Returns
+    -------
+        Tuple of the report and the fingerprints
+    """
+    with open(report_path) as report_file:
+        report = rebuild_series(yaml.load(report_file, Loader=YAML_LOADER))  # noqa: S506, trusted reports only
+    with open(fingerprints_path(report_path)) as fingerprints_file:
+        fingerprints = json.load(fingerprints_file)
+    return report, fingerprints
+
+
+def section_entries(section: Union[List[Dict], Dict, None]) -> Dict[str, Dict]:
+    """
+    Get the entries of a report section by group.
+
+    Params:
+        section (Union[List[Dict], Dict, None]): report section, as a list or dict of entries
+
+    Returns
+    -------
+        Dict of entry by group
+    """
+    if section is None:
+        return {}
+    entries = section.values() if isinstance(section, dict) else section
+    return {str(entry["name"][0]): entry for entry in entries}
+
+
+def create_incremental_qc_report(
+    kg: MergedKG,
+    qc: MergeQC,
+    previous_report: Optional[Dict] = None,
+    previous_fingerprints: Optional[Dict] = None,
+    data_type: type = dict,
+    group_by: str = "provided_by",
+) -> Tuple[Dict, Dict]:
+    """
+    Interface for generating qc report from merged kg, reusing the unchanged groups of a previous report.
+
+    Only the groups whose fingerprint changed since the previous report are computed, see `partition_fingerprints`,
+    the entries of the other groups are taken from the previous report. Everything is computed if the previous
+    report was created with other parameters or by another version. The report is the same as `create_qc_report`.
+
+    Params:
+        kg (MergedKG): merged kg to generate qc report for
+        qc (MergeQC): qc data to generate qc report for
+        previous_report (Dict, optional): report of the previous release
+        previous_fingerprints (Dict, optional): `create_fingerprints` of the previous release
+        data_type (type, optional): Type of data container to use. Supported values are `list` and `dict`.
+            Defaults to `dict`.
+        group_by (str, optional): column to group nodes by. Defaults to "provided_by".
+
+    Returns
+    -------
+        Tuple of the qc report and its fingerprints, to pass on to the report of the next release
+    """
+    ReportContainer(data_type)  # check the data type before hashing anything
+    qc = qc.complete(kg)
+    fingerprints = create_fingerprints(kg, qc, data_type, group_by)
+    previous_report = previous_report or {}
+    previous_sections = (previous_fingerprints or {}).get("sections", {})
+    if any((previous_fingerprints or {}).get(key) != fingerprints[key] for key in ["version", "data_type", "group_by"]):
+        previous_sections = {}
+
+    nodes = fill_nodes_na(kg.nodes)
+    node_namespaces = kg.namespaces("nodes")["id"]
+    tables = {
+        "nodes": nodes,
+        "duplicate_nodes": fill_nodes_na(qc.duplicate_nodes),
+        "edges": kg.edges,
+        "dangling_edges": qc.dangling_edges,
+        "duplicate_edges": qc.duplicate_edges,
+    }
+    report = {}
+    for section, df in tables.items():
+        section_fingerprints = fingerprints["sections"][section]
+        previous_entries = section_entries(previous_report.get(section))
+        reused = {
+            group: previous_entries[group]
+            for group, fingerprint in section_fingerprints.items()
+            if previous_sections.get(section, {}).get(group) == fingerprint and group in previous_entries
+        }
+        entries = dict(reused)
+        if len(reused) < len(section_fingerprints):
+            rows = np.flatnonzero(~df[group_by].astype("string").isin(list(reused)).to_numpy(dtype=bool, na_value=True))
+            if section in NODE_SECTIONS:
+                namespaces = node_namespaces if section == "nodes" else qc.namespaces(section).get("id")
+                computed = create_nodes_report(
+                    df.iloc[rows],
+                    data_type=data_type,
+                    group_by=group_by,
+                    namespaces=None if namespaces is None else namespaces.iloc[rows],
+                )
+            else:
+                namespaces = (kg if section == "edges" else qc).namespaces(section)
+                computed = create_edges_report(
+                    df.iloc[rows], nodes, data_type, group_by, kg.node_index, namespaces.iloc[rows], node_namespaces
+                )
+            entries.update(section_entries(computed))
+        section_report = ReportContainer(data_type)
+        for group in sorted(entries):
+            section_report.add(entries[group])
+        report[section] = section_report.data
+
+    return report, fingerprints
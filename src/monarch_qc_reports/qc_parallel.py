@@ -0,0 +1,182 @@
+"""Module for computing qc report sections in parallel."""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Union
+
+import numpy as np
+import pandas as pd
+
+from monarch_qc_reports.model.merged_kg import MergedKG, MergeQC, NodeIndex, namespace_categorical
+from monarch_qc_reports.qc_utils import (
+    ReportContainer,
+    create_edges_report,
+    create_nodes_report,
+    fill_nodes_na,
+)
+
+NODE_COLUMNS = ["id", "category", "in_taxon"]
+EDGE_COLUMNS = ["subject", "predicate", "object", "category"]
+
+# Nodes shared by every task of a worker process, set once by init_worker
+worker_nodes: Dict = {}
+
+
+def init_worker(nodes: pd.DataFrame, node_namespaces: pd.Series):
+    """
+    Store the nodes needed by the edge report tasks in a worker process.
+
+    Params:
+        nodes (pd.DataFrame): nodes with the columns used by the report
+        node_namespaces (pd.Series): categorical namespaces of the node ids
+    """
+    worker_nodes["nodes"] = nodes
+    worker_nodes["namespaces"] = node_namespaces
+    worker_nodes["node_index"] = NodeIndex(nodes["id"])
+
+
+def nodes_report_task(
+    nodes: pd.DataFrame, namespaces: pd.Series, data_type: type, group_by: str
+) -> Union[List[Dict], Dict]:
+    """
+    Create the nodes report for a partition of nodes.
+
+    Params:
+        nodes (pd.DataFrame): partition of the nodes
+        namespaces (pd.Series): categorical namespaces of the node ids of the partition
+        data_type (type): Type of data container to use.
+        group_by (str): column to group nodes by
+
+    Returns
+    -------
+        List or Dict of nodes report for the groups in the partition
+    """
+    return create_nodes_report(nodes, data_type=data_type, group_by=group_by, namespaces=namespaces)
+
+
+def edges_report_task(edges: pd.DataFrame, data_type: type, group_by: str) -> Union[List[Dict], Dict]:
+    """
+    Create the edges report for a partition of edges against the nodes of the worker.
+
+    Params:
+        edges (pd.DataFrame): partition of the edges
+        data_type (type): Type of data container to use.
+        group_by (str): column to group edges by
+
+    Returns
+    -------
+        List or Dict of edges report for the groups in the partition
+    """
+    return create_edges_report(
+        edges,
+        worker_nodes["nodes"],
+        data_type,
+        group_by,
+        worker_nodes["node_index"],
+        node_namespaces=worker_nodes["namespaces"],
+    )
+
+
+def partition_groups(df: pd.DataFrame, group_by: str, partitions: int) -> List[np.ndarray]:
+    """
+    Split the rows of a table into partitions of whole groups with about the same number of rows.
+
+    Each partition holds a contiguous range of the sorted group keys, so reports of the partitions can be joined in
+    order.
+
+    Params:
+        df (pd.DataFrame): table to partition
+        group_by (str): column to group rows by
+        partitions (int): maximum number of partitions
+
+    Returns
+    -------
+        List of arrays of row positions, one per non-empty partition
+    """
+    group_rows = list(df.groupby(group_by, observed=True).indices.values())
+    if len(group_rows) == 0:
+        return []
+    sizes = np.array([len(rows) for rows in group_rows])
+    starts = np.cumsum(sizes) - sizes
+    part = np.minimum(starts * partitions // sizes.sum(), partitions - 1)
+    return [np.concatenate([rows for rows, p in zip(group_rows, part, strict=True) if p == i]) for i in np.unique(part)]
+
+
+def join_reports(reports: List[Union[List[Dict], Dict]], data_type: type) -> Union[List[Dict], Dict]:
+    """
+    Join the reports of consecutive partitions into one report.
+
+    Params:
+        reports (List[Union[List[Dict], Dict]]): reports of the partitions, in order
+        data_type (type): Type of data container to use.
+
+    Returns
+    -------
+        List or Dict of the joined report
+    """
+    joined = ReportContainer(data_type)
+    for report in reports:
+        for entry in report.values() if isinstance(report, dict) else report:
+            joined.add(entry)
+    return joined.data
+
+
+def create_parallel_qc_report(
+    kg: MergedKG, qc: MergeQC, data_type: type = dict, group_by: str = "provided_by", workers: int = 2
+) -> Dict:
+    """
+    Interface for generating qc report from merged kg on a pool of worker processes.
+
+    Every section is split into partitions of whole groups, one per worker, and only the columns the report uses are
+    sent to the workers. The report is the same as `create_qc_report`.
+
+    Params:
+        kg (MergedKG): merged kg to generate qc report for
+        qc (MergeQC): qc data to generate qc report for
+        data_type (type, optional): Type of data container to use. Supported values are `list` and `dict`.
+            Defaults to `dict`.
+        group_by (str, optional): column to group nodes by. Defaults to "provided_by".
+        workers (int, optional): number of worker processes. Defaults to 2.
+
+    Returns
+    -------
+        Dict of qc report
+    """
+    ReportContainer(data_type)  # check the data type before starting the workers
+    qc = qc.complete(kg)
+    nodes = fill_nodes_na(kg.nodes)
+    nodes = nodes[[col for col in NODE_COLUMNS + [group_by] if col in nodes.columns]]
+    node_namespaces = kg.namespaces("nodes")["id"]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(nodes, node_namespaces)) as pool:
+        futures: Dict[str, List] = {}
+        for section, section_nodes in [("nodes", nodes), ("duplicate_nodes", fill_nodes_na(qc.duplicate_nodes))]:
+            futures[section] = []
+            if len(section_nodes) == 0:
+                continue
+            namespaces = node_namespaces if section == "nodes" else namespace_categorical(section_nodes["id"])
+            for rows in partition_groups(section_nodes, group_by, workers):
+                futures[section].append(
+                    pool.submit(
+                        nodes_report_task,
+                        section_nodes.iloc[rows],
+                        namespaces.iloc[rows],
+                        data_type,
+                        group_by,
+                    )
+                )
+        for section, edges in [
+            ("edges", kg.edges),
+            ("dangling_edges", qc.dangling_edges),
+            ("duplicate_edges", qc.duplicate_edges),
+        ]:
+            futures[section] = []
+            if len(edges) == 0:
+                continue
+            edges = edges[[col for col in EDGE_COLUMNS + [group_by] if col in edges.columns]]
+            for rows in partition_groups(edges, group_by, workers):
+                futures[section].append(pool.submit(edges_report_task, edges.iloc[rows], data_type, group_by))
+
+        return {
+            section: join_reports([future.result() for future in section_futures], data_type)
+            for section, section_futures in futures.items()
+        }
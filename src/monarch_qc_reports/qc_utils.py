@@ -1,21 +1,35 @@
 """Utility functions for qc reports."""
 
-from typing import Dict, List, Union
+from functools import partial
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
+import numpy as np
 import pandas as pd
 
 # from grape import Graph  # type: ignore
-from monarch_qc_reports.model.merged_kg import MergedKG, MergeQC
-
-
-def create_edge_report(edges_grouped_by, edges_grouped_by_values, unique_id_from_nodes) -> Dict:
+from monarch_qc_reports import profiling
+from monarch_qc_reports.model.merged_kg import (
+    EDGE_KEY_COLUMNS,
+    DuplicateFinder,
+    MergedKG,
+    MergeQC,
+    NodeIndex,
+    encode_namespaces,
+    find_dangling_edges,
+    namespace_categorical,
+    sorted_categorical,
+)
+from monarch_qc_reports.report_cache import ReportCache, frame_hash
+
+
+def create_edge_report(edges_grouped_by, edges_grouped_by_values, node_index: NodeIndex) -> Dict:
     """
     Create a report for a given edge type.
 
     Params:
         edges_grouped_by: the name of the edge type
         edges_grouped_by_values: the values for the edge type
-        unique_id_from_nodes: the unique ids from the nodes
+        node_index (NodeIndex): membership index of the node ids
 
     Returns
     -------
@@ -31,11 +45,9 @@ def create_edge_report(edges_grouped_by, edges_grouped_by_values, unique_id_from
         "categories": col_to_yaml(edges_grouped_by_values["category"]),
         "total_number": edges_grouped_by_values["id"].size,
         "missing_old": len(
-            get_missing_old(
-                [edges_grouped_by_values["subject"], edges_grouped_by_values["object"]], unique_id_from_nodes
-            )
+            get_missing_old([edges_grouped_by_values["subject"], edges_grouped_by_values["object"]], node_index)
         ),
-        "missing": len(get_missing(edges_grouped_by_values, ["subject", "object"], unique_id_from_nodes)),
+        "missing": len(get_missing(edges_grouped_by_values, ["subject", "object"], node_index)),
         "predicates": [],
         "node_types": [],
     }
@@ -43,32 +55,32 @@ def create_edge_report(edges_grouped_by, edges_grouped_by_values, unique_id_from
     return edge_object
 
 
-def get_missing(edges: pd.DataFrame, cols: List[str], ids: pd.Series) -> pd.Series:
+def get_missing(edges: pd.DataFrame, cols: List[str], node_index: NodeIndex) -> pd.Series:
     """
     Get missing ids from a dataframe.
 
     Params:
         edges (pd.DataFrame): the dataframe to check
         cols (List[str]): the columns to check
-        ids (pd.Series): the unique ids from the nodes
+        node_index (NodeIndex): membership index of the node ids
 
     Returns
     -------
         A pd.Series of missing ids
     """
     # Have to convert the dtype of the series back to the same dtype after the melt
-    return get_difference(edges.melt(value_vars=cols)["value"].convert_dtypes(), ids)
+    return node_index.difference(edges.melt(value_vars=cols)["value"].convert_dtypes())
 
 
 def create_predicate_report(
-    edges_grouped_by_values: pd.DataFrame, node_ids: pd.Series, data_type: type = dict, group_by: str = "predicate"
+    edges_grouped_by_values: pd.DataFrame, node_index: NodeIndex, data_type: type = dict, group_by: str = "predicate"
 ) -> Union[List[Dict], Dict]:
     """
     Create a report for a given predicate.
 
     Params:
         edges_grouped_by_values (pd.DataFrame): the values for the predicate
-        node_ids (pd.Series): unique node ids
+        node_index (NodeIndex): membership index of the node ids
         data_type (type): the type of data object to return
         group_by (str): the name of the column to group by
 
@@ -76,27 +88,87 @@ def create_predicate_report(
     -------
         A List or Dict with the predicate report
     """
-    predicates = ReportContainer(data_type, key_name="uri")
-    predicate_group = edges_grouped_by_values.groupby([group_by])[["id", "object", "subject", "category"]]
-    for predicate, predicate_values in predicate_group:
-        predicate_object = {
-            "uri": predicate,
-            "total_number": predicate_values["id"].size,
-            "missing_subjects": len(set(predicate_values["subject"]) - set(node_ids)),
-            "missing_objects": len(set(predicate_values["object"]) - set(node_ids)),
-            "missing_subject_namespaces": col_to_yaml(
-                get_namespace(get_difference(predicate_values["subject"], node_ids))
-            ),
-            "missing_object_namespaces": col_to_yaml(
-                get_namespace(get_difference(predicate_values["object"], node_ids))
-            ),
-        }
-        predicates.add(predicate_object)
-    return predicates.data
+    predicate_reports = create_predicate_reports(edges_grouped_by_values, node_index, data_type, [group_by])
+    return predicate_reports.get((), ReportContainer(data_type, key_name="uri").data)
+
+
+def create_predicate_reports(
+    edges: pd.DataFrame,
+    node_index: NodeIndex,
+    data_type: type = dict,
+    keys: List[str] = None,
+    endpoints: pd.DataFrame = None,
+) -> Dict[tuple, Union[List[Dict], Dict]]:
+    """
+    Create the predicate reports for every group of edges in one grouped aggregation.
+
+    Params:
+        edges (pd.DataFrame): dataframe of edges
+        node_index (NodeIndex): membership index of the node ids
+        data_type (type): the type of data object to return
+        keys (List[str], optional): columns to group by, the last one being the predicate.
+            Defaults to ["provided_by", "predicate"].
+        endpoints (pd.DataFrame, optional): `get_edge_endpoints` of the edges, computed if not given
+
+    Returns
+    -------
+        Dict of predicate reports, keyed by the tuple of the values of all but the last key
+    """
+    keys = ["provided_by", "predicate"] if keys is None else keys
+    if endpoints is None:
+        endpoints = get_edge_endpoints(edges, node_index, keys)
+    return build_predicate_reports(edges.groupby(keys).size(), endpoints[endpoints["missing"]], data_type, keys)
+
+
+def build_predicate_reports(
+    total_number: pd.Series, missing_endpoints: pd.DataFrame, data_type: type = dict, keys: List[str] = None
+) -> Dict[tuple, Union[List[Dict], Dict]]:
+    """
+    Build the predicate reports from grouped edge counts and the missing edge endpoints.
+
+    Params:
+        total_number (pd.Series): number of edges, indexed by the keys
+        missing_endpoints (pd.DataFrame): `get_edge_endpoints` rows of the missing subjects and objects
+        data_type (type): the type of data object to return
+        keys (List[str], optional): columns the edges are grouped by, the last one being the predicate.
+            Defaults to ["provided_by", "predicate"].
+
+    Returns
+    -------
+        Dict of predicate reports, keyed by the tuple of the values of all but the last key
+    """
+    keys = ["provided_by", "predicate"] if keys is None else keys
+    role_keys = keys + ["role"]
+    missing = missing_endpoints.drop_duplicates(role_keys + ["id"]).groupby(role_keys, observed=True).size()
+    missing_namespaces = group_col_to_yaml(missing_endpoints, role_keys, "namespace")
+
+    predicate_reports: Dict[tuple, ReportContainer] = {}
+    for index, count in total_number.items():
+        index = index if isinstance(index, tuple) else (index,)
+        group, predicate = index[:-1], index[-1]
+        if group not in predicate_reports:
+            predicate_reports[group] = ReportContainer(data_type, key_name="uri")
+        predicate_reports[group].add(
+            {
+                "uri": (predicate,),
+                "total_number": int(count),
+                "missing_subjects": int(missing.get(index + ("subject",), 0)),
+                "missing_objects": int(missing.get(index + ("object",), 0)),
+                "missing_subject_namespaces": missing_namespaces.get(index + ("subject",), []),
+                "missing_object_namespaces": missing_namespaces.get(index + ("object",), []),
+            }
+        )
+    return {group: predicates.data for group, predicates in predicate_reports.items()}
 
 
 def create_edges_report(
-    edges: pd.DataFrame, nodes: pd.DataFrame, data_type: type = dict, group_by: str = "provided_by"
+    edges: pd.DataFrame,
+    nodes: pd.DataFrame,
+    data_type: type = dict,
+    group_by: str = "provided_by",
+    node_index: NodeIndex = None,
+    namespaces: pd.DataFrame = None,
+    node_namespaces: pd.Series = None,
 ) -> Union[List[Dict], Dict]:
     """
     Create a report for a given edge.
@@ -106,41 +178,356 @@ def create_edges_report(
         nodes (pd.DataFrame): dataframe of nodes
         data_type (type): type of data object to return
         group_by (str): column to group by
+        node_index (NodeIndex, optional): membership index of the node ids, built from nodes if not given
+        namespaces (pd.DataFrame, optional): categorical namespaces of the edge subjects and objects, as returned by
+            `encode_namespaces`, computed if not given
+        node_namespaces (pd.Series, optional): categorical namespaces of the node ids, computed if not given
 
     Returns
     -------
         A List or Dict with the edge report
     """
-    edges_report = ReportContainer(data_type)
     if len(edges) == 0:
+        return ReportContainer(data_type).data
+    if node_index is None:
+        node_index = NodeIndex(nodes["id"])
+
+    edge_stats = EdgeStats(node_index, group_by)
+    edge_stats.add(edges, namespaces)
+    return edge_stats.report(nodes, data_type, node_namespaces)
+
+
+def create_chunked_edges_report(
+    edge_chunks: Iterable[pd.DataFrame],
+    nodes: pd.DataFrame,
+    data_type: type = dict,
+    group_by: str = "provided_by",
+    node_index: NodeIndex = None,
+    node_namespaces: pd.Series = None,
+) -> Union[List[Dict], Dict]:
+    """
+    Create a report for edges read one chunk at a time.
+
+    Only the per group statistics of the edges are kept between chunks, so the edges never have to be held in memory
+    all at once. The report is the same as `create_edges_report` of all chunks concatenated.
+
+    Params:
+        edge_chunks (Iterable[pd.DataFrame]): dataframes of edges
+        nodes (pd.DataFrame): dataframe of nodes
+        data_type (type): type of data object to return
+        group_by (str): column to group by
+        node_index (NodeIndex, optional): membership index of the node ids, built from nodes if not given
+        node_namespaces (pd.Series, optional): categorical namespaces of the node ids, computed if not given
+
+    Returns
+    -------
+        A List or Dict with the edge report
+    """
+    if node_index is None:
+        node_index = NodeIndex(nodes["id"])
+
+    edge_stats = EdgeStats(node_index, group_by)
+    for edges in edge_chunks:
+        if len(edges) > 0:
+            edge_stats.add(edges)
+    return edge_stats.report(nodes, data_type, node_namespaces)
+
+
+class EdgeStats:
+
+    """
+    Statistics of the edge groups needed for an edges report, accumulated one chunk of edges at a time.
+
+    For every group it keeps the edge counts per predicate, the unique categories and namespaces, the unique missing
+    subjects and objects, and the subject and object degrees of the nodes. All of these can be merged across chunks,
+    so adding the edges in several chunks gives the same report as adding them all at once.
+
+    Params:
+        node_index (NodeIndex): membership index of the node ids
+        group_by (str, optional): column to group edges by. Defaults to "provided_by".
+    """
+
+    def __init__(self, node_index: NodeIndex, group_by: str = "provided_by"):
+        """
+        Initialize a new instance of the `EdgeStats` class.
+
+        Params:
+            node_index (NodeIndex): membership index of the node ids
+            group_by (str, optional): column to group edges by. Defaults to "provided_by".
+        """
+        self.node_index = node_index
+        self.group_by = group_by
+        self.keys = [group_by, "predicate"]
+        self.counts: pd.DataFrame = None
+        self.categories: pd.DataFrame = None
+        self.namespaces: pd.DataFrame = None
+        self.missing_endpoints: pd.DataFrame = None
+        self.degrees = NodeDegrees(node_index, group_by)
+
+    def add(self, edges: pd.DataFrame, namespaces: pd.DataFrame = None):
+        """
+        Add a chunk of edges to the statistics.
+
+        Params:
+            edges (pd.DataFrame): dataframe of edges
+            namespaces (pd.DataFrame, optional): categorical namespaces of the edge subjects and objects, as returned
+                by `encode_namespaces`, computed if not given
+        """
+        endpoints = get_edge_endpoints(edges, self.node_index, self.keys, namespaces)
+        counts = edges.groupby(self.keys, dropna=False, observed=True).size().reset_index(name="count")
+        self.counts = merge_unique(self.counts, counts, self.keys, "count")
+        self.categories = merge_unique(self.categories, edges[[self.group_by, "category"]])
+        self.namespaces = merge_unique(
+            self.namespaces, endpoints.loc[endpoints["id"].notna(), [self.group_by, "namespace"]]
+        )
+        self.missing_endpoints = merge_unique(
+            self.missing_endpoints,
+            endpoints.loc[endpoints["missing"], self.keys + ["role", "id", "namespace"]],
+        )
+        self.degrees.add(edges, endpoints["code"].to_numpy())
+
+    def report(
+        self, nodes: pd.DataFrame, data_type: type = dict, node_namespaces: pd.Series = None
+    ) -> Union[List[Dict], Dict]:
+        """
+        Create the edges report from the statistics.
+
+        Params:
+            nodes (pd.DataFrame): dataframe of nodes
+            data_type (type): type of data object to return
+            node_namespaces (pd.Series, optional): categorical namespaces of the node ids, computed if not given
+
+        Returns
+        -------
+            A List or Dict with the edge report
+        """
+        edges_report = ReportContainer(data_type)
+        if self.counts is None:
+            return edges_report.data
+        if node_namespaces is None:
+            node_namespaces = namespace_categorical(nodes["id"])
+        group_by = self.group_by
+
+        total_number = self.counts.groupby(group_by, observed=True)["count"].sum()
+        namespaces = group_col_to_yaml(self.namespaces, [group_by], "namespace")
+        categories = group_col_to_yaml(self.categories, [group_by], "category")
+        missing = self.missing_endpoints.drop_duplicates([group_by, "id"]).groupby(group_by, observed=True).size()
+        missing_ids = group_col_to_yaml(self.missing_endpoints, [group_by, "role"], "id")
+        predicates = build_predicate_reports(
+            self.counts.groupby(self.keys, observed=True)["count"].sum(), self.missing_endpoints, data_type, self.keys
+        )
+        node_types = create_node_types_reports(nodes, self.degrees, data_type, group_by, node_namespaces)
+
+        for key, count in total_number.items():
+            group_missing = int(missing.get(key, 0))
+            edge_object = {
+                "name": (key,),
+                "namespaces": namespaces.get(key, []),
+                "categories": categories[key],
+                "total_number": int(count),
+                # missing_old counts the same unique missing subject and object ids as missing
+                "missing_old": group_missing,
+                "missing": group_missing,
+                "predicates": predicates.get((key,), data_type()),
+                "node_types": node_types.get((key,), ReportContainer(data_type).data),
+            }
+            if group_missing > 0:
+                edge_object["missing_subject_namespaces"] = get_namespace(
+                    pd.Series(missing_ids.get((key, "subject"), []), dtype="string", name="value")
+                ).tolist()
+                edge_object["missing_object_namespaces"] = get_namespace(
+                    pd.Series(missing_ids.get((key, "object"), []), dtype="string", name="value")
+                ).tolist()
+            edges_report.add(edge_object)
         return edges_report.data
 
-    edges_group = edges.groupby([group_by])[["id", "object", "subject", "predicate", "category"]]
-    for edge_group_name, edge_group_values in edges_group:
-        # edge_object = create_edge_report(edges_grouped_by, edge_group_values, nodes["id"])
-        missing = len(get_missing(edge_group_values, ["subject", "object"], nodes["id"]))
-        edge_object = {
-            "name": edge_group_name,
-            # "namespaces": col_to_yaml(get_namespace(
-            #     pd.concat([edge_group_values['subject'], edge_group_values['object']])
-            # )),
-            "namespaces": col_to_yaml(get_namespace(edge_group_values[["subject", "object"]].stack())),
-            "categories": col_to_yaml(edge_group_values["category"]),
-            "total_number": edge_group_values["id"].size,
-            "missing_old": len(
-                get_missing_old([edge_group_values["subject"], edge_group_values["object"]], nodes["id"])
-            ),
-            "missing": missing,
-            "predicates": create_predicate_report(edge_group_values, nodes["id"], data_type),
-            "node_types": create_nodes_report(nodes, edge_group_values, data_type, group_by),
+
+class NodeDegrees:
+
+    """
+    Subject and object degrees of the nodes, per group of edges, accumulated one chunk of edges at a time.
+
+    The degrees are held in a table with one row per group and node used by the edges of the group, counted with a
+    single grouped count over the node codes of the edge endpoints. The node types of every edge group, and the nodes
+    a group does not use as subject or object, are then looked up in the table instead of being found again from the
+    endpoints of each group. The degrees over all groups are counted alongside.
+
+    Params:
+        node_index (NodeIndex): membership index of the node ids
+        group_by (str, optional): column to group edges by, None to count only the degrees over all edges.
+            Defaults to "provided_by".
+    """
+
+    def __init__(self, node_index: NodeIndex, group_by: Optional[str] = "provided_by"):
+        """
+        Initialize a new instance of the `NodeDegrees` class.
+
+        Params:
+            node_index (NodeIndex): membership index of the node ids
+            group_by (str, optional): column to group edges by, None to count only the degrees over all edges.
+                Defaults to "provided_by".
+        """
+        self.node_index = node_index
+        self.group_by = group_by
+        # columns group_by, code (position in the node index), subject and object (number of edges using the node)
+        self.table: pd.DataFrame = None
+        # subject (0) and object (1) degree of every node over all edges
+        self.overall = np.zeros((2, len(node_index)), dtype=np.int64)
+
+    def add(self, edges: pd.DataFrame, codes: np.ndarray = None):
+        """
+        Add the degrees of a chunk of edges.
+
+        Params:
+            edges (pd.DataFrame): dataframe of edges
+            codes (np.ndarray, optional): node codes of the subjects followed by those of the objects, as in the
+                "code" column of `get_edge_endpoints`, looked up if not given
+        """
+        if len(edges) == 0:
+            return
+        if codes is None:
+            codes = np.concatenate([self.node_index.codes(edges["subject"]), self.node_index.codes(edges["object"])])
+        rows = np.flatnonzero(codes >= 0)
+        is_subject = rows < len(edges)
+        for role, role_codes in enumerate([codes[rows[is_subject]], codes[rows[~is_subject]]]):
+            self.overall[role] += np.bincount(role_codes, minlength=len(self.node_index))
+        if self.group_by is None:
+            return
+        groups = edges[self.group_by]
+        if not isinstance(groups.dtype, pd.CategoricalDtype):
+            groups = sorted_categorical(groups)
+        counts = pd.DataFrame(
+            {
+                self.group_by: groups.array.take(rows % len(edges)),
+                "code": codes[rows],
+                "subject": is_subject,
+                "object": ~is_subject,
+            }
+        )
+        counts = (
+            counts.groupby([self.group_by, "code"], dropna=False, observed=True, sort=False)[["subject", "object"]]
+            .sum()
+            .reset_index()
+        )
+        self.table = merge_unique(self.table, counts, [self.group_by, "code"], ["subject", "object"])
+
+    def node_rows(self, node_codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Match the rows of the degree table with the rows of a node table holding the same node id.
+
+        Params:
+            node_codes (np.ndarray): node codes of the rows of the node table
+
+        Returns
+        -------
+            Tuple of arrays of degree table rows and node table rows, one pair per match
+        """
+        if self.table is None:
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+        found = node_codes >= 0
+        # node rows sorted by code, the rows of each code starting after those of the lower codes
+        order = np.argsort(node_codes, kind="stable")
+        rows_per_code = np.bincount(node_codes[found], minlength=len(self.node_index))
+        first_rows = np.cumsum(rows_per_code) - rows_per_code + np.count_nonzero(~found)
+        codes = self.table["code"].to_numpy()
+        starts = first_rows[codes]
+        matches = rows_per_code[codes]
+        degree_rows = np.repeat(np.arange(len(codes)), matches)
+        # position of each match among the matches of its degree row
+        offsets = np.arange(len(degree_rows)) - np.repeat(np.cumsum(matches) - matches, matches)
+        return degree_rows, order[np.repeat(starts, matches) + offsets]
+
+
+def merge_unique(
+    accumulated: Optional[pd.DataFrame],
+    addend: pd.DataFrame,
+    keys: List[str] = None,
+    sum_col: Union[str, List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Merge a dataframe into an accumulated dataframe, keeping unique rows or summing a column over unique keys.
+
+    Params:
+        accumulated (Optional[pd.DataFrame]): dataframe accumulated so far, or None for the first merge
+        addend (pd.DataFrame): dataframe to merge in
+        keys (List[str], optional): key columns to sum sum_col over
+        sum_col (Union[str, List[str]], optional): column or columns to sum, addend having one row per key; if not
+            given unique rows are kept
+
+    Returns
+    -------
+        pd.DataFrame of the merged rows
+    """
+    if accumulated is None or len(accumulated) == 0:
+        # addend sums are already unique per key
+        return addend.drop_duplicates(ignore_index=True) if sum_col is None else addend
+    elif len(addend) == 0:
+        return accumulated
+
+    merged = pd.concat([accumulated, addend], ignore_index=True)
+    if sum_col is None:
+        return merged.drop_duplicates(ignore_index=True)
+    return merged.groupby(keys, dropna=False, observed=True, sort=False)[sum_col].sum().reset_index()
+
+
+def get_edge_endpoints(
+    edges: pd.DataFrame, node_index: NodeIndex, keys: List[str] = None, namespaces: pd.DataFrame = None
+) -> pd.DataFrame:
+    """
+    Stack the subjects and objects of edges into one long dataframe.
+
+    Params:
+        edges (pd.DataFrame): dataframe of edges
+        node_index (NodeIndex): membership index of the node ids
+        keys (List[str], optional): columns to keep alongside each subject and object. Defaults to ["provided_by"].
+        namespaces (pd.DataFrame, optional): categorical namespaces of the subjects and objects, as returned by
+            `encode_namespaces`, computed if not given
+
+    Returns
+    -------
+        pd.DataFrame with the keys, role ("subject" or "object"), id, node code (position in the node index, -1 if
+        missing), missing and namespace of each endpoint
+    """
+    keys = ["provided_by"] if keys is None else keys
+    if namespaces is None:
+        namespaces = encode_namespaces(edges, ["subject", "object"])
+    ids = pd.concat([edges["subject"], edges["object"]], ignore_index=True)
+    node_codes = node_index.codes(ids)
+    return pd.DataFrame(
+        {
+            **{key: pd.concat([edges[key], edges[key]], ignore_index=True) for key in keys},
+            "role": pd.Categorical.from_codes(np.repeat([0, 1], len(edges)), categories=["subject", "object"]),
+            "id": ids,
+            "code": node_codes,
+            "missing": node_codes < 0,
+            "namespace": pd.concat([namespaces["subject"], namespaces["object"]], ignore_index=True),
         }
-        if missing > 0:
-            missing_subject_namespaces = get_namespace(get_missing(edge_group_values, ["subject"], nodes["id"]))
-            edge_object["missing_subject_namespaces"] = missing_subject_namespaces
-            missing_object_namespaces = get_namespace(get_missing(edge_group_values, ["object"], nodes["id"]))
-            edge_object["missing_object_namespaces"] = missing_object_namespaces
-        edges_report.add(edge_object)
-    return edges_report.data
+    )
+
+
+def group_col_to_yaml(df: pd.DataFrame, keys: List[str], col: str) -> pd.Series:
+    """
+    Convert a column to data for yaml report for every group of a dataframe at once.
+
+    Params:
+        df (pd.DataFrame): dataframe to group
+        keys (List[str]): columns to group by
+        col (str): column to convert
+
+    Returns
+    -------
+        pd.Series of lists, indexed by group, each list being `col_to_yaml` of the column in that group
+    """
+    values = df[keys + [col]].drop_duplicates().dropna(subset=keys).sort_values(keys + [col])
+    sizes = values.groupby(keys, sort=False, observed=True).size()
+    # the sorted values of each group are contiguous, so the lists are slices of one list of all values
+    all_values = values[col].tolist()
+    ends = np.cumsum(sizes.to_numpy())
+    return pd.Series(
+        [all_values[start:end] for start, end in zip((ends - sizes.to_numpy()).tolist(), ends.tolist(), strict=True)],
+        index=sizes.index,
+        dtype=object,
+    )
 
 
 def get_namespace(col: pd.Series) -> pd.Series:
@@ -152,8 +539,10 @@ def get_namespace(col: pd.Series) -> pd.Series:
 
     Returns
     -------
-        series of namespaces from the provided column
+        series of namespaces from the provided column, categorical if the column is categorical
     """
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        return namespace_categorical(col)
     return col if len(col) == 0 else col.str.split(":").str[0]
 
 
@@ -170,22 +559,26 @@ def col_to_yaml(col: pd.Series) -> List[str]:
     """
     # This probably should have a better name
     # Convert a column from pandas to data for yaml report
-    return col.drop_duplicates().sort_values().tolist()
+    values = col.drop_duplicates()
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Deduplicate on the category codes, then sort and convert only the unique values
+        values = values.astype(values.cat.categories.dtype)
+    return values.sort_values().tolist()
 
 
-def get_missing_old(cols: List[pd.Series], ids: pd.Series) -> List[str]:
+def get_missing_old(cols: List[pd.Series], node_index: NodeIndex) -> List[str]:
     """
     Get the missing ids from a list of columns.
 
     Params:
         cols (List[pd.Series]): list of columns to get missing ids from
-        ids (pd.Series): ids to check against
+        node_index (NodeIndex): membership index of the node ids to check against
 
     Returns
     -------
         List of missing ids
     """
-    return get_difference(pd.concat(cols).drop_duplicates().sort_values().tolist(), ids.tolist())
+    return node_index.difference(pd.concat(cols).drop_duplicates().sort_values().tolist())
 
 
 class ReportContainer:
@@ -268,7 +661,12 @@ class ReportContainer:
 
 
 def create_nodes_report(
-    nodes: pd.DataFrame, edges: pd.DataFrame = None, data_type: type = dict, group_by: str = "provided_by"
+    nodes: pd.DataFrame,
+    edges: pd.DataFrame = None,
+    data_type: type = dict,
+    group_by: str = "provided_by",
+    node_index: NodeIndex = None,
+    namespaces: pd.Series = None,
 ) -> Union[List[Dict], Dict]:
     """
     Create a report for nodes.
@@ -279,53 +677,182 @@ def create_nodes_report(
         data_type (type, optional): Type of data container to use. Supported values are `list` and `dict`.
             Defaults to `dict`.
         group_by (str, optional): column to group nodes by. Defaults to "provided_by".
+        node_index (NodeIndex, optional): membership index of the node ids, built from nodes if not given and
+            edges are given.
+        namespaces (pd.Series, optional): categorical namespaces of the node ids, computed if not given
 
     Returns
     -------
         List or Dict of nodes report
     """
-    node_report = ReportContainer(data_type)
     if len(nodes) == 0:
-        return node_report.data
+        return ReportContainer(data_type).data
+    if namespaces is None:
+        namespaces = namespace_categorical(nodes["id"])
+    if edges is None:
+        return build_nodes_report(nodes, data_type, group_by, namespaces)
+
+    if node_index is None:
+        node_index = NodeIndex(nodes["id"])
+    degrees = NodeDegrees(node_index, group_by=None)
+    degrees.add(edges)
+    node_codes = node_index.codes(nodes["id"])
+    subject_degree, object_degree = np.where(node_codes >= 0, degrees.overall[:, node_codes], 0)
+    used = (subject_degree > 0) | (object_degree > 0)
+    return build_nodes_report(
+        nodes[used], data_type, group_by, namespaces[used], subject_degree[used] > 0, object_degree[used] > 0
+    )
+
+
+def create_node_types_reports(
+    nodes: pd.DataFrame,
+    degrees: NodeDegrees,
+    data_type: type = dict,
+    group_by: str = "provided_by",
+    namespaces: pd.Series = None,
+) -> Dict[tuple, Union[List[Dict], Dict]]:
+    """
+    Create the reports of the nodes used as subject or object by every group of edges in one grouped aggregation.
+
+    Params:
+        nodes (pd.DataFrame): nodes to create report for
+        degrees (NodeDegrees): subject and object degrees of the nodes per group of edges
+        data_type (type, optional): Type of data container to use. Supported values are `list` and `dict`.
+            Defaults to `dict`.
+        group_by (str, optional): column to group nodes by. Defaults to "provided_by".
+        namespaces (pd.Series, optional): categorical namespaces of the node ids, computed if not given
 
-    if edges is not None:
-        subject_nodes = list(get_intersection(edges["subject"], nodes["id"]))
-        object_nodes = list(get_intersection(edges["object"], nodes["id"]))
+    Returns
+    -------
+        Dict of nodes reports, with the number of nodes not used as subject or object, keyed by the tuple of the
+        edge group
+    """
+    if namespaces is None:
+        namespaces = namespace_categorical(nodes["id"])
+    degree_rows, node_rows = degrees.node_rows(degrees.node_index.codes(nodes["id"]))
+    if len(degree_rows) == 0:
+        return {}
+    table = degrees.table
+
+    def encoded(col: pd.Series) -> pd.Series:
+        # columns are encoded once, so the many rows of the frame are grouped and sorted by their codes
+        return col if isinstance(col.dtype, pd.CategoricalDtype) else sorted_categorical(col)
+
+    node_fields = {
+        "edge_group": encoded(table[degrees.group_by]).array.take(degree_rows),
+        # the node code stands for the id, as nodes with the same id have the same code
+        "id": table["code"].to_numpy()[degree_rows],
+        "namespace": namespaces.array.take(node_rows),
+    }
+    for col in [group_by, "category", "in_taxon"]:
+        if col in nodes.columns:
+            node_fields[col] = encoded(nodes[col]).array.take(node_rows)
+    node_fields["missing_subjects"] = table["subject"].to_numpy()[degree_rows] == 0
+    node_fields["missing_objects"] = table["object"].to_numpy()[degree_rows] == 0
+    return build_nodes_reports(pd.DataFrame(node_fields), data_type, ["edge_group", group_by])
+
+
+def build_nodes_report(
+    nodes: pd.DataFrame,
+    data_type: type,
+    group_by: str,
+    namespaces: pd.Series,
+    subject_nodes: np.ndarray = None,
+    object_nodes: np.ndarray = None,
+) -> Union[List[Dict], Dict]:
+    """
+    Build a nodes report for every group of nodes with grouped aggregations.
 
-        edge_nodes = subject_nodes + object_nodes
-        nodes_df = nodes[nodes["id"].isin(edge_nodes)]
-    else:
-        nodes_df = nodes
+    Params:
+        nodes (pd.DataFrame): nodes to create report for
+        data_type (type): Type of data container to use. Supported values are `list` and `dict`.
+        group_by (str): column to group nodes by
+        namespaces (pd.Series): categorical namespaces of the node ids
+        subject_nodes (np.ndarray, optional): boolean array, True for the nodes used as subject by the edges
+        object_nodes (np.ndarray, optional): boolean array, True for the nodes used as object by the edges
 
-    node_grouping_fields = get_intersection(list(nodes_df.columns), ["id", "category", "in_taxon"])
-    nodes_group = nodes_df.groupby([group_by])[node_grouping_fields]
-    for nodes_group_name, nodes_group_values in nodes_group:
+    Returns
+    -------
+        List or Dict of nodes report
+    """
+    node_fields = {
+        group_by: nodes[group_by].array,
+        "id": nodes["id"].array,
+        "namespace": namespaces.array,
+        "category": nodes["category"].array,
+    }
+    if "in_taxon" in nodes.columns:
+        node_fields["in_taxon"] = nodes["in_taxon"].array
+    if subject_nodes is not None:
+        node_fields["missing_subjects"] = ~subject_nodes
+        node_fields["missing_objects"] = ~object_nodes
+    reports = build_nodes_reports(pd.DataFrame(node_fields), data_type, [group_by])
+    return reports.get((), ReportContainer(data_type).data)
+
+
+def build_nodes_reports(
+    node_frame: pd.DataFrame, data_type: type, keys: List[str]
+) -> Dict[tuple, Union[List[Dict], Dict]]:
+    """
+    Build the nodes reports of a frame of nodes grouped by keys, the last key being the node group.
+
+    Params:
+        node_frame (pd.DataFrame): the keys, id, namespace and category of every node, and optionally its in_taxon
+            and whether it is missing as subject (missing_subjects) and as object (missing_objects)
+        data_type (type): Type of data container to use. Supported values are `list` and `dict`.
+        keys (List[str]): columns to group by, the last one being the node group
+
+    Returns
+    -------
+        Dict of nodes reports, keyed by the tuple of the values of all but the last key
+    """
+    total_number = node_frame.groupby(keys, observed=True).size()
+    # dicts are looked up faster than the grouped series, of which there can be one entry per edge and node group
+    group_namespaces = group_col_to_yaml(node_frame, keys, "namespace").to_dict()
+    categories = group_col_to_yaml(node_frame, keys, "category").to_dict()
+    has_taxon = "in_taxon" in node_frame.columns
+    if has_taxon:
+        taxa = group_col_to_yaml(node_frame, keys, "in_taxon").to_dict()
+    has_missing = "missing_subjects" in node_frame.columns
+    if has_missing:
+        unique_nodes = node_frame.drop_duplicates(keys + ["id"])
+        missing = unique_nodes.groupby(keys, observed=True)[["missing_subjects", "missing_objects"]].sum()
+        missing_subjects = missing["missing_subjects"].to_dict()
+        missing_objects = missing["missing_objects"].to_dict()
+
+    node_reports: Dict[tuple, ReportContainer] = {}
+    for index, count in total_number.items():
+        outer = index[:-1] if isinstance(index, tuple) else ()
+        if outer not in node_reports:
+            node_reports[outer] = ReportContainer(data_type)
         node_object = {
-            "name": nodes_group_name,
-            "namespaces": col_to_yaml(get_namespace(nodes_group_values["id"])),
-            "categories": col_to_yaml(nodes_group_values["category"]),
-            "total_number": nodes_group_values["id"].size,
+            "name": (index[-1] if isinstance(index, tuple) else index,),
+            "namespaces": group_namespaces.get(index, []),
+            "categories": categories[index],
+            "total_number": int(count),
         }
-        if edges is not None:
-            missing_subjects = get_difference(nodes_group_values["id"], edges["subject"])
-            missing_objects = get_difference(nodes_group_values["id"], edges["object"])
+        if has_missing:
+            group_missing_subjects = int(missing_subjects[index])
+            group_missing_objects = int(missing_objects[index])
 
-            missing_nodes = missing_subjects.size + missing_objects.size
+            missing_nodes = group_missing_subjects + group_missing_objects
             node_object["missing"] = missing_nodes
             if missing_nodes > 0:
-                node_object["missing_objects"] = missing_objects.size
-                node_object["missing_subjects"] = missing_subjects.size
+                node_object["missing_objects"] = group_missing_objects
+                node_object["missing_subjects"] = group_missing_subjects
 
-        if "in_taxon" in nodes.columns:
-            node_object["taxon"] = col_to_yaml(nodes_group_values["in_taxon"])
-        node_report.add(node_object)
-    return node_report.data
+        if has_taxon:
+            node_object["taxon"] = taxa[index]
+        node_reports[outer].add(node_object)
+    return {outer: reports.data for outer, reports in node_reports.items()}
 
 
 def cols_fill_na(df: pd.DataFrame, names_values: dict) -> pd.DataFrame:
     """
     Fill NA values in columns of a dataframe.
 
+    The fill value is added to the categories of categorical columns, such as those of a compact `MergedKG`.
+
     Params:
         df (pd.DataFrame): dataframe to fill NA values in
         names_values (dict): dictionary of column names and values to fill NA with in the columns
@@ -336,10 +863,32 @@ def cols_fill_na(df: pd.DataFrame, names_values: dict) -> pd.DataFrame:
     """
     for col_name, fill_value in names_values.items():
         if col_name in df.columns:
-            df[col_name] = df[col_name].fillna(fill_value)
+            col = df[col_name]
+            if isinstance(col.dtype, pd.CategoricalDtype) and fill_value not in col.cat.categories:
+                # keep the categories sorted, so the categorical still sorts like its strings
+                categories = col.cat.categories.append(pd.Index([fill_value], dtype=col.cat.categories.dtype))
+                col = col.cat.set_categories(categories.sort_values())
+            df[col_name] = col.fillna(fill_value)
     return df
 
 
+def fill_nodes_na(nodes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Fill the missing taxa and categories of nodes for a report.
+
+    The nodes are filled in a shallow copy, so the nodes given, such as those of a `MergedKG`, keep their missing
+    values. Setting a column replaces it, so the node data is not copied.
+
+    Params:
+        nodes (pd.DataFrame): nodes to fill NA values in
+
+    Returns
+    -------
+        pd.DataFrame of the nodes with the missing taxa and categories filled
+    """
+    return cols_fill_na(nodes.copy(deep=False), {"in_taxon": "missing taxon", "category": "missing category"})
+
+
 def get_intersection(a: Union[List, pd.Series], b: Union[List, pd.Series]) -> Union[List, pd.Series]:
     """
     Get the intersection of two lists or pandas.Series.
@@ -382,28 +931,205 @@ def get_difference(a: Union[List, pd.Series], b: Union[List, pd.Series]) -> Unio
     return s if type(a) is list else pd.Series(s, dtype=a.dtype, name=a.name)
 
 
-def create_qc_report(kg: MergedKG, qc: MergeQC, data_type: type = dict, group_by: str = "provided_by") -> Dict:
+def create_qc_report(
+    kg: MergedKG,
+    qc: MergeQC,
+    data_type: type = dict,
+    group_by: str = "provided_by",
+    cache: Optional[ReportCache] = None,
+) -> Dict:
     """
     interface for generating qc report from merged kg.
 
     Params:
         kg (MergedKG): merged kg to generate qc report for
-        qc (MergeQC): qc data to generate qc report for
+        qc (MergeQC): qc data to generate qc report for, the tables that were not read are found in the kg, see
+            `MergeQC.complete`
         data_type (type, optional): Type of data container to use. Supported values are `list` and `dict`.
             Defaults to `dict`.
         group_by (str, optional): column to group nodes by. Defaults to "provided_by".
+        cache (ReportCache, optional): cache to read the sections from, keyed by the hashes of the tables each
+            section is computed from, data_type and group_by. Sections not in the cache are computed and added.
+            The qc tables that were not read are keyed by the kg tables they are found in, and only found for the
+            sections that are not in the cache.
 
     Returns
     -------
         Dict of qc report
     """
-    nodes = cols_fill_na(kg.nodes, {"in_taxon": "missing taxon", "category": "missing category"})
-    ingest_collection = {
-        "nodes": create_nodes_report(nodes, data_type=data_type, group_by=group_by),
-        "duplicate_nodes": create_nodes_report(qc.duplicate_nodes, data_type=data_type, group_by=group_by),
-        "edges": create_edges_report(kg.edges, nodes, data_type, group_by),
-        "dangling_edges": create_edges_report(qc.dangling_edges, nodes, data_type, group_by),
-        "duplicate_edges": create_edges_report(qc.duplicate_edges, nodes, data_type, group_by),
+    nodes = fill_nodes_na(kg.nodes)
+    report = {}
+    keys = {}
+    if cache is not None:
+        nodes_hash = frame_hash(nodes)
+        edges_hash = frame_hash(kg.edges)
+        params = (data_type.__name__, group_by)
+        found_from = {
+            "duplicate_nodes": ("found", frame_hash(kg.nodes)),
+            "dangling_edges": ("found", edges_hash),
+            "duplicate_edges": ("found", edges_hash),
+        }
+        qc_hashes = {
+            table: found_from[table] if getattr(qc, table) is None else frame_hash(getattr(qc, table))
+            for table in found_from
+        }
+        keys = {
+            "nodes": cache.key("nodes", nodes_hash, *params),
+            "duplicate_nodes": cache.key("duplicate_nodes", qc_hashes["duplicate_nodes"], *params),
+            "edges": cache.key("edges", edges_hash, nodes_hash, *params),
+        }
+        for section in ["dangling_edges", "duplicate_edges"]:
+            keys[section] = cache.key(section, qc_hashes[section], nodes_hash, *params)
+        for section, key in keys.items():
+            value = cache.get(key)
+            if value is not None:
+                report[section] = value
+        if len(report) == len(keys):
+            return {section: report[section] for section in keys}
+
+    qc_tables = ["duplicate_nodes", "duplicate_edges", "dangling_edges"]
+    with profiling.stage("complete_qc"):
+        qc = qc.complete(kg, [table for table in qc_tables if table not in report])
+    node_index = kg.node_index
+    node_namespaces = kg.namespaces("nodes")["id"]
+    sections = {
+        "nodes": lambda: create_nodes_report(nodes, data_type=data_type, group_by=group_by, namespaces=node_namespaces),
+        "duplicate_nodes": lambda: create_nodes_report(
+            fill_nodes_na(qc.duplicate_nodes),
+            data_type=data_type,
+            group_by=group_by,
+            namespaces=qc.namespaces("duplicate_nodes").get("id"),
+        ),
+        "edges": lambda: create_edges_report(
+            kg.edges, nodes, data_type, group_by, node_index, kg.namespaces("edges"), node_namespaces
+        ),
+        "dangling_edges": lambda: create_edges_report(
+            qc.dangling_edges,
+            nodes,
+            data_type,
+            group_by,
+            node_index,
+            qc.namespaces("dangling_edges"),
+            node_namespaces,
+        ),
+        "duplicate_edges": lambda: create_edges_report(
+            qc.duplicate_edges,
+            nodes,
+            data_type,
+            group_by,
+            node_index,
+            qc.namespaces("duplicate_edges"),
+            node_namespaces,
+        ),
+    }
+    tables = {
+        "nodes": nodes,
+        "duplicate_nodes": qc.duplicate_nodes,
+        "edges": kg.edges,
+        "dangling_edges": qc.dangling_edges,
+        "duplicate_edges": qc.duplicate_edges,
     }
+    ingest_collection = {}
+    for section, create_section in sections.items():
+        if section in report:
+            ingest_collection[section] = report[section]
+            continue
+        with profiling.stage(section) as section_stage:
+            ingest_collection[section] = create_section()
+            section_stage.add_rows(len(tables[section]))
+        if cache is not None:
+            cache.put(keys[section], ingest_collection[section])
 
     return ingest_collection
+
+
+def create_chunked_qc_report(kg: MergedKG, qc: MergeQC, data_type: type = dict, group_by: str = "provided_by") -> Dict:
+    """
+    Interface for generating qc report from merged kg with edges read in chunks.
+
+    The edge tables may be dataframes or iterables of dataframes such as `TableChunks`, so only one chunk of edges is
+    held in memory at a time next to the nodes and the node index. If the dangling edges were not read, they are
+    found in each chunk of edges in the same pass as the edges report. If the duplicate edges were not read, the
+    hashes of the edge ids are added in that pass too, and the edges are only read again for the duplicates if an id
+    is repeated, see `DuplicateFinder`. The report is the same as `create_qc_report`.
+
+    Params:
+        kg (MergedKG): merged kg to generate qc report for
+        qc (MergeQC): qc data to generate qc report for
+        data_type (type, optional): Type of data container to use. Supported values are `list` and `dict`.
+            Defaults to `dict`.
+        group_by (str, optional): column to group nodes by. Defaults to "provided_by".
+
+    Returns
+    -------
+        Dict of qc report
+    """
+    nodes = fill_nodes_na(kg.nodes)
+    node_index = kg.node_index
+    node_namespaces = kg.namespaces("nodes")["id"]
+    if qc.duplicate_nodes is None:
+        qc = MergeQC(kg.duplicate_nodes(), qc.duplicate_edges, qc.dangling_edges)
+    ingest_collection = {}
+    with profiling.stage("nodes"):
+        ingest_collection["nodes"] = create_nodes_report(
+            nodes, data_type=data_type, group_by=group_by, namespaces=node_namespaces
+        )
+    with profiling.stage("duplicate_nodes"):
+        ingest_collection["duplicate_nodes"] = create_nodes_report(
+            fill_nodes_na(qc.duplicate_nodes),
+            data_type=data_type,
+            group_by=group_by,
+            namespaces=qc.namespaces("duplicate_nodes").get("id"),
+        )
+    # edge tables that were not read, found in the edge chunks while the edges report is created
+    found_edges: Dict[str, Tuple[Callable[[pd.DataFrame], pd.DataFrame], EdgeStats]] = {}
+    if qc.dangling_edges is None:
+        find_dangling = partial(find_dangling_edges, node_index=node_index)
+        found_edges["dangling_edges"] = (find_dangling, EdgeStats(node_index, group_by))
+    duplicate_finder = DuplicateFinder(EDGE_KEY_COLUMNS) if qc.duplicate_edges is None else None
+    for section, edges in [
+        ("edges", kg.edges),
+        ("dangling_edges", qc.dangling_edges),
+        ("duplicate_edges", qc.duplicate_edges),
+    ]:
+        edge_chunks = [edges] if isinstance(edges, pd.DataFrame) else edges
+        with profiling.stage(section):
+            if section == "edges" and found_edges:
+                edge_chunks = add_found_edges(edge_chunks, list(found_edges.values()))
+            if section == "edges" and duplicate_finder is not None:
+                edge_chunks = duplicate_finder.scan(edge_chunks)
+            if section == "duplicate_edges" and duplicate_finder is not None:
+                all_edges = [kg.edges] if isinstance(kg.edges, pd.DataFrame) else kg.edges
+                found = len(duplicate_finder.repeated) > 0
+                edge_chunks = map(duplicate_finder.duplicates, all_edges) if found else [pd.DataFrame([])]
+            if section in found_edges:
+                ingest_collection[section] = found_edges[section][1].report(nodes, data_type, node_namespaces)
+            else:
+                ingest_collection[section] = create_chunked_edges_report(
+                    edge_chunks, nodes, data_type, group_by, node_index, node_namespaces
+                )
+
+    return ingest_collection
+
+
+def add_found_edges(
+    edge_chunks: Iterable[pd.DataFrame], finders: List[Tuple[Callable[[pd.DataFrame], pd.DataFrame], EdgeStats]]
+) -> Iterator[pd.DataFrame]:
+    """
+    Pass on chunks of edges, adding the edges found in each chunk to statistics, such as those of the dangling edges.
+
+    Params:
+        edge_chunks (Iterable[pd.DataFrame]): dataframes of edges
+        finders (List[Tuple[Callable[[pd.DataFrame], pd.DataFrame], EdgeStats]]): functions finding edges in a chunk,
+            each with the statistics its edges are added to
+
+    Returns
+    -------
+        Iterator over the chunks of edges
+    """
+    for edges in edge_chunks:
+        for find, stats in finders:
+            found = find(edges)
+            if len(found) > 0:
+                stats.add(found)
+        yield edges
@@ -0,0 +1,178 @@
+"""Content-addressed cache of computed qc report sections."""
+
+import glob
+import hashlib
+import os
+import pickle
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from monarch_qc_reports import __version__
+from monarch_qc_reports.model.merged_kg import arrow_strings
+
+REPORT_CACHE_DIR = os.path.join("kg_data", "report_cache")
+REPORT_CACHE_SIZE = 256 << 20
+
+
+def frame_hash(df: pd.DataFrame) -> str:
+    """
+    Hash the contents of a dataframe.
+
+    Arrow-backed string columns are hashed from their buffers without converting any value, other columns with
+    `pandas.util.hash_pandas_object`. Equal tables can get different hashes if their Arrow buffers are laid out
+    differently, which only costs a cache miss, but different tables never share a hash.
+
+    Args:
+    ----
+    df (pandas.DataFrame): Dataframe.
+
+    Returns:
+    -------
+    str: Hex digest of the column names, dtypes and values.
+    """
+    digest = hashlib.sha256(repr([(str(column), str(dtype)) for column, dtype in df.dtypes.items()]).encode())
+    digest.update(str(len(df)).encode())
+    for column in df.columns:
+        values = arrow_strings(df[column])
+        if values is None:
+            digest.update(pd.util.hash_pandas_object(df[column], index=False).to_numpy().tobytes())
+            continue
+        for chunk in values.chunks:
+            digest.update(f"{chunk.offset},{len(chunk)}".encode())
+            for buffer in chunk.buffers():
+                digest.update(b"" if buffer is None else buffer)
+    return digest.hexdigest()
+
+
+class SectionPickler(pickle.Pickler):
+
+    """
+    Pickler that stores series by value, so they are built again the way the report builds them.
+
+    A series unpickled as is holds copies of objects that the series of a computed report share, such as its dtype,
+    which makes the YAML dump of a report read from the cache differ in its anchors from a computed one.
+    """
+
+    def reducer_override(self, obj):
+        """Reduce numpy and string series to the values, index, dtype name and name they are built from."""
+        if isinstance(obj, pd.Series) and isinstance(obj.dtype, (np.dtype, pd.StringDtype)):
+            return pd.Series, series_args(obj)
+        return NotImplemented
+
+
+def series_args(series: pd.Series) -> tuple:
+    """
+    Get the arguments that build a numpy or string series again from its values.
+
+    Args:
+    ----
+    series (pandas.Series): Series with a numpy or string dtype.
+
+    Returns:
+    -------
+    tuple: Values, index, dtype name and name of the series.
+    """
+    dtype = str(series.dtype) if isinstance(series.dtype, np.dtype) else f"string[{series.dtype.storage}]"
+    return series.tolist(), series.index, dtype, series.name
+
+
+class ReportCache:
+
+    """
+    On-disk cache of qc report sections, keyed by the hashes of the data and the parameters they are computed from.
+
+    Each section is pickled to its own file. Reading a section marks it as recently used, and writing one evicts the
+    least recently used sections until the files take at most max_size bytes.
+
+    Params:
+        directory (str, optional): directory of the cache files. Defaults to REPORT_CACHE_DIR.
+        max_size (int, optional): maximum total size of the cache files in bytes. Defaults to REPORT_CACHE_SIZE.
+    """
+
+    def __init__(self, directory: str = REPORT_CACHE_DIR, max_size: int = REPORT_CACHE_SIZE):
+        """Initialize ReportCache object."""
+        self.directory = directory
+        self.max_size = max_size
+
+    def key(self, section: str, *parts) -> str:
+        """
+        Get the key of a section from the hashes of its data and its parameters.
+
+        The package version is part of the key, so sections computed by another version are never used.
+
+        Args:
+        ----
+        section (str): Name of the section.
+        parts: Data hashes and parameters the section is computed from.
+
+        Returns:
+        -------
+        str: Key of the form "<section>-<hash>".
+        """
+        digest = hashlib.sha256(repr((__version__, section, [str(part) for part in parts])).encode())
+        return f"{section}-{digest.hexdigest()[:32]}"
+
+    def path(self, key: str) -> str:
+        """Get the path of the cache file of a key."""
+        return os.path.join(self.directory, f"{key}.pickle")
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Read a section from the cache.
+
+        Args:
+        ----
+        key (str): Key of the section.
+
+        Returns:
+        -------
+        Optional[Any]: Section, or None if it is not cached.
+        """
+        path = self.path(key)
+        try:
+            with open(path, "rb") as fh:
+                value = pickle.load(fh)  # noqa: S301, the cache only holds sections written by put
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        os.utime(path)
+        return value
+
+    def put(self, key: str, value: Any):
+        """
+        Write a section to the cache and evict the least recently used sections beyond max_size.
+
+        Args:
+        ----
+        key (str): Key of the section.
+        value (Any): Section.
+
+        Returns:
+        -------
+        None
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        with open(path + ".tmp", "wb") as fh:
+            SectionPickler(fh, protocol=pickle.HIGHEST_PROTOCOL).dump(value)
+        os.replace(path + ".tmp", path)
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used sections until the cache takes at most max_size bytes."""
+        entries = []
+        for path in glob.glob(os.path.join(glob.escape(self.directory), "*.pickle")):
+            stat = os.stat(path)
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            os.remove(path)
+            size -= entry_size
+
+    def clear(self):
+        """Remove all sections from the cache."""
+        for path in glob.glob(os.path.join(glob.escape(self.directory), "*.pickle")):
+            os.remove(path)
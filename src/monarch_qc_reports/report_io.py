@@ -0,0 +1,177 @@
+"""Module for writing qc reports in several formats and reading them back for comparison."""
+
+import json
+import os
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+import yaml
+
+# the libyaml bindings of PyYAML are several times faster, the pure Python classes are used if they were not built
+YAML_DUMPER = getattr(yaml, "CDumper", yaml.Dumper)
+YAML_LOADER = getattr(yaml, "CUnsafeLoader", yaml.UnsafeLoader)
+
+REPORT_FORMATS = {"yaml": ".yaml", "json": ".json", "msgpack": ".msgpack"}
+
+
+class ReportDumper(YAML_DUMPER):
+
+    """
+    YAML dumper writing every value of a report in full, without anchors and aliases.
+
+    Which values of a report are the same object depends on how it was built, for instance the sections of
+    `create_parallel_qc_report` are copied back from the worker processes, so with aliases the same report could be
+    written as different files.
+    """
+
+    def ignore_aliases(self, data) -> bool:
+        """Never write an alias."""
+        return True
+
+
+def report_path(path: str, report_format: str) -> str:
+    """
+    Get the path of a report in a format, by replacing the extension of a path.
+
+    Params:
+        path (str): path of the report, such as "output/qc_report.yaml"
+        report_format (str): format of the report, one of REPORT_FORMATS
+
+    Returns
+    -------
+        path with the extension of the format
+    """
+    return os.path.splitext(path)[0] + REPORT_FORMATS[report_format]
+
+
+def plain_report(value):
+    """
+    Convert a report to plain data, the way it is written as JSON or msgpack.
+
+    Names and uris, which the report keeps as 1-tuples, become strings, series become lists and numpy scalars Python
+    numbers. A report that is plain already, such as a published qc_report.yaml, stays the same.
+
+    Params:
+        value: report, or part of a report
+
+    Returns
+    -------
+        value of only dicts with string keys, lists, strings, numbers and None
+    """
+    if isinstance(value, dict):
+        return {plain_key(key): plain_report(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return value[0] if len(value) == 1 else [plain_report(item) for item in value]
+    if isinstance(value, list):
+        return [plain_report(item) for item in value]
+    if isinstance(value, pd.Series):
+        return [plain_report(item) for item in value.tolist()]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def plain_key(key) -> str:
+    """
+    Convert a key of a report to a string.
+
+    Params:
+        key: key, a string or a tuple of group values
+
+    Returns
+    -------
+        the key, its only value, or its values separated by ", "
+    """
+    if isinstance(key, tuple):
+        return str(key[0]) if len(key) == 1 else ", ".join(str(item) for item in key)
+    return key if isinstance(key, str) else str(key)
+
+
+def dump_report(report: Dict, path: str, report_format: str = "yaml"):
+    """
+    Write a qc report.
+
+    YAML keeps the Python objects of the report, so that it can be loaded again as the previous report, see
+    `load_report`, and is written without aliases, see `ReportDumper`. JSON and msgpack hold the `plain_report`, JSON
+    is written with orjson if it is installed.
+
+    Params:
+        report (Dict): qc report
+        path (str): path to write the report to
+        report_format (str, optional): one of REPORT_FORMATS. Defaults to "yaml".
+
+    Returns
+    -------
+        None
+
+    Raises
+    ------
+        ValueError: if the format is not supported
+        ImportError: if the format is msgpack and msgpack is not installed
+    """
+    if report_format == "yaml":
+        with open(path, "w") as report_file:
+            yaml.dump(report, report_file, Dumper=ReportDumper)
+    elif report_format == "json":
+        try:
+            import orjson
+        except ImportError:
+            with open(path, "w") as report_file:
+                json.dump(plain_report(report), report_file, separators=(",", ":"))
+        else:
+            with open(path, "wb") as report_file:
+                report_file.write(orjson.dumps(plain_report(report)))
+    elif report_format == "msgpack":
+        msgpack = import_msgpack()
+        with open(path, "wb") as report_file:
+            report_file.write(msgpack.packb(plain_report(report), use_bin_type=True))
+    else:
+        raise ValueError(f"Unknown report format {report_format}, expected one of {', '.join(REPORT_FORMATS)}.")
+
+
+def read_report(path: str) -> Dict:
+    """
+    Read a qc report in any of REPORT_FORMATS as the same plain dict, to compare with `diff_yaml`.
+
+    The format is taken from the extension of the path, ".yml" is read as YAML too. YAML reports hold Python objects
+    and are loaded with the unsafe loader, so they must be trusted files.
+
+    Params:
+        path (str): path of the report
+
+    Returns
+    -------
+        `plain_report` of the report
+
+    Raises
+    ------
+        ValueError: if the extension is not one of a supported format
+        ImportError: if the report is msgpack and msgpack is not installed
+    """
+    extension = os.path.splitext(path)[1]
+    if extension in (".yaml", ".yml"):
+        with open(path) as report_file:
+            return plain_report(yaml.load(report_file, Loader=YAML_LOADER))  # noqa: S506, trusted reports only
+    if extension == ".json":
+        with open(path, "rb") as report_file:
+            data = report_file.read()
+        try:
+            import orjson
+        except ImportError:
+            return json.loads(data)
+        return orjson.loads(data)
+    if extension == ".msgpack":
+        msgpack = import_msgpack()
+        with open(path, "rb") as report_file:
+            return msgpack.unpackb(report_file.read(), raw=False)
+    raise ValueError(f"Unknown report extension {extension}, expected one of {', '.join(REPORT_FORMATS.values())}.")
+
+
+def import_msgpack():
+    """Import msgpack, which is an optional dependency."""
+    try:
+        import msgpack
+    except ImportError as error:
+        raise ImportError("The msgpack format requires msgpack, install it with the 'msgpack' extra.") from error
+    return msgpack
@@ -0,0 +1,188 @@
+"""Seeded generator of synthetic knowledge graphs and their merge qc files, for tests and benchmarks."""
+
+import os
+from pathlib import Path
+from typing import Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from monarch_qc_reports.file_utils import write_df, write_tar
+from monarch_qc_reports.model.merged_kg import MergedKG, MergeQC
+
+KG_LAYOUTS = ["tar", "dir"]
+NODE_CATEGORIES = ["biolink:Gene", "biolink:Disease", "biolink:PhenotypicFeature", "biolink:AnatomicalEntity", None]
+EDGE_CATEGORIES = [
+    "biolink:Association",
+    "biolink:GeneToPhenotypicFeatureAssociation",
+    "biolink:CausalGeneToDiseaseAssociation",
+]
+TAXA = ["NCBITaxon:9606", "NCBITaxon:10090", "NCBITaxon:7955", None]
+
+
+def skewed(count: int) -> np.ndarray:
+    """
+    Get probabilities that fall off with the rank, so that a few values are common and most are rare.
+
+    Args:
+    ----
+    count (int): Number of values.
+
+    Returns:
+    -------
+    numpy.ndarray: Probability of each value.
+    """
+    weights = 1 / np.arange(1, count + 1)
+    return weights / weights.sum()
+
+
+def make_ids(prefixes: Union[str, np.ndarray], numbers: np.ndarray, infix: str = "") -> pd.Series:
+    """
+    Build CURIEs from prefixes and numbers.
+
+    Args:
+    ----
+    prefixes (str, numpy.ndarray): Prefix of all CURIEs, or of each CURIE.
+    numbers (numpy.ndarray): Number of each CURIE.
+    infix (str, optional): Text between the colon and the number.
+
+    Returns:
+    -------
+    pandas.Series: Object series of the CURIEs.
+    """
+    numbers = pd.Series(numbers).astype(str)
+    if isinstance(prefixes, str):
+        return (prefixes + ":" + infix) + numbers
+    return pd.Series(prefixes, dtype=object) + (":" + infix) + numbers
+
+
+def make_kg(
+    nodes: int = 10000,
+    edges: int = 100000,
+    sources: int = 10,
+    predicates: int = 20,
+    namespaces: int = 10,
+    dangling_fraction: float = 0.05,
+    duplicate_fraction: float = 0.01,
+    seed: int = 0,
+) -> Tuple[MergedKG, MergeQC]:
+    """
+    Generate a synthetic knowledge graph and the merge qc tables of its dangling and duplicate rows.
+
+    Sources, predicates and namespaces are drawn with skewed probabilities, so a few are common and most are rare, as
+    in a real merged graph. A dangling edge has a subject or object that is not a node id. Duplicate nodes and edges
+    repeat a node or an edge, id included, from another source. Like the merge qc files, the duplicate tables hold
+    every row of a repeated id and the dangling edges table every edge with a missing subject or object. The same
+    arguments always generate the same graph.
+
+    Args:
+    ----
+    nodes (int, optional): Number of distinct node ids.
+    edges (int, optional): Number of edges, not counting duplicates.
+    sources (int, optional): Number of provided_by sources of nodes and of edges.
+    predicates (int, optional): Number of predicates.
+    namespaces (int, optional): Number of CURIE prefixes of the node ids.
+    dangling_fraction (float, optional): Fraction of edges with a missing subject or object.
+    duplicate_fraction (float, optional): Fraction of nodes and of edges that are duplicated.
+    seed (int, optional): Seed of the random generator.
+
+    Returns:
+    -------
+    Tuple[MergedKG, MergeQC]: Knowledge graph and its merge qc tables, with string columns as `read_kg` reads them.
+    """
+    rng = np.random.default_rng(seed)
+    prefixes = np.array([f"NS{k}" for k in range(namespaces)], dtype=object)
+    node_sources = np.array([f"source_{k}_nodes" for k in range(sources)], dtype=object)
+    edge_sources = np.array([f"source_{k}_edges" for k in range(sources)], dtype=object)
+    predicate_names = np.array([f"biolink:predicate_{k}" for k in range(predicates)], dtype=object)
+
+    ids = make_ids(prefixes[rng.choice(namespaces, nodes, p=skewed(namespaces))], np.arange(nodes))
+    node_table = pd.DataFrame(
+        {
+            "id": ids,
+            "category": np.array(NODE_CATEGORIES, dtype=object)[rng.integers(len(NODE_CATEGORIES), size=nodes)],
+            "name": "node " + pd.Series(np.arange(nodes)).astype(str),
+            "in_taxon": np.array(TAXA, dtype=object)[rng.integers(len(TAXA), size=nodes)],
+            "provided_by": node_sources[rng.choice(sources, nodes, p=skewed(sources))],
+        }
+    )
+    duplicates = node_table.iloc[rng.choice(nodes, int(nodes * duplicate_fraction), replace=False)].copy()
+    duplicates["provided_by"] = node_sources[rng.integers(sources, size=len(duplicates))]
+    node_table = pd.concat([node_table, duplicates], ignore_index=True)
+
+    subjects = ids.to_numpy()[rng.integers(nodes, size=edges)]
+    objects = ids.to_numpy()[rng.integers(nodes, size=edges)]
+    dangling = rng.choice(edges, int(edges * dangling_fraction), replace=False)
+    missing_ids = make_ids(prefixes[rng.integers(namespaces, size=len(dangling))], dangling, "missing").to_numpy()
+    dangling_subject = rng.random(len(dangling)) < 0.5
+    subjects[dangling[dangling_subject]] = missing_ids[dangling_subject]
+    objects[dangling[~dangling_subject]] = missing_ids[~dangling_subject]
+    edge_table = pd.DataFrame(
+        {
+            "id": make_ids("uuid", np.arange(edges)),
+            "subject": subjects,
+            "predicate": predicate_names[rng.choice(predicates, edges, p=skewed(predicates))],
+            "object": objects,
+            "category": np.array(EDGE_CATEGORIES, dtype=object)[rng.integers(len(EDGE_CATEGORIES), size=edges)],
+            "provided_by": edge_sources[rng.choice(sources, edges, p=skewed(sources))],
+        }
+    )
+    duplicate_edges = edge_table.iloc[rng.choice(edges, int(edges * duplicate_fraction), replace=False)].copy()
+    duplicate_edges["provided_by"] = edge_sources[rng.integers(sources, size=len(duplicate_edges))]
+    edge_table = pd.concat([edge_table, duplicate_edges], ignore_index=True)
+    edge_table = edge_table.iloc[rng.permutation(len(edge_table))].reset_index(drop=True)
+
+    node_ids = set(ids)
+    dangling_rows = ~edge_table["subject"].isin(node_ids) | ~edge_table["object"].isin(node_ids)
+    kg = MergedKG(node_table.astype("string"), edge_table.astype("string"))
+    qc = MergeQC(
+        duplicate_nodes=kg.nodes[kg.nodes["id"].duplicated(keep=False)].reset_index(drop=True),
+        duplicate_edges=kg.edges[kg.edges["id"].duplicated(keep=False)].reset_index(drop=True),
+        dangling_edges=kg.edges[dangling_rows.to_numpy()].reset_index(drop=True),
+    )
+    return kg, qc
+
+
+def write_kg(
+    kg: MergedKG, qc: MergeQC, output_dir: str, name: str = "synthetic-kg", layout: str = "tar"
+) -> Tuple[str, str]:
+    """
+    Write a knowledge graph and its merge qc tables in the layout of a KG release.
+
+    The "tar" layout writes the node and edge files to <output_dir>/<name>.tar.gz, like the monarch-kg.tar.gz of a
+    release, the "dir" layout to the directory <output_dir>/<name>. The qc tables are written to gzipped TSV files in
+    <output_dir>/qc, named like the qc files of a release.
+
+    Args:
+    ----
+    kg (MergedKG): Knowledge graph.
+    qc (MergeQC): Merge qc tables.
+    output_dir (str): Path to directory.
+    name (str, optional): Name of the knowledge graph.
+    layout (str, optional): "tar" or "dir".
+
+    Returns:
+    -------
+    Tuple[str, str]: Paths to pass to `read_kg` and `read_qc`.
+    """
+    if layout not in KG_LAYOUTS:
+        raise ValueError(f"Unknown layout {layout}, expected one of {', '.join(KG_LAYOUTS)}")
+    kg_dir = output_dir if layout == "tar" else os.path.join(output_dir, name)
+    qc_dir = os.path.join(output_dir, "qc")
+    Path(kg_dir).mkdir(exist_ok=True, parents=True)
+    Path(qc_dir).mkdir(exist_ok=True, parents=True)
+
+    nodes_path = os.path.join(kg_dir, f"{name}_nodes.tsv")
+    edges_path = os.path.join(kg_dir, f"{name}_edges.tsv")
+    write_df(kg.nodes, nodes_path)
+    write_df(kg.edges, edges_path)
+    if layout == "tar":
+        kg_path = os.path.join(output_dir, f"{name}.tar.gz")
+        write_tar(kg_path, [nodes_path, edges_path])
+    else:
+        kg_path = kg_dir
+
+    write_df(qc.duplicate_nodes, os.path.join(qc_dir, f"{name}-duplicate-nodes.tsv.gz"))
+    write_df(qc.duplicate_edges, os.path.join(qc_dir, f"{name}-duplicate-edges.tsv.gz"))
+    write_df(qc.dangling_edges, os.path.join(qc_dir, f"{name}-dangling-edges.tsv.gz"))
+    return kg_path, qc_dir
@@ -0,0 +1,200 @@
+"""Columnar cache of the tables read from knowledge graph and qc files."""
+
+import glob
+import hashlib
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def source_files(source: str) -> List[str]:
+    """
+    List the files of a source, the file itself or the files below a directory that are not hidden.
+
+    Args:
+    ----
+    source (str): Path to a file or directory.
+
+    Returns:
+    -------
+    List[str]: Sorted list of file paths.
+    """
+    if not os.path.isdir(source):
+        return [source]
+    paths = []
+    for directory, directories, files in os.walk(source):
+        directories[:] = [name for name in directories if not name.startswith(".")]
+        paths.extend(os.path.join(directory, file) for file in files if not file.startswith("."))
+    return sorted(paths)
+
+
+def cache_key(source: str, *options) -> str:
+    """
+    Get the cache key of a source from the size and hash of its files and the options used to read it.
+
+    Args:
+    ----
+    source (str): Path to a file or directory.
+    options: Read options that change the tables read from the source.
+
+    Returns:
+    -------
+    str: Key of the form "<size>-<hash>".
+    """
+    digest = hashlib.sha256(repr(options).encode())
+    size = 0
+    for file in source_files(source):
+        size += os.path.getsize(file)
+        digest.update(os.path.relpath(file, source).encode())
+        with open(file, "rb") as fh:
+            while block := fh.read(HASH_BLOCK_SIZE):
+                digest.update(block)
+    return f"{size}-{digest.hexdigest()[:16]}"
+
+
+def cache_path(source: str, key: str, table: str) -> str:
+    """
+    Get the path of the cache file of a table, next to the source.
+
+    Args:
+    ----
+    source (str): Path to a file or directory.
+    key (str): Cache key of the source.
+    table (str): Name of the table.
+
+    Returns:
+    -------
+    str: Path of the cache file.
+    """
+    return f"{source.rstrip('/')}.{key}.{table}.arrow"
+
+
+def read_cache(source: str, key: str, tables: List[str], engine: str = "c") -> Optional[Dict[str, pd.DataFrame]]:
+    """
+    Read the cached tables of a source.
+
+    Columns come back with the string dtype of the engine, Arrow-backed for "pyarrow", like `read_df` returns them.
+
+    Args:
+    ----
+    source (str): Path to a file or directory.
+    key (str): Cache key of the source.
+    tables (List[str]): Names of the tables.
+    engine (str, optional): Parser the tables are read as, see `read_df`.
+
+    Returns:
+    -------
+    Optional[Dict[str, pandas.DataFrame]]: Dataframes by table name, or None if a table is not cached.
+    """
+    paths = {table: cache_path(source, key, table) for table in tables}
+    if not all(os.path.exists(path) for path in paths.values()):
+        return None
+    return {table: read_ipc(path, engine) for table, path in paths.items()}
+
+
+def read_ipc(path: str, engine: str = "pyarrow") -> pd.DataFrame:
+    """
+    Read an Arrow IPC (Feather) file through a memory map.
+
+    With the "pyarrow" engine the string columns of the dataframe are views of the mapped file, so loading is almost
+    instant and processes reading the same file share its pages in the page cache instead of each holding a copy.
+
+    Args:
+    ----
+    path (str): Path to the file.
+    engine (str, optional): Parser the table is read as, see `read_df`. Defaults to "pyarrow".
+
+    Returns:
+    -------
+    pandas.DataFrame: Dataframe.
+    """
+    from pyarrow import feather
+
+    return table_to_frame(feather.read_table(path, memory_map=True), engine)
+
+
+def write_ipc(df: pd.DataFrame, path: str):
+    """
+    Write a dataframe to an uncompressed Arrow IPC (Feather) file that can be memory-mapped by `read_ipc`.
+
+    The file is written to a temporary file first so that an interrupted write never leaves a partial file behind.
+
+    Args:
+    ----
+    df (pandas.DataFrame): Dataframe.
+    path (str): Path to the file.
+
+    Returns:
+    -------
+    None
+    """
+    import pyarrow as pa
+    from pyarrow import feather
+
+    feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), path + ".tmp", compression="uncompressed")
+    os.replace(path + ".tmp", path)
+
+
+def table_to_frame(table, engine: str = "c") -> pd.DataFrame:
+    """
+    Convert an Arrow table written by `write_cache` to a dataframe.
+
+    For the "c" engine each distinct string is converted to a Python string once and shared by all rows holding it,
+    the same way the C parser shares repeated values, so the dataframe takes no more memory than a parsed one.
+
+    Args:
+    ----
+    table (pyarrow.Table): Table read from the cache.
+    engine (str, optional): Parser the table is read as, see `read_df`.
+
+    Returns:
+    -------
+    pandas.DataFrame: Dataframe.
+    """
+    import pyarrow as pa
+
+    if table.num_columns == 0:
+        return table.to_pandas()
+    metadata = table.schema.pandas_metadata or {"columns": []}
+    object_columns = {col["name"] for col in metadata["columns"] if col["numpy_type"] == "object"}
+    columns = {}
+    for name in table.column_names:
+        column_type = table.schema.field(name).type
+        if name in object_columns or not (pa.types.is_string(column_type) or pa.types.is_large_string(column_type)):
+            columns[name] = table.column(name).to_pandas()
+        elif engine == "pyarrow":
+            columns[name] = table.column(name).to_pandas(types_mapper={column_type: pd.StringDtype("pyarrow")}.get)
+        else:
+            encoded = table.column(name).combine_chunks().dictionary_encode()
+            values = np.append(encoded.dictionary.to_numpy(zero_copy_only=False), pd.NA).astype(object)
+            codes = encoded.indices.fill_null(len(encoded.dictionary)).to_numpy()
+            columns[name] = pd.Series(pd.arrays.StringArray(values[codes]), name=name)
+    return pd.DataFrame(columns)
+
+
+def write_cache(source: str, key: str, frames: Dict[str, pd.DataFrame]):
+    """
+    Write tables to the cache of a source, replacing the cache files of other keys.
+
+    The files are written with `write_ipc`, so they can be memory-mapped.
+
+    Args:
+    ----
+    source (str): Path to a file or directory.
+    key (str): Cache key of the source.
+    frames (Dict[str, pandas.DataFrame]): Dataframes by table name.
+
+    Returns:
+    -------
+    None
+    """
+    for table, df in frames.items():
+        path = cache_path(source, key, table)
+        for stale_path in glob.glob(cache_path(glob.escape(source), "*", table)):
+            if stale_path != path:
+                os.remove(stale_path)
+        write_ipc(df, path)
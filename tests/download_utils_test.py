@@ -0,0 +1,169 @@
+"""Tests for download_utils."""
+
+import gzip
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from monarch_qc_reports.download_utils import (
+    CHUNK_SIZE,
+    DOWNLOAD_DIR,
+    DOWNLOADED,
+    FAILED,
+    NOT_MODIFIED,
+    RESUMED,
+    download_file,
+    download_files,
+    file_sha256,
+    make_session,
+    open_stream,
+    read_validators,
+)
+from monarch_qc_reports.file_utils import read_kg, read_qc, write
+from tests.qc_utils_test import make_kg
+
+FILES = {"/kg.tar.gz": bytes(range(256)) * 1000, "/qc_report.yaml": b"nodes: []\n"}
+ETAG = '"v1"'
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    """Serves server.files with ETag validators and Range support, failing requests listed in server.failures."""
+
+    def log_message(self, *args):
+        """Keep the test output quiet."""
+        pass
+
+    def do_GET(self):
+        """Serve a file, a part of it or a failure."""
+        self.server.requests.append((self.path, dict(self.headers)))
+        if self.path not in self.server.files:
+            self.send_error(404)
+            return
+        failure = self.server.failures.pop(self.path, None)
+        if failure == "unavailable":
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = self.server.files[self.path]
+        offset = 0
+        if "Range" in self.headers and self.headers.get("If-Range") == ETAG:
+            offset = int(self.headers["Range"].split("=")[1].rstrip("-"))
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {offset}-{len(body) - 1}/{len(body)}")
+        else:
+            self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(body) - offset))
+        self.end_headers()
+        if failure == "truncated":
+            self.wfile.write(body[offset : offset + 200000])
+            self.close_connection = True
+            return
+        self.wfile.write(body[offset:])
+
+
+class TestDownload(unittest.TestCase):
+
+    """Test downloading files from a local server."""
+
+    def setUp(self):
+        """Start the server."""
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.requests = []
+        self.server.failures = {}
+        self.server.files = dict(FILES)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """Stop the server and remove the downloaded files."""
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def path(self, name):
+        """Get the download path of a file."""
+        return os.path.join(self.tmp.name, name)
+
+    def read(self, name):
+        """Read a downloaded file."""
+        with open(self.path(name), "rb") as fh:
+            return fh.read()
+
+    def test_download_files(self):
+        """Files are downloaded concurrently and not downloaded again while unchanged."""
+        downloads = {self.url + name: self.path(name[1:]) for name in FILES}
+        results = download_files(downloads, workers=2)
+        self.assertEqual(results, {url: DOWNLOADED for url in downloads})
+        for name, body in FILES.items():
+            self.assertEqual(self.read(name[1:]), body)
+
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), [DOWNLOAD_DIR, "kg.tar.gz", "qc_report.yaml"])
+
+        results = download_files(downloads, workers=2)
+        self.assertEqual(results, {url: NOT_MODIFIED for url in downloads})
+        self.assertEqual(self.server.requests[-1][1]["If-None-Match"], ETAG)
+
+    def test_resume(self):
+        """An interrupted download is resumed from the end of the partial file."""
+        self.server.failures["/kg.tar.gz"] = "truncated"
+        result = download_file(self.url + "/kg.tar.gz", self.path("kg.tar.gz"), backoff_factor=0)
+        self.assertEqual(result, RESUMED)
+        self.assertEqual(self.read("kg.tar.gz"), FILES["/kg.tar.gz"])
+        self.assertEqual(self.server.requests[-1][1]["Range"], f"bytes={3 * CHUNK_SIZE}-")
+        self.assertEqual(os.listdir(self.path(DOWNLOAD_DIR)), ["manifest.json"])
+        self.assertEqual(read_validators(self.path("kg.tar.gz")), {"ETag": ETAG})
+
+    def test_retry(self):
+        """A request the server cannot serve is retried."""
+        self.server.failures["/qc_report.yaml"] = "unavailable"
+        session = make_session(backoff_factor=0)
+        result = download_file(self.url + "/qc_report.yaml", self.path("qc_report.yaml"), session)
+        self.assertEqual(result, DOWNLOADED)
+        self.assertEqual(self.read("qc_report.yaml"), FILES["/qc_report.yaml"])
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_failed(self):
+        """A missing file is reported as failed and nothing is written."""
+        result = download_file(self.url + "/missing.tsv.gz", self.path("missing.tsv.gz"))
+        self.assertEqual(result, FAILED)
+        self.assertFalse(os.path.exists(self.path("missing.tsv.gz")))
+
+    def test_checksum(self):
+        """A file matching its checksum is kept and a mismatching download is discarded."""
+        url = self.url + "/qc_report.yaml"
+        download_file(url, self.path("qc_report.yaml"))
+        sha256 = file_sha256(self.path("qc_report.yaml"))
+        self.assertEqual(download_file(url, self.path("qc_report.yaml"), sha256=sha256), NOT_MODIFIED)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(download_file(url, self.path("other.yaml"), sha256="0" * 64), FAILED)
+        self.assertFalse(os.path.exists(self.path("other.yaml")))
+        self.assertEqual(read_validators(self.path("other.yaml"), partial=True), {})
+
+    def test_stream(self):
+        """A knowledge graph and qc files are parsed while they download, the same as from disk."""
+        write(make_kg(), "test_kg", self.tmp.name)
+        with open(self.path("test_kg.tar.gz"), "rb") as fh:
+            self.server.files["/test_kg.tar.gz"] = fh.read()
+        dangling_edges = make_kg().edges.iloc[[2]]
+        dangling_edges_file = dangling_edges.to_csv(sep="\t", index=False).encode()
+        self.server.files["/dangling-edges.tsv.gz"] = gzip.compress(dangling_edges_file)
+        session = make_session()
+
+        kg = read_kg(open_stream(self.url + "/test_kg.tar.gz", session))
+        pd.testing.assert_frame_equal(kg.edges, read_kg(self.path("test_kg.tar.gz")).edges)
+        qc = read_qc({"dangling-edges.tsv.gz": open_stream(self.url + "/dangling-edges.tsv.gz", session, True)})
+        self.assertEqual(qc.dangling_edges["id"].tolist(), dangling_edges["id"].tolist())
+        with self.assertRaises(ValueError):
+            read_kg(open_stream(self.url + "/test_kg.tar.gz", session), chunksize=2)
@@ -0,0 +1,299 @@
+"""Tests for file_utils."""
+
+import glob
+import importlib.util
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from monarch_qc_reports.file_utils import (
+    ENGINES,
+    TableChunks,
+    read_df,
+    read_kg,
+    read_qc,
+    read_tar_dfs,
+    write,
+    write_arrow,
+)
+from monarch_qc_reports.model.merged_kg import MergedKG, MergeQC, find_dangling_edges
+from monarch_qc_reports.qc_utils import create_chunked_qc_report, create_qc_report
+from monarch_qc_reports.report_io import dump_report, plain_report, read_report
+from monarch_qc_reports.table_cache import cache_key
+from tests.qc_utils_test import make_kg, make_qc
+
+
+class TestReadKG(unittest.TestCase):
+
+    """Test reading knowledge graphs."""
+
+    def setUp(self):
+        """Write the small knowledge graph to a tar archive."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        write(make_kg(), "test_kg", self.tmp_dir.name)
+        self.tar_path = f"{self.tmp_dir.name}/test_kg.tar.gz"
+
+    def tearDown(self):
+        """Remove the tar archive."""
+        self.tmp_dir.cleanup()
+
+    def test_read_tar(self):
+        """Nodes and edges are read back from the archive."""
+        kg = read_kg(self.tar_path)
+        pd.testing.assert_frame_equal(kg.nodes, make_kg().nodes)
+        pd.testing.assert_frame_equal(kg.edges, make_kg().edges)
+
+    def test_single_pass(self):
+        """Archives are read as a stream without listing or rewinding them."""
+        with mock.patch.object(tarfile.TarFile, "getmembers", side_effect=AssertionError("archive listed")):
+            kg = read_kg(self.tar_path)
+            pd.testing.assert_frame_equal(kg.edges, make_kg().edges)
+            chunks = read_kg(self.tar_path, chunksize=2).edges
+            pd.testing.assert_frame_equal(pd.concat(list(chunks), ignore_index=True), make_kg().edges)
+            with tarfile.open(self.tar_path, "r|gz") as tar:
+                [edges] = read_tar_dfs(tar, "_edges", None)
+            pd.testing.assert_frame_equal(edges, make_kg().edges)
+
+    @unittest.skipIf(importlib.util.find_spec("pyarrow") is None, "pyarrow is not installed")
+    def test_stream_fallback(self):
+        """A member the pyarrow engine cannot parse from the stream is read again with the C parser."""
+        edges_path = f"{self.tmp_dir.name}/test_kg_edges.tsv"
+        make_kg().edges.to_csv(edges_path, sep="\t", index=False)
+        with open(edges_path, "a") as edges_file:
+            edges_file.write("e5\tHP:1#comment\tfields\n")
+        make_kg().nodes.to_csv(f"{self.tmp_dir.name}/test_kg_nodes.tsv", sep="\t", index=False)
+        with tarfile.open(self.tar_path, "w:gz") as tar:
+            for name in ["test_kg_edges.tsv", "test_kg_nodes.tsv"]:
+                tar.add(f"{self.tmp_dir.name}/{name}", arcname=name)
+        kg = read_kg(self.tar_path, engine="pyarrow")
+        pd.testing.assert_frame_equal(kg.edges.astype("string"), read_kg(self.tar_path).edges)
+        self.assertEqual(kg.edges["subject"].tolist()[-1], "HP:1")
+
+    def test_column_projection(self):
+        """Only the columns used by the report are read unless all columns are asked for."""
+        nodes = make_kg().nodes.assign(name=pd.Series(["a", "b#c", "d", "e"], dtype="string"))
+        write(MergedKG(nodes, make_kg().edges), "test_kg", self.tmp_dir.name)
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                if engine == "pyarrow" and importlib.util.find_spec("pyarrow") is None:
+                    self.skipTest("pyarrow is not installed")
+                kg = read_kg(self.tar_path, engine=engine)
+                self.assertEqual(list(kg.nodes.columns), ["id", "category", "in_taxon", "provided_by"])
+                pd.testing.assert_frame_equal(kg.nodes.astype("string"), make_kg().nodes)
+                self.assertEqual(list(kg.edges.columns), list(make_kg().edges.columns))
+                all_columns = read_kg(self.tar_path, engine=engine, columns=None)
+                self.assertEqual(list(all_columns.nodes.columns), list(nodes.columns))
+        chunks = read_kg(self.tar_path, chunksize=2, columns=["subject", "object"]).edges
+        self.assertEqual([list(chunk.columns) for chunk in chunks], [["subject", "object"]] * 2)
+
+    def test_read_compact(self):
+        """A compact graph holds the values read from the archive as categoricals, but chunks are not compacted."""
+        kg = read_kg(self.tar_path, compact=True)
+        self.assertIsInstance(kg.edges["subject"].dtype, pd.CategoricalDtype)
+        self.assertIs(kg.edges["object"].cat.categories, kg.nodes["id"].cat.categories)
+        pd.testing.assert_frame_equal(kg.edges.astype("string"), make_kg().edges)
+        chunks = read_kg(self.tar_path, chunksize=2, compact=True).edges
+        self.assertEqual([chunk["subject"].dtype for chunk in chunks], [pd.StringDtype()] * 2)
+
+    def test_read_tar_chunks(self):
+        """Edges are read in chunks that add up to the whole edge table."""
+        kg = read_kg(self.tar_path, chunksize=3)
+        self.assertIsInstance(kg.edges, TableChunks)
+        chunks = list(kg.edges)
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 1])
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), make_kg().edges)
+        self.assertEqual(len(list(kg.edges)), 2)
+
+    def test_chunked_report(self):
+        """The chunked report is the same as the in memory report."""
+        chunked_kg = read_kg(self.tar_path, chunksize=1)
+        chunked_report = create_chunked_qc_report(chunked_kg, make_qc(make_kg()))
+        kg = make_kg()
+        report = create_qc_report(kg, make_qc(kg))
+        for section in ["nodes", "edges", "dangling_edges"]:
+            self.assertEqual(chunked_report[section].keys(), report[section].keys())
+        b_edges, chunked_b_edges = report["edges"][("b_edges",)], chunked_report["edges"][("b_edges",)]
+        for key in ["namespaces", "categories", "total_number", "missing", "predicates", "node_types"]:
+            self.assertEqual(chunked_b_edges[key], b_edges[key])
+        self.assertEqual(chunked_b_edges["missing_subject_namespaces"], ["HGNC"])
+
+    def test_chunked_dangling_edges(self):
+        """Dangling edges found in the edge chunks give the report of the dangling edges file."""
+        report = create_chunked_qc_report(read_kg(self.tar_path, chunksize=1), make_qc(make_kg()))
+        empty = pd.DataFrame([])
+        found = create_chunked_qc_report(read_kg(self.tar_path, chunksize=1), MergeQC(empty, empty))
+        self.assertEqual(plain_report(found), plain_report(report))
+
+    def test_chunked_duplicates(self):
+        """Duplicates found in the edge chunks give the report of the duplicates found in memory."""
+        kg = make_kg()
+        edges = pd.concat([kg.edges, kg.edges.iloc[[0, 2]].assign(provided_by="c_edges")], ignore_index=True)
+        write(MergedKG(kg.nodes, edges), "test_kg", self.tmp_dir.name)
+        found = create_chunked_qc_report(read_kg(self.tar_path, chunksize=2), MergeQC(None, None))
+        report = create_qc_report(MergedKG(kg.nodes, edges), MergeQC(None, None))
+        self.assertEqual(plain_report(found), plain_report(report))
+        self.assertEqual(found["duplicate_edges"][("c_edges",)]["total_number"], 2)
+        self.assertEqual(found["duplicate_edges"][("a_edges",)]["total_number"], 1)
+
+    def test_download_leftovers(self):
+        """Files next to the qc files that are not tsv files are not read and hidden files do not change the cache."""
+        qc_path = f"{self.tmp_dir.name}/qc"
+        dangling_edges_path = f"{qc_path}/test-kg-dangling-edges.tsv.gz"
+        make_kg().edges.iloc[[2]].to_csv(dangling_edges_path, sep="\t", index=False)
+        for leftover in [".headers.json", ".part"]:
+            with open(dangling_edges_path + leftover, "w") as fh:
+                fh.write('{"ETag": "v1"}\n')
+        names = sorted(os.listdir(qc_path))
+        for order in [names, names[::-1]]:
+            with self.subTest(order=order), mock.patch("os.listdir", return_value=order):
+                self.assertEqual(read_qc(qc_path).dangling_edges["id"].tolist(), ["e3"])
+        key = cache_key(qc_path)
+        os.makedirs(f"{qc_path}/.download")
+        with open(f"{qc_path}/.download/manifest.json", "w") as fh:
+            fh.write("{}\n")
+        self.assertEqual(cache_key(qc_path), key)
+
+    def test_qc_provided_by(self):
+        """The qc files keep their provided_by column, so the dangling edges read are the dangling edges found."""
+        kg = make_kg()
+        found = find_dangling_edges(kg.edges, kg.node_index).reset_index(drop=True)
+        found.to_csv(f"{self.tmp_dir.name}/qc/test-kg-dangling-edges.tsv.gz", sep="\t", index=False)
+        for cache in [False, True]:
+            with self.subTest(cache=cache):
+                if cache and importlib.util.find_spec("pyarrow") is None:
+                    self.skipTest("pyarrow is not installed")
+                qc = read_qc(f"{self.tmp_dir.name}/qc", cache=cache, columns=None)
+                pd.testing.assert_frame_equal(qc.dangling_edges, found)
+
+        report = create_qc_report(kg, qc)
+        found_report = create_qc_report(make_kg(), MergeQC(qc.duplicate_nodes, qc.duplicate_edges))
+        self.assertEqual(list(report["dangling_edges"]), [("b_edges",)])
+        self.assertEqual(plain_report(report), plain_report(found_report))
+        report_path = f"{self.tmp_dir.name}/qc_report.yaml"
+        dump_report(report, report_path)
+        self.assertEqual(read_report(report_path), plain_report(report))
+
+    @unittest.skipIf(importlib.util.find_spec("pyarrow") is None, "pyarrow is not installed")
+    def test_read_tar_pyarrow(self):
+        """The pyarrow engine reads the same values into Arrow-backed string columns."""
+        kg = read_kg(self.tar_path, engine="pyarrow")
+        self.assertEqual(kg.edges["subject"].dtype, pd.StringDtype("pyarrow"))
+        pd.testing.assert_frame_equal(kg.nodes.astype("string"), make_kg().nodes)
+        pd.testing.assert_frame_equal(kg.edges.astype("string"), make_kg().edges)
+        report = create_qc_report(kg, make_qc(kg))
+        self.assertEqual(report["nodes"], create_qc_report(make_kg(), make_qc(make_kg()))["nodes"])
+        self.assertEqual(report["edges"][("b_edges",)]["missing_subject_namespaces"], ["HGNC"])
+
+
+@unittest.skipIf(importlib.util.find_spec("pyarrow") is None, "pyarrow is not installed")
+class TestReadDFEngines(unittest.TestCase):
+
+    """Test that the pyarrow engine parses like the C parser."""
+
+    def assert_same(self, data: bytes, columns=None):
+        """Read the data with both engines and compare."""
+        df = read_df(io.BytesIO(data), None, columns=columns)
+        arrow_df = read_df(io.BytesIO(data), None, engine="pyarrow", columns=columns)
+        pd.testing.assert_frame_equal(arrow_df.astype("string"), df)
+
+    def test_comments(self):
+        """Comment lines are skipped and values are cut at a "#"."""
+        self.assert_same(b"id\tname\tx\n#comment\na\tb#c\td\nq\t\tNA\nz\t#\ty\n")
+
+    def test_projected_comments(self):
+        """A "#" in a column that is not read cuts the columns read after it."""
+        data = b"id\tname\tx\ty\n#comment\na\tb#c\td\te\nf\tg\th\ti\n"
+        for columns in [["id", "x"], ["y"], ["name"], ["other"]]:
+            with self.subTest(columns=columns):
+                self.assert_same(data, columns)
+
+    def test_quotes(self):
+        """Quotes are kept as part of the values."""
+        self.assert_same(b'id\tname\n"a\tb "c"\n')
+
+    def test_fallback(self):
+        """Lines cut short by a comment are read with the C parser."""
+        self.assert_same(b"id\tname\tx\na\tb#\n")
+
+
+@unittest.skipIf(importlib.util.find_spec("pyarrow") is None, "pyarrow is not installed")
+class TestTableCache(unittest.TestCase):
+
+    """Test the columnar cache of read_kg and read_qc."""
+
+    def setUp(self):
+        """Write the small knowledge graph to a tar archive."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        write(make_kg(), "test_kg", self.tmp_dir.name)
+        self.tar_path = f"{self.tmp_dir.name}/test_kg.tar.gz"
+
+    def tearDown(self):
+        """Remove the tar archive and the cache."""
+        self.tmp_dir.cleanup()
+
+    def test_cached_kg(self):
+        """The first read writes the cache and later reads load the same tables from it."""
+        read_kg(self.tar_path, cache=True)
+        [nodes_cache] = glob.glob(f"{self.tar_path}.*.nodes.arrow")
+        for engine in ["c", "pyarrow"]:
+            kg = read_kg(self.tar_path, engine=engine, cache=True)
+            pd.testing.assert_frame_equal(kg.nodes, read_kg(self.tar_path, engine=engine).nodes)
+            pd.testing.assert_frame_equal(kg.edges, read_kg(self.tar_path, engine=engine).edges)
+
+        write(MergedKG(make_kg().nodes.iloc[:2], make_kg().edges), "test_kg", self.tmp_dir.name)
+        self.assertEqual(len(read_kg(self.tar_path, cache=True).nodes), 2)
+        self.assertNotIn(nodes_cache, glob.glob(f"{self.tar_path}.*.nodes.arrow"))
+
+    def test_rebuild_cache(self):
+        """Rebuilding reads the source again and replaces the cache."""
+        read_kg(self.tar_path, cache=True)
+        [edges_cache] = glob.glob(f"{self.tar_path}.*.edges.arrow")
+        with open(edges_cache, "wb"):
+            pass
+        kg = read_kg(self.tar_path, cache=True, rebuild_cache=True)
+        pd.testing.assert_frame_equal(kg.edges, make_kg().edges)
+        pd.testing.assert_frame_equal(read_kg(self.tar_path, cache=True).edges, make_kg().edges)
+
+    def test_cached_qc(self):
+        """QC tables of a directory are cached next to it, missing tables stay empty."""
+        qc_path = f"{self.tmp_dir.name}/qc"
+        make_kg().edges.iloc[[2]].to_csv(f"{qc_path}/test-kg-dangling-edges.tsv", sep="\t", index=False)
+        read_qc(qc_path, cache=True)
+        qc = read_qc(qc_path, cache=True)
+        self.assertEqual(len(glob.glob(f"{qc_path}.*.arrow")), 3)
+        pd.testing.assert_frame_equal(qc.dangling_edges, read_qc(qc_path).dangling_edges)
+        self.assertEqual(len(qc.duplicate_nodes), 0)
+        self.assertIsNone(read_qc(qc_path, dangling_edges=False).dangling_edges)
+        self.assertIsNone(read_qc(qc_path, cache=True, dangling_edges=False).dangling_edges)
+        qc = read_qc(qc_path, cache=True, duplicates=False)
+        self.assertIsNone(qc.duplicate_nodes)
+        self.assertIsNone(qc.duplicate_edges)
+        self.assertEqual(len(qc.dangling_edges), 1)
+
+
+@unittest.skipIf(importlib.util.find_spec("pyarrow") is None, "pyarrow is not installed")
+class TestMappedKG(unittest.TestCase):
+
+    """Test memory-mapped knowledge graphs."""
+
+    def test_from_ipc(self):
+        """A memory-mapped knowledge graph gives the same report as the in memory one."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            write_arrow(make_kg(), "test_kg", tmp_dir)
+            kg = MergedKG.from_ipc(f"{tmp_dir}/test_kg_nodes.arrow", f"{tmp_dir}/test_kg_edges.arrow")
+            self.assertEqual(kg.edges["subject"].dtype, pd.StringDtype("pyarrow"))
+            pd.testing.assert_frame_equal(kg.edges.astype("string"), make_kg().edges)
+            self.assertEqual(kg.node_index.codes(kg.edges["object"]).tolist(), [2, 3, -1, 3])
+
+            qc = MergeQC.from_ipc(dangling_edges_path=f"{tmp_dir}/test_kg_edges.arrow")
+            self.assertEqual(len(qc.duplicate_nodes), 0)
+            report = create_qc_report(kg, qc)
+            expected = create_qc_report(make_kg(), MergeQC(pd.DataFrame([]), pd.DataFrame([]), make_kg().edges))
+            self.assertEqual(report["nodes"], expected["nodes"])
+            for key in ["namespaces", "total_number", "missing", "predicates", "node_types"]:
+                self.assertEqual(report["dangling_edges"][("b_edges",)][key], expected["edges"][("b_edges",)][key])
@@ -0,0 +1,150 @@
+"""Tests for profiling."""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from click.testing import CliRunner
+
+from monarch_qc_reports import profiling
+from monarch_qc_reports.cli import main
+from monarch_qc_reports.file_utils import read_kg
+from monarch_qc_reports.profiling import NULL_STAGE, Measurement, Profiler, memory_usage, profile_path
+from monarch_qc_reports.qc_utils import create_qc_report
+from monarch_qc_reports.synthetic_kg import make_kg, write_kg
+from tests.qc_utils_test import make_kg as make_small_kg
+from tests.qc_utils_test import make_qc
+
+
+def allocate(megabytes: int):
+    """Allocate and touch memory, then free it."""
+    data = bytearray(megabytes * 1024**2)
+    data[::4096] = b"x" * len(data[::4096])
+    del data
+
+
+class TestMeasurement(unittest.TestCase):
+
+    """Test Measurement."""
+
+    def test_measurement(self):
+        """The peak memory covers memory allocated and freed while measuring."""
+        with Measurement() as measurement:
+            allocate(64)
+        self.assertGreater(measurement.seconds, 0)
+        self.assertLessEqual(measurement.peak_memory, memory_usage()[1])
+        if measurement.exact:
+            self.assertGreater(measurement.memory_increase, 32 * 1024**2)
+
+    def test_unknown_memory(self):
+        """Without /proc and the resource module, as on Windows, stages are timed and their memory is not known."""
+        with mock.patch.object(profiling, "PROC_STATUS", "/nonexistent/status"), mock.patch.dict(
+            "sys.modules", {"resource": None}
+        ):
+            self.assertEqual(memory_usage(), (None, None))
+            with Profiler() as profiler:
+                with profiling.stage("read"):
+                    with profiling.stage("parse"):
+                        allocate(1)
+        self.assertEqual([record["rss_peak_mb"] for record in profiler.report()["stages"]], [None, None])
+        self.assertIn("  parse", profiler.summary())
+
+
+class TestProfiler(unittest.TestCase):
+
+    """Test Profiler and stage."""
+
+    def test_inactive(self):
+        """Stages record nothing without an active profiler."""
+        self.assertIs(profiling.stage("read_kg"), NULL_STAGE)
+        self.assertIs(profiling.timed("decompress_seconds"), NULL_STAGE)
+        with profiling.stage("read_kg") as read_stage:
+            read_stage.add_rows(3)
+
+    def test_nested_stages(self):
+        """Nested stages have paths, rows and counters, and their peaks are passed on to the enclosing stage."""
+        with Profiler() as profiler:
+            with profiling.stage("read") as read_stage:
+                with profiling.stage("parse") as parse_stage:
+                    allocate(64)
+                    parse_stage.add_rows(2)
+                    parse_stage.add_rows(3)
+                    with profiling.timed("decompress_seconds"):
+                        pass
+                with profiling.stage("convert"):
+                    pass
+        self.assertIsNone(profiling._profiler)
+        report = profiler.report()
+        self.assertEqual([record["stage"] for record in report["stages"]], ["read", "read/parse", "read/convert"])
+        self.assertEqual([record["depth"] for record in report["stages"]], [0, 1, 1])
+        self.assertEqual(report["stages"][1]["rows"], 5)
+        self.assertIn("decompress_seconds", report["stages"][1])
+        self.assertGreaterEqual(read_stage.measurement.peak_memory, parse_stage.measurement.peak_memory)
+        if profiler.exact:
+            self.assertGreater(read_stage.measurement.memory_increase, 32 * 1024**2)
+        self.assertIn("  parse", profiler.summary())
+
+    def test_trace_malloc(self):
+        """Python allocations are measured with tracemalloc if asked for."""
+        with Profiler(trace_malloc=True) as profiler, profiling.stage("allocate"):
+            allocate(16)
+        self.assertGreater(profiler.report()["stages"][0]["traced_increase_mb"], 8)
+
+    def test_report_sections(self):
+        """The sections of create_qc_report are stages with the rows of their tables."""
+        kg = make_small_kg()
+        with Profiler() as profiler, profiling.stage("create_qc_report"):
+            create_qc_report(kg, make_qc(kg))
+        rows = {record["stage"]: record["rows"] for record in profiler.report()["stages"]}
+        self.assertEqual(rows["create_qc_report/edges"], len(kg.edges))
+        self.assertEqual(rows["create_qc_report/nodes"], len(kg.nodes))
+
+    def test_read_kg(self):
+        """Reading a tar archive records the rows of each file and the time spent decompressing it."""
+        kg, qc = make_kg(nodes=100, edges=500)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            kg_path, _ = write_kg(kg, qc, tmp_dir)
+            with Profiler() as profiler, profiling.stage("read_kg"):
+                read_kg(kg_path)
+        records = {record["stage"]: record for record in profiler.report()["stages"]}
+        self.assertEqual(records["read_kg/read_df synthetic-kg_edges.tsv"]["rows"], len(kg.edges))
+        self.assertIn("decompress_seconds", records["read_kg/read_df synthetic-kg_nodes.tsv"])
+
+    def test_cprofile_stage(self):
+        """The chosen stage is run under cProfile and its statistics are written next to the profile."""
+        with Profiler(cprofile_stage="edges") as profiler, profiling.stage("create_qc_report"):
+            kg = make_small_kg()
+            create_qc_report(kg, make_qc(kg))
+        self.assertIn("cProfile of edges", profiler.summary())
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = profile_path(os.path.join(tmp_dir, "qc_report.yaml"))
+            profiler.write(path)
+            self.assertTrue(os.path.exists(os.path.join(tmp_dir, "qc_report.profile.pstats")))
+            with open(path) as profile_file:
+                self.assertEqual(json.load(profile_file)["cprofile_stage"], "edges")
+
+    def test_run_profile(self):
+        """The run command with --profile prints the stages and writes them next to the report."""
+        kg, qc = make_kg(nodes=100, edges=500)
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            try:
+                write_kg(kg, qc, "kg_data", name="monarch-kg")
+                with mock.patch("monarch_qc_reports.cli.fetch_kg_data", return_value="kg_data"):
+                    result = CliRunner().invoke(
+                        main, ["run", "--no-cache", "--no-report-cache", "--profile", "-f", "json"]
+                    )
+                self.assertEqual(result.exit_code, 0, result.output)
+                with open("output/qc_report.profile.json") as profile_file:
+                    stages = [record["stage"] for record in json.load(profile_file)["stages"]]
+            finally:
+                os.chdir(cwd)
+        self.assertEqual(
+            [stage for stage in stages if "/" not in stage],
+            ["fetch_kg_data", "read_kg", "read_qc", "create_qc_report", "dump_report"],
+        )
+        self.assertIn("create_qc_report/edges", stages)
+        self.assertIn("dump_report", result.output)
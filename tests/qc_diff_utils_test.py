@@ -0,0 +1,157 @@
+"""Tests for qc_diff_utils."""
+
+import copy
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from click.testing import CliRunner
+
+from monarch_qc_reports.cli import main
+from monarch_qc_reports.qc_diff_utils import ReportDiff, diff_list, diff_yaml, release_series
+from monarch_qc_reports.qc_utils import create_qc_report
+from monarch_qc_reports.report_io import dump_report, read_report, report_path
+from tests.qc_utils_test import make_kg, make_qc
+
+A_REPORT = {
+    "edges": [
+        {
+            "name": "a",
+            "total_number": 2,
+            "namespaces": ["HP", "MONDO"],
+            "predicates": {"p": {"uri": "p", "total_number": 1}},
+        },
+        {"name": "b", "total_number": 1, "namespaces": ["HP"]},
+    ],
+    "nodes": {"n": {"name": "n", "taxon": ["x"]}},
+}
+B_REPORT = {
+    "edges": [
+        {
+            "name": "a",
+            "total_number": 3,
+            "namespaces": ["HP", "HGNC"],
+            "predicates": {"p": {"uri": "p", "total_number": 1}, "q": {"uri": "q", "total_number": 4}},
+        },
+        {"name": "c", "total_number": 1, "namespaces": ["GO"]},
+    ],
+    "nodes": {"n": {"name": "n", "taxon": ["x"]}},
+}
+
+
+class TestDiffYaml(unittest.TestCase):
+
+    """Test diff_yaml."""
+
+    def test_differences(self):
+        """Only the differences are shown, marked with + for the first and - for the second report."""
+        self.assertEqual(
+            diff_yaml(A_REPORT, B_REPORT, False),
+            {
+                "edges": {
+                    "a": {
+                        "total_number": {"change": -1, "new": 2, "old": 3},
+                        "namespaces": ["+MONDO", "-HGNC"],
+                        "predicates": {"-q": {"-uri": "-q", "-total_number": "-4"}},
+                    },
+                    "+b": {"+total_number": "+1", "+namespaces": ["+HP"]},
+                    "-c": {"-total_number": "-1", "-namespaces": ["-GO"]},
+                }
+            },
+        )
+        self.assertEqual(diff_yaml(A_REPORT, A_REPORT, False), {})
+
+    def test_show_all(self):
+        """With show_all the unchanged values are shown too."""
+        self.assertEqual(
+            diff_yaml(A_REPORT, B_REPORT, True),
+            {
+                "edges": {
+                    "a": {
+                        "name": "a",
+                        "total_number": {"change": -1, "new": 2, "old": 3},
+                        "namespaces": ["HP", "+MONDO", "-HGNC"],
+                        "predicates": {
+                            "p": {"uri": "p", "total_number": 1},
+                            "-q": {"-uri": "-q", "-total_number": "-4"},
+                        },
+                    },
+                    "+b": {"+name": "b", "+total_number": "+1", "+namespaces": ["+HP"]},
+                    "-c": {"-name": "c", "-total_number": "-1", "-namespaces": ["-GO"]},
+                },
+                "nodes": {"n": {"name": "n", "taxon": ["x"]}},
+            },
+        )
+
+    def test_unchanged_subtrees(self):
+        """Equal subtrees are not walked unless all data is shown."""
+        changed = copy.deepcopy(A_REPORT)
+        changed["edges"][0]["total_number"] = 3
+        with mock.patch.object(ReportDiff, "diff_list", side_effect=AssertionError("walked")):
+            diff = diff_yaml(A_REPORT, changed, False)
+        self.assertEqual(diff, {"edges": {"a": {"total_number": {"change": -1, "new": 2, "old": 3}}, "b": {}}})
+        with self.assertRaises(AssertionError), mock.patch.object(ReportDiff, "diff_list", side_effect=AssertionError):
+            diff_yaml(A_REPORT, changed, True)
+
+    def test_invalid(self):
+        """Invalid arguments are rejected."""
+        with self.assertRaises(KeyError):
+            diff_yaml(A_REPORT, B_REPORT, "no")
+        with self.assertRaises(TypeError):
+            diff_yaml(A_REPORT, {"edges": {"a": {"name": "a", "total_number": "2"}}}, False)
+        with self.assertRaises(KeyError):
+            diff_list(["x"], ["y"], {"show_all": False})
+
+    def test_diff_functions(self):
+        """The diff_ functions report whether anything changed in the flags."""
+        flags = {"show_all": False, "change": False}
+        self.assertEqual(diff_list(["x", "y"], ["y", "z"], flags), ["+x", "-z"])
+        self.assertTrue(flags["change"])
+        self.assertEqual(diff_list(["x"], ["x"], flags), [])
+        self.assertFalse(flags["change"])
+
+
+class TestReleaseSeries(unittest.TestCase):
+
+    """Test release_series and the series command."""
+
+    def test_release_series(self):
+        """Counts are aligned by name and uri across releases, None where an entry is missing."""
+        self.assertEqual(
+            release_series({"r1": A_REPORT, "r2": B_REPORT, "r3": A_REPORT}),
+            {
+                "releases": ["r1", "r2", "r3"],
+                "series": {
+                    "edges": {
+                        "a": {
+                            "total_number": [2, 3, 2],
+                            "predicates": {"p": {"total_number": [1, 1, 1]}, "q": {"total_number": [None, 4, None]}},
+                        },
+                        "b": {"total_number": [1, None, 1]},
+                        "c": {"total_number": [None, 1, None]},
+                    },
+                    "nodes": {"n": {}},
+                },
+            },
+        )
+        with self.assertRaises(TypeError):
+            release_series({"r1": {"edges": {"a": {"missing": 1}}}, "r2": {"edges": {"a": {"missing": {"x": 1}}}}})
+
+    def test_series_command(self):
+        """The series command reads reports in any format and writes the series."""
+        kg = make_kg()
+        report = create_qc_report(kg, make_qc(kg))
+        kg.edges.loc[3, "predicate"] = "biolink:causes"
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = [os.path.join(tmp_dir, "a.yaml"), os.path.join(tmp_dir, "b.json")]
+            dump_report(report, paths[0], "yaml")
+            dump_report(create_qc_report(kg, make_qc(kg)), paths[1], "json")
+            output = os.path.join(tmp_dir, "series.yaml")
+            result = CliRunner().invoke(main, ["series", *paths, "-o", output, "-f", "json"])
+            self.assertEqual(result.exit_code, 0, result.output)
+            written = read_report(report_path(output, "json"))
+        self.assertEqual(written["releases"], paths)
+        predicates = written["series"]["edges"]["b_edges"]["predicates"]
+        self.assertEqual(predicates["biolink:related_to"]["total_number"], [1, None])
+        self.assertEqual(predicates["biolink:causes"]["total_number"], [None, 1])
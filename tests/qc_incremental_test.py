@@ -0,0 +1,115 @@
+"""Tests for qc_incremental."""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+import yaml
+
+from monarch_qc_reports.model.merged_kg import MergedKG
+from monarch_qc_reports.qc_incremental import create_incremental_qc_report, fingerprints_path, load_report
+from monarch_qc_reports.qc_utils import create_edges_report, create_qc_report
+from tests.qc_utils_test import make_kg, make_qc
+
+
+def plain(value):
+    """Convert the series in a report to lists, so that reports can be compared."""
+    if isinstance(value, dict):
+        return {key: plain(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [plain(item) for item in value]
+    if isinstance(value, pd.Series):
+        return (value.name, str(value.dtype), value.tolist())
+    return value
+
+
+class TestIncrementalQCReport(unittest.TestCase):
+
+    """Test create_incremental_qc_report."""
+
+    def setUp(self):
+        """Create the report of the small knowledge graph as the previous release."""
+        kg = make_kg()
+        self.report, self.fingerprints = create_incremental_qc_report(kg, make_qc(kg))
+
+    def assert_same_as_full(self, kg, report):
+        """Check that an incremental report is the same as the full report."""
+        self.assertEqual(plain(report), plain(create_qc_report(kg, make_qc(kg))))
+
+    def edge_groups(self, kg):
+        """Create the incremental report and list the edge groups computed for each call."""
+        with mock.patch(
+            "monarch_qc_reports.qc_incremental.create_edges_report", side_effect=create_edges_report
+        ) as edges_report:
+            report, _ = create_incremental_qc_report(kg, make_qc(kg), self.report, self.fingerprints)
+        groups = [sorted(call.args[0]["provided_by"].unique()) for call in edges_report.call_args_list]
+        return report, groups
+
+    def test_unchanged(self):
+        """A release without changes is taken from the previous report."""
+        kg = make_kg()
+        self.assertEqual(yaml.dump(self.report), yaml.dump(create_qc_report(kg, make_qc(kg))))
+        report, groups = self.edge_groups(make_kg())
+        self.assertEqual(groups, [])
+        self.assert_same_as_full(make_kg(), report)
+
+    def test_graph_unchanged(self):
+        """The missing values of the nodes are filled for the report only, the graph keeps them."""
+        kg = make_kg()
+        create_incremental_qc_report(kg, make_qc(kg), self.report, self.fingerprints)
+        pd.testing.assert_frame_equal(kg.nodes, make_kg().nodes)
+
+    def test_changed_edges(self):
+        """Only the edge groups with changed edges are computed again."""
+        kg = make_kg()
+        kg.edges.loc[3, "predicate"] = "biolink:causes"
+        report, groups = self.edge_groups(kg)
+        self.assertEqual(groups, [["b_edges"]])
+        self.assert_same_as_full(kg, report)
+
+    def test_changed_node_ids(self):
+        """Adding a node id missing before computes the edge groups using it again."""
+        kg = make_kg()
+        hp_2 = pd.DataFrame(
+            {
+                "id": ["HP:2"],
+                "category": ["biolink:PhenotypicFeature"],
+                "in_taxon": [None],
+                "provided_by": ["hp_nodes"],
+            },
+            dtype="string",
+        )
+        kg = MergedKG(pd.concat([kg.nodes, hp_2], ignore_index=True), kg.edges)
+        report, groups = self.edge_groups(kg)
+        self.assertEqual(groups, [["b_edges"], ["b_edges"]])
+        self.assert_same_as_full(kg, report)
+
+        kg = make_kg()
+        kg.nodes.loc[0, "category"] = "biolink:Protein"
+        report, groups = self.edge_groups(kg)
+        self.assertEqual(groups, [["a_edges"]])
+        self.assert_same_as_full(kg, report)
+
+    def test_other_parameters(self):
+        """A report with other parameters is computed from scratch."""
+        kg = make_kg()
+        report, fingerprints = create_incremental_qc_report(kg, make_qc(kg), self.report, self.fingerprints, list)
+        self.assertEqual(fingerprints["data_type"], "list")
+        self.assertEqual(yaml.dump(report), yaml.dump(create_qc_report(kg, make_qc(kg), list)))
+
+    def test_load_report(self):
+        """A report loaded from the files written by run is spliced into the same report."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            report_path = os.path.join(tmp_dir, "qc_report.yaml")
+            with open(report_path, "w") as report_file:
+                yaml.dump(self.report, report_file)
+            with open(fingerprints_path(report_path), "w") as fingerprints_file:
+                json.dump(self.fingerprints, fingerprints_file)
+            previous_report, previous_fingerprints = load_report(report_path)
+        kg = make_kg()
+        kg.edges.loc[0, "object"] = "HP:1"
+        report, _ = create_incremental_qc_report(kg, make_qc(kg), previous_report, previous_fingerprints)
+        self.assertEqual(yaml.dump(report), yaml.dump(create_qc_report(kg, make_qc(kg))))
@@ -0,0 +1,59 @@
+"""Tests for qc_parallel."""
+
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from monarch_qc_reports.qc_parallel import create_parallel_qc_report, partition_groups
+from monarch_qc_reports.qc_utils import create_qc_report
+from monarch_qc_reports.report_io import dump_report
+from monarch_qc_reports.synthetic_kg import make_kg as make_synthetic_kg
+from tests.qc_utils_test import make_kg, make_qc
+
+
+class TestParallelQCReport(unittest.TestCase):
+
+    """Test create_parallel_qc_report."""
+
+    def test_partition_groups(self):
+        """Partitions hold whole groups in sorted order."""
+        df = pd.DataFrame({"provided_by": ["c", "a", "b", "a", "c", "c"]}, dtype="string")
+        partitions = partition_groups(df, "provided_by", 2)
+        self.assertEqual([df["provided_by"].iloc[rows].tolist() for rows in partitions], [["a", "a", "b"], ["c"] * 3])
+        self.assertEqual(len(partition_groups(df, "provided_by", 10)), 3)
+
+    def test_same_as_serial(self):
+        """The parallel report is the same as the serial report."""
+        for data_type in (dict, list):
+            kg = make_kg()
+            report = create_qc_report(kg, make_qc(kg), data_type)
+            parallel_report = create_parallel_qc_report(kg, make_qc(kg), data_type, workers=2)
+            self.assertEqual(list(parallel_report), list(report))
+            for section in ["nodes", "duplicate_nodes", "duplicate_edges"]:
+                self.assertEqual(parallel_report[section], report[section])
+            edges = report["edges"] if data_type is list else list(report["edges"].values())
+            parallel_edges = parallel_report["edges"] if data_type is list else list(parallel_report["edges"].values())
+            self.assertEqual(parallel_edges[0], edges[0])
+            for key in ["name", "total_number", "missing", "predicates", "node_types"]:
+                self.assertEqual(parallel_edges[1][key], edges[1][key])
+
+    def test_same_yaml(self):
+        """The parallel report is written as the same YAML file as the serial report, without aliases."""
+        reports = []
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for create in [create_qc_report, create_parallel_qc_report]:
+                kg, qc = make_synthetic_kg(nodes=300, edges=2000)
+                path = os.path.join(tmp_dir, f"{create.__name__}.yaml")
+                dump_report(create(kg, qc), path)
+                with open(path) as report_file:
+                    reports.append(report_file.read())
+        self.assertEqual(reports[1], reports[0])
+        self.assertNotIn("&id", reports[0])
+
+    def test_graph_unchanged(self):
+        """The missing values of the nodes are filled for the report only, the graph keeps them."""
+        kg = make_kg()
+        create_parallel_qc_report(kg, make_qc(kg), workers=2)
+        pd.testing.assert_frame_equal(kg.nodes, make_kg().nodes)
@@ -0,0 +1,369 @@
+"""Tests for qc_utils."""
+
+import io
+import unittest
+
+import pandas as pd
+
+from monarch_qc_reports.file_utils import read_df
+from monarch_qc_reports.model.merged_kg import (
+    EDGE_KEY_COLUMNS,
+    DuplicateFinder,
+    MergedKG,
+    MergeQC,
+    NodeIndex,
+    find_duplicates,
+)
+from monarch_qc_reports.qc_utils import (
+    NodeDegrees,
+    col_to_yaml,
+    cols_fill_na,
+    create_nodes_report,
+    create_qc_report,
+    get_difference,
+    get_intersection,
+    get_namespace,
+)
+from monarch_qc_reports.report_io import plain_report
+
+
+def make_kg() -> MergedKG:
+    """Create a small knowledge graph with two missing edge endpoints."""
+    nodes = pd.DataFrame(
+        {
+            "id": ["HGNC:1", "HGNC:2", "MONDO:1", "HP:1"],
+            "category": ["biolink:Gene", "biolink:Gene", "biolink:Disease", "biolink:PhenotypicFeature"],
+            "in_taxon": ["NCBITaxon:9606", "NCBITaxon:9606", None, None],
+            "provided_by": ["hgnc_nodes", "hgnc_nodes", "mondo_nodes", "hp_nodes"],
+        },
+        dtype="string",
+    )
+    edges = pd.DataFrame(
+        {
+            "id": ["e1", "e2", "e3", "e4"],
+            "subject": ["HGNC:1", "HGNC:2", "HGNC:3", "MONDO:1"],
+            "predicate": ["biolink:related_to", "biolink:has_phenotype", "biolink:has_phenotype", "biolink:related_to"],
+            "object": ["MONDO:1", "HP:1", "HP:2", "HP:1"],
+            "category": ["biolink:Association"] * 4,
+            "provided_by": ["a_edges", "a_edges", "b_edges", "b_edges"],
+        },
+        dtype="string",
+    )
+    return MergedKG(nodes, edges)
+
+
+# Duplicate files of the merge qc of the graph of TestDuplicates, with every row of each repeated id
+DUPLICATE_NODES_FILE = """id\tcategory\tin_taxon\tprovided_by
+HGNC:1\tbiolink:Gene\tNCBITaxon:9606\thgnc_nodes
+HGNC:1\tbiolink:Gene\tNCBITaxon:9606\tother_nodes
+"""
+DUPLICATE_EDGES_FILE = """id\tsubject\tpredicate\tobject\tcategory\tprovided_by
+e2\tHGNC:2\tbiolink:has_phenotype\tHP:1\tbiolink:Association\ta_edges
+e3\tHGNC:3\tbiolink:has_phenotype\tHP:2\tbiolink:Association\tb_edges
+e2\tHGNC:2\tbiolink:has_phenotype\tHP:1\tbiolink:Association\tc_edges
+e3\tHGNC:3\tbiolink:has_phenotype\tHP:2\tbiolink:Association\tc_edges
+"""
+
+
+def make_qc(kg: MergedKG) -> MergeQC:
+    """Create the merge qc tables for the small knowledge graph."""
+    empty = pd.DataFrame([])
+    return MergeQC(duplicate_nodes=empty, duplicate_edges=empty, dangling_edges=kg.edges.iloc[[2]])
+
+
+class TestNodeIndex(unittest.TestCase):
+
+    """Test NodeIndex."""
+
+    def test_matches_set_operations(self):
+        """NodeIndex results match get_difference and get_intersection."""
+        kg = make_kg()
+        for values in (kg.edges["subject"], kg.edges["object"].tolist()):
+            ids = kg.nodes["id"] if isinstance(values, pd.Series) else kg.nodes["id"].tolist()
+            if isinstance(values, pd.Series):
+                pd.testing.assert_series_equal(kg.node_index.difference(values), get_difference(values, ids))
+                pd.testing.assert_series_equal(kg.node_index.intersection(values), get_intersection(values, ids))
+            else:
+                self.assertEqual(kg.node_index.difference(values), get_difference(values, ids))
+                self.assertEqual(kg.node_index.intersection(values), get_intersection(values, ids))
+
+    def test_built_once(self):
+        """The node index is cached on the MergedKG."""
+        kg = make_kg()
+        self.assertIsInstance(kg.node_index, NodeIndex)
+        self.assertIs(kg.node_index, kg.node_index)
+        self.assertEqual(len(kg.node_index), 4)
+        self.assertIn("HP:1", kg.node_index)
+        self.assertNotIn("HP:2", kg.node_index)
+
+
+class TestNodeDegrees(unittest.TestCase):
+
+    """Test NodeDegrees."""
+
+    def test_degrees(self):
+        """Subject and object degrees are counted per group and over all edges, missing endpoints left out."""
+        kg = make_kg()
+        degrees = NodeDegrees(kg.node_index)
+        degrees.add(kg.edges.iloc[:3])
+        degrees.add(kg.edges.iloc[3:])
+        table = degrees.table.astype({"provided_by": "string"}).sort_values(["provided_by", "code"])
+        self.assertEqual(
+            table.values.tolist(),
+            [
+                ["a_edges", 0, 1, 0],
+                ["a_edges", 1, 1, 0],
+                ["a_edges", 2, 0, 1],
+                ["a_edges", 3, 0, 1],
+                ["b_edges", 2, 1, 0],
+                ["b_edges", 3, 0, 1],
+            ],
+        )
+        self.assertEqual(degrees.overall.tolist(), [[1, 1, 1, 0], [0, 0, 1, 2]])
+        overall = NodeDegrees(kg.node_index, group_by=None)
+        overall.add(kg.edges)
+        self.assertIsNone(overall.table)
+        self.assertEqual(overall.overall.tolist(), degrees.overall.tolist())
+
+    def test_node_rows(self):
+        """Every degree row is matched with all node rows of the same id."""
+        kg = make_kg()
+        degrees = NodeDegrees(kg.node_index)
+        degrees.add(kg.edges)
+        nodes = pd.concat([kg.nodes, kg.nodes.iloc[[3]]], ignore_index=True)
+        degree_rows, node_rows = degrees.node_rows(kg.node_index.codes(nodes["id"]))
+        # HP:1, listed twice, is used by both edge groups
+        self.assertEqual(len(degree_rows), len(degrees.table) + 2)
+        for degree_row, node_row in zip(degree_rows, node_rows, strict=True):
+            self.assertEqual(nodes["id"][node_row], kg.node_index.index[degrees.table["code"][degree_row]])
+
+    def test_nodes_report(self):
+        """The nodes report of nodes and edges counts the nodes not used as subject or object."""
+        kg = make_kg()
+        report = create_nodes_report(kg.nodes, kg.edges)
+        self.assertEqual(report[("hgnc_nodes",)]["missing_objects"], 2)
+        self.assertEqual(report[("hp_nodes",)]["missing_subjects"], 1)
+        self.assertNotIn("missing_subjects", report[("mondo_nodes",)])
+
+
+class TestDanglingEdges(unittest.TestCase):
+
+    """Test finding the dangling edges in the knowledge graph."""
+
+    def test_dangling_edges(self):
+        """The dangling edges are the edges with a subject or object that is not a node id."""
+        kg = make_kg()
+        pd.testing.assert_frame_equal(kg.dangling_edges(), kg.edges.iloc[[2]].reset_index(drop=True))
+        pd.testing.assert_frame_equal(kg.compact().dangling_edges().astype("string"), kg.dangling_edges())
+        empty = pd.DataFrame([])
+        qc = MergeQC(empty, empty)
+        self.assertIsNone(qc.dangling_edges)
+        pd.testing.assert_frame_equal(qc.complete(kg).dangling_edges, kg.dangling_edges())
+        complete = make_qc(kg)
+        self.assertIs(complete.complete(kg), complete)
+
+    def test_report(self):
+        """The report of the dangling edges found in the graph is the report of the dangling edges read."""
+        empty = pd.DataFrame([])
+        for kg in (make_kg(), make_kg().compact()):
+            report = create_qc_report(kg, MergeQC(empty, empty))
+            self.assertEqual(plain_report(report), plain_report(create_qc_report(kg, make_qc(kg))))
+
+
+class TestDuplicates(unittest.TestCase):
+
+    """Test finding the duplicate nodes and edges in the knowledge graph."""
+
+    def make_duplicated_kg(self) -> MergedKG:
+        """Create the small knowledge graph with a node and two edges repeated by other sources."""
+        kg = make_kg()
+        nodes = pd.concat([kg.nodes, kg.nodes.iloc[[0]].assign(provided_by="other_nodes")], ignore_index=True)
+        edges = pd.concat([kg.edges, kg.edges.iloc[[1, 2]].assign(provided_by="c_edges")], ignore_index=True)
+        return MergedKG(nodes.astype("string"), edges.astype("string"))
+
+    def test_duplicate_finder(self):
+        """Every row of a key repeated in the same or another chunk is a duplicate."""
+        kg = self.make_duplicated_kg()
+        finder = DuplicateFinder(["id"])
+        chunks = [kg.edges.iloc[:2], kg.edges.iloc[2:]]
+        self.assertEqual([len(chunk) for chunk in finder.scan(chunks)], [2, 4])
+        self.assertEqual(len(finder.seen), 4)
+        self.assertEqual(len(finder.repeated), 2)
+        duplicated = [finder.duplicated(chunk).tolist() for chunk in chunks]
+        self.assertEqual(duplicated, [[False, True], [True, False, True, True]])
+        self.assertEqual(finder.duplicated(kg.edges.iloc[:0]).tolist(), [])
+
+        expected = kg.edges[kg.edges.duplicated("id", keep=False)].reset_index(drop=True)
+        pd.testing.assert_frame_equal(find_duplicates(chunks, ["id"]), expected)
+        compact_duplicates = kg.compact().duplicate_edges()
+        pd.testing.assert_frame_equal(compact_duplicates.astype(object), kg.duplicate_edges().astype(object))
+        self.assertEqual(kg.duplicate_nodes()["provided_by"].tolist(), ["hgnc_nodes", "other_nodes"])
+        self.assertEqual(len(make_kg().duplicate_edges()), 0)
+
+    def test_merge_qc_format(self):
+        """The duplicates found are the tables of the duplicate files of the merge qc, all rows of a repeated id."""
+        kg = self.make_duplicated_kg()
+        duplicate_nodes = read_df(io.BytesIO(DUPLICATE_NODES_FILE.encode()), None)
+        pd.testing.assert_frame_equal(kg.duplicate_nodes(), duplicate_nodes)
+        duplicate_edges = read_df(io.BytesIO(DUPLICATE_EDGES_FILE.encode()), None)
+        pd.testing.assert_frame_equal(kg.duplicate_edges(), duplicate_edges)
+
+    def test_same_triple(self):
+        """Edges of the same triple under different ids are not duplicates, as in the merge qc."""
+        kg = make_kg()
+        edges = pd.concat([kg.edges, kg.edges.iloc[[0]].assign(id="e5", provided_by="c_edges")], ignore_index=True)
+        kg = MergedKG(kg.nodes, edges.astype("string"))
+        self.assertEqual(len(kg.duplicate_edges()), 0)
+        self.assertEqual(len(find_duplicates([edges.iloc[:3], edges.iloc[3:]], EDGE_KEY_COLUMNS)), 0)
+        self.assertEqual(create_qc_report(kg, MergeQC(None, None))["duplicate_edges"], {})
+
+    def test_report(self):
+        """The report of the duplicates found in the graph is the report of the same duplicates read."""
+        kg = self.make_duplicated_kg()
+        qc = MergeQC(kg.nodes.iloc[[0, 4]], kg.edges.iloc[[1, 2, 4, 5]], kg.edges.iloc[[2, 5]])
+        found = create_qc_report(kg, MergeQC(None, None))
+        self.assertEqual(plain_report(found), plain_report(create_qc_report(kg, qc)))
+        self.assertEqual(list(found["duplicate_edges"]), [("a_edges",), ("b_edges",), ("c_edges",)])
+        self.assertEqual(found["duplicate_nodes"][("hgnc_nodes",)]["total_number"], 1)
+
+
+class TestCompactKG(unittest.TestCase):
+
+    """Test MergedKG.compact."""
+
+    def test_dictionary(self):
+        """Node ids and edge endpoints share one dictionary of the node ids followed by the sorted missing ids."""
+        compact = make_kg().compact()
+        dictionary = compact.nodes["id"].cat.categories
+        self.assertEqual(dictionary.tolist(), ["HGNC:1", "HGNC:2", "MONDO:1", "HP:1", "HGNC:3", "HP:2"])
+        for col in ["subject", "object"]:
+            self.assertIs(compact.edges[col].cat.categories, dictionary)
+            self.assertEqual(compact.edges[col].tolist(), make_kg().edges[col].tolist())
+        self.assertEqual(
+            compact.edges["predicate"].cat.categories.tolist(), ["biolink:has_phenotype", "biolink:related_to"]
+        )
+        self.assertEqual(compact.nodes["in_taxon"].isna().tolist(), [False, False, True, True])
+        self.assertEqual(compact.edges["id"].dtype, make_kg().edges["id"].dtype)
+
+    def test_node_index(self):
+        """The node index of a compact graph gives the same results as the index of a string graph."""
+        kg, compact = make_kg(), make_kg().compact()
+        for col in ["subject", "object"]:
+            values = compact.edges[col]
+            self.assertEqual(compact.node_index.codes(values).tolist(), kg.node_index.codes(kg.edges[col]).tolist())
+            self.assertEqual(
+                compact.node_index.difference(values).tolist(), get_difference(kg.edges[col], kg.nodes["id"]).tolist()
+            )
+            other = values.cat.reorder_categories(values.cat.categories[::-1])
+            self.assertEqual(
+                compact.node_index.contains(other).tolist(), kg.node_index.contains(kg.edges[col]).tolist()
+            )
+
+    def test_fill_na(self):
+        """Missing values of a categorical column are filled with a new category."""
+        compact = make_kg().compact()
+        cols_fill_na(compact.nodes, {"in_taxon": "missing taxon"})
+        self.assertEqual(compact.nodes["in_taxon"].tolist()[2:], ["missing taxon", "missing taxon"])
+        self.assertEqual(compact.nodes["in_taxon"].cat.categories.tolist(), ["NCBITaxon:9606", "missing taxon"])
+
+    def test_same_report(self):
+        """The report of a compact graph is the report of the string graph."""
+        kg = make_kg()
+        compact = kg.compact()
+        self.assertEqual(
+            plain_report(create_qc_report(compact, make_qc(compact))), plain_report(create_qc_report(kg, make_qc(kg)))
+        )
+
+
+class TestNamespaces(unittest.TestCase):
+
+    """Test categorical namespaces."""
+
+    def test_cached_namespaces(self):
+        """Subject and object namespaces share categories and are computed once per table."""
+        kg = make_kg()
+        namespaces = kg.namespaces("edges")
+        self.assertIs(namespaces, kg.namespaces("edges"))
+        self.assertEqual(namespaces["subject"].tolist(), get_namespace(kg.edges["subject"]).tolist())
+        self.assertEqual(list(namespaces["object"].cat.categories), ["HGNC", "HP", "MONDO"])
+
+        kg.edges = kg.edges.iloc[:2]
+        self.assertEqual(len(kg.namespaces("edges")), 2)
+
+    def test_col_to_yaml_categorical(self):
+        """Categorical columns convert to the same yaml data as string columns."""
+        col = pd.Series(["b", "a", None, "b", "c"], dtype="string")
+        categorical = col.astype(pd.CategoricalDtype(pd.Index(["c", "b", "a"], dtype="string")))
+        self.assertEqual(col_to_yaml(categorical), col_to_yaml(col))
+
+
+class TestQCReport(unittest.TestCase):
+
+    """Test create_qc_report."""
+
+    def setUp(self):
+        """Create the report for the small knowledge graph."""
+        kg = make_kg()
+        self.report = create_qc_report(kg, make_qc(kg))
+
+    def test_edges(self):
+        """Edge groups count missing ids and namespaces."""
+        a_edges = self.report["edges"][("a_edges",)]
+        self.assertEqual(a_edges["namespaces"], ["HGNC", "HP", "MONDO"])
+        self.assertEqual(a_edges["total_number"], 2)
+        self.assertEqual(a_edges["missing"], 0)
+        self.assertNotIn("missing_subject_namespaces", a_edges)
+
+        b_edges = self.report["edges"][("b_edges",)]
+        self.assertEqual(b_edges["missing"], 2)
+        self.assertEqual(b_edges["missing_old"], 2)
+        self.assertEqual(b_edges["missing_subject_namespaces"], ["HGNC"])
+        self.assertEqual(b_edges["missing_object_namespaces"], ["HP"])
+
+    def test_predicates(self):
+        """Predicates count missing subjects and objects."""
+        predicates = self.report["edges"][("b_edges",)]["predicates"]
+        self.assertEqual(
+            predicates[("biolink:has_phenotype",)],
+            {
+                "uri": ("biolink:has_phenotype",),
+                "total_number": 1,
+                "missing_subjects": 1,
+                "missing_objects": 1,
+                "missing_subject_namespaces": ["HGNC"],
+                "missing_object_namespaces": ["HP"],
+            },
+        )
+        self.assertEqual(predicates[("biolink:related_to",)]["missing_subjects"], 0)
+
+    def test_node_types(self):
+        """Node types count nodes not used as subject or object."""
+        node_types = self.report["edges"][("a_edges",)]["node_types"]
+        self.assertEqual(
+            node_types[("hgnc_nodes",)],
+            {
+                "name": ("hgnc_nodes",),
+                "namespaces": ["HGNC"],
+                "categories": ["biolink:Gene"],
+                "total_number": 2,
+                "missing": 2,
+                "missing_objects": 2,
+                "missing_subjects": 0,
+                "taxon": ["NCBITaxon:9606"],
+            },
+        )
+        self.assertEqual(list(self.report["edges"][("b_edges",)]["node_types"]), [("hp_nodes",), ("mondo_nodes",)])
+
+    def test_nodes(self):
+        """Nodes are grouped with missing taxon filled in."""
+        self.assertEqual(self.report["nodes"][("hp_nodes",)]["taxon"], ["missing taxon"])
+        self.assertEqual(self.report["duplicate_nodes"], {})
+        self.assertEqual(self.report["duplicate_edges"], {})
+        self.assertEqual(list(self.report["dangling_edges"]), [("b_edges",)])
+
+    def test_list_data_type(self):
+        """A list report holds the same entries as a dict report."""
+        kg = make_kg()
+        report = create_qc_report(kg, make_qc(kg), data_type=list)
+        self.assertEqual([edge["name"] for edge in report["edges"]], [("a_edges",), ("b_edges",)])
+        self.assertEqual(report["edges"][0]["predicates"][0]["uri"], ("biolink:has_phenotype",))
@@ -0,0 +1,126 @@
+"""Tests for report_cache."""
+
+import glob
+import importlib.util
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+import yaml
+
+from monarch_qc_reports.model.merged_kg import MergedKG, MergeQC
+from monarch_qc_reports.qc_utils import create_chunked_qc_report, create_qc_report
+from monarch_qc_reports.report_cache import ReportCache, frame_hash
+from monarch_qc_reports.report_io import plain_report
+from tests.qc_utils_test import make_kg, make_qc
+
+
+class TestReportCache(unittest.TestCase):
+
+    """Test ReportCache."""
+
+    def setUp(self):
+        """Create an empty cache."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = ReportCache(self.tmp_dir.name)
+
+    def tearDown(self):
+        """Remove the cache."""
+        self.tmp_dir.cleanup()
+
+    def cached_sections(self):
+        """Count the cached sections."""
+        return len(glob.glob(f"{self.tmp_dir.name}/*.pickle"))
+
+    def test_cached_report(self):
+        """A repeated report is read from the cache, other parameters are computed again."""
+        kg = make_kg()
+        report = create_qc_report(kg, make_qc(kg), cache=self.cache)
+        self.assertEqual(self.cached_sections(), 5)
+        with mock.patch("monarch_qc_reports.qc_utils.create_edges_report", side_effect=AssertionError("computed")):
+            cached_report = create_qc_report(make_kg(), make_qc(kg), cache=self.cache)
+        self.assertEqual(yaml.dump(cached_report), yaml.dump(report))
+
+        create_qc_report(kg, make_qc(kg), list, cache=self.cache)
+        self.assertEqual(self.cached_sections(), 10)
+
+    def test_found_tables(self):
+        """The qc tables found in the graph are only found for the sections that are not in the cache."""
+        kg = make_kg()
+        report = create_qc_report(kg, MergeQC(None, None), cache=self.cache)
+        self.assertEqual(self.cached_sections(), 5)
+        with mock.patch.object(MergedKG, "dangling_edges", side_effect=AssertionError("found")), mock.patch.object(
+            MergedKG, "duplicate_nodes", side_effect=AssertionError("found")
+        ), mock.patch.object(MergedKG, "duplicate_edges", side_effect=AssertionError("found")):
+            cached_report = create_qc_report(make_kg(), MergeQC(None, None), cache=self.cache)
+        self.assertEqual(yaml.dump(cached_report), yaml.dump(report))
+
+        for path in glob.glob(f"{self.tmp_dir.name}/dangling_edges-*.pickle"):
+            os.remove(path)
+        with mock.patch.object(MergedKG, "duplicate_edges", side_effect=AssertionError("found")):
+            cached_report = create_qc_report(make_kg(), MergeQC(None, None), cache=self.cache)
+        self.assertEqual(yaml.dump(cached_report), yaml.dump(report))
+        read_report = create_qc_report(kg, MergeQC(kg.duplicate_nodes(), None, kg.dangling_edges()), cache=self.cache)
+        self.assertEqual(yaml.dump(read_report), yaml.dump(report))
+        self.assertEqual(self.cached_sections(), 7)
+
+    def test_found_missing_values(self):
+        """Duplicate nodes found in the graph keep their missing values, which the report fills like a read table."""
+
+        def make_duplicated_kg() -> MergedKG:
+            kg = make_kg()
+            return MergedKG(pd.concat([kg.nodes, kg.nodes.iloc[[2]]], ignore_index=True), kg.edges)
+
+        duplicate_nodes = make_duplicated_kg().duplicate_nodes()
+        self.assertTrue(duplicate_nodes["in_taxon"].isna().all())
+        expected = plain_report(create_qc_report(make_duplicated_kg(), MergeQC(duplicate_nodes, None)))
+        for report in [
+            create_qc_report(make_duplicated_kg(), MergeQC(None, None)),
+            create_qc_report(make_duplicated_kg(), MergeQC(None, None), cache=self.cache),
+            create_chunked_qc_report(make_duplicated_kg(), MergeQC(None, None)),
+        ]:
+            self.assertEqual(plain_report(report), expected)
+
+    def test_changed_data(self):
+        """Only the sections computed from changed tables are computed again."""
+        kg = make_kg()
+        create_qc_report(kg, make_qc(kg), cache=self.cache)
+        edges = kg.edges.copy()
+        edges.loc[0, "predicate"] = "biolink:causes"
+        changed_kg = MergedKG(kg.nodes, edges)
+        report = create_qc_report(changed_kg, make_qc(kg), cache=self.cache)
+        self.assertEqual(self.cached_sections(), 6)
+        self.assertEqual(yaml.dump(report), yaml.dump(create_qc_report(changed_kg, make_qc(kg))))
+
+    def test_eviction(self):
+        """The least recently used sections are evicted beyond the maximum size."""
+        self.cache.put("a", "x" * 100)
+        size = os.path.getsize(self.cache.path("a"))
+        self.cache.max_size = 2 * size
+        self.cache.put("b", "y" * 100)
+        os.utime(self.cache.path("a"), ns=(0, 0))
+        os.utime(self.cache.path("b"), ns=(1, 1))
+        self.assertEqual(self.cache.get("a"), "x" * 100)
+        self.cache.put("c", "z" * 100)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("a"), "x" * 100)
+
+        self.cache.clear()
+        self.assertEqual(self.cached_sections(), 0)
+        self.assertIsNone(self.cache.get("c"))
+
+    def test_frame_hash(self):
+        """Equal tables have the same hash and changed tables a different one."""
+        edges = make_kg().edges
+        self.assertEqual(frame_hash(edges), frame_hash(edges.copy()))
+        self.assertNotEqual(frame_hash(edges), frame_hash(edges.iloc[:3]))
+        self.assertNotEqual(frame_hash(edges), frame_hash(edges.rename(columns={"id": "edge_id"})))
+        self.assertEqual(frame_hash(pd.DataFrame([])), frame_hash(pd.DataFrame([])))
+        if importlib.util.find_spec("pyarrow") is not None:
+            arrow_edges = edges.astype(pd.StringDtype("pyarrow"))
+            self.assertEqual(frame_hash(arrow_edges), frame_hash(edges.astype(pd.StringDtype("pyarrow"))))
+            changed = arrow_edges.copy()
+            changed.loc[1, "object"] = "HP:3"
+            self.assertNotEqual(frame_hash(arrow_edges), frame_hash(changed))
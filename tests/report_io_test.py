@@ -0,0 +1,95 @@
+"""Tests for report_io."""
+
+import importlib.util
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import yaml
+
+from monarch_qc_reports.model.merged_kg import MergeQC
+from monarch_qc_reports.qc_diff_utils import diff_yaml
+from monarch_qc_reports.qc_utils import create_chunked_qc_report, create_qc_report
+from monarch_qc_reports.report_io import REPORT_FORMATS, dump_report, plain_report, read_report, report_path
+from monarch_qc_reports.synthetic_kg import make_kg as make_synthetic_kg
+from tests.qc_utils_test import make_kg, make_qc
+
+
+class TestReportIO(unittest.TestCase):
+
+    """Test dump_report and read_report."""
+
+    def setUp(self):
+        """Create the report of the small knowledge graph."""
+        kg = make_kg()
+        self.report = create_qc_report(kg, make_qc(kg))
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """Remove the written reports."""
+        self.tmp_dir.cleanup()
+
+    def dump(self, report_format, report=None):
+        """Write the report in a format and return its path."""
+        path = report_path(os.path.join(self.tmp_dir.name, "qc_report.yaml"), report_format)
+        dump_report(self.report if report is None else report, path, report_format)
+        return path
+
+    def test_formats(self):
+        """Every format is read back as the same plain report."""
+        plain = plain_report(self.report)
+        self.assertEqual(plain["edges"]["b_edges"]["name"], "b_edges")
+        self.assertEqual(plain["edges"]["b_edges"]["missing_subject_namespaces"], ["HGNC"])
+        predicates = plain["edges"]["b_edges"]["predicates"]
+        self.assertEqual(predicates["biolink:has_phenotype"]["uri"], "biolink:has_phenotype")
+        for report_format in REPORT_FORMATS:
+            if report_format == "msgpack" and importlib.util.find_spec("msgpack") is None:
+                continue
+            with self.subTest(report_format=report_format):
+                self.assertEqual(read_report(self.dump(report_format)), plain)
+        with mock.patch.dict("sys.modules", {"orjson": None}):
+            self.assertEqual(read_report(self.dump("json")), plain)
+
+    def test_found_duplicates(self):
+        """Reports of the duplicates found in a graph with missing taxa and endpoints are written in every format."""
+        for compact in [False, True]:
+            for create in [create_qc_report, create_chunked_qc_report]:
+                kg, _ = make_synthetic_kg(nodes=200, edges=1000)
+                report = create(kg.compact() if compact else kg, MergeQC(None, None))
+                taxa = [group["taxon"] for group in report["duplicate_nodes"].values()]
+                self.assertIn("missing taxon", sum(taxa, []))
+                for report_format in REPORT_FORMATS:
+                    if report_format == "msgpack" and importlib.util.find_spec("msgpack") is None:
+                        continue
+                    with self.subTest(compact=compact, create=create.__name__, report_format=report_format):
+                        self.assertEqual(read_report(self.dump(report_format, report)), plain_report(report))
+
+    def test_yaml(self):
+        """The YAML report is the report as yaml.dump writes it and a plain YAML report is read as is."""
+        with open(self.dump("yaml")) as report_file:
+            self.assertEqual(yaml.unsafe_load(report_file).keys(), self.report.keys())
+        plain = plain_report(self.report)
+        path = os.path.join(self.tmp_dir.name, "published.yml")
+        with open(path, "w") as report_file:
+            yaml.safe_dump(plain, report_file)
+        self.assertEqual(read_report(path), plain)
+
+    def test_diff(self):
+        """Reports read from different formats can be compared with diff_yaml."""
+        kg = make_kg()
+        kg.edges.loc[3, "predicate"] = "biolink:causes"
+        changed = read_report(self.dump("json", create_qc_report(kg, make_qc(kg))))
+        diff = diff_yaml(read_report(self.dump("yaml")), changed, False)
+        self.assertEqual(list(diff), ["edges"])
+        self.assertEqual(list(diff["edges"]["b_edges"]["predicates"]), ["+biolink:related_to", "-biolink:causes"])
+        self.assertEqual(diff_yaml(changed, changed, False), {})
+
+    def test_unknown_format(self):
+        """Unknown formats are rejected."""
+        with self.assertRaises(ValueError):
+            dump_report(self.report, os.path.join(self.tmp_dir.name, "qc_report.csv"), "csv")
+        with self.assertRaises(ValueError):
+            read_report(os.path.join(self.tmp_dir.name, "qc_report.csv"))
+        with mock.patch.dict("sys.modules", {"msgpack": None}), self.assertRaises(ImportError):
+            self.dump("msgpack")
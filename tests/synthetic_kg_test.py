@@ -0,0 +1,57 @@
+"""Tests for synthetic_kg."""
+
+import tempfile
+import unittest
+
+import pandas as pd
+
+from monarch_qc_reports.file_utils import read_kg, read_qc
+from monarch_qc_reports.qc_utils import create_qc_report
+from monarch_qc_reports.synthetic_kg import KG_LAYOUTS, make_kg, write_kg
+
+
+class TestSyntheticKG(unittest.TestCase):
+
+    """Test make_kg and write_kg."""
+
+    def test_make_kg(self):
+        """The graph has the requested size, dangling and duplicate rows, and depends only on the seed."""
+        kg, qc = make_kg(nodes=1000, edges=5000, sources=4, predicates=6, namespaces=3, seed=7)
+        self.assertEqual(len(kg.nodes), 1010)
+        self.assertEqual(len(kg.edges), 5050)
+        self.assertEqual(kg.nodes["id"].nunique(), 1000)
+        self.assertEqual(kg.edges["predicate"].nunique(), 6)
+        self.assertEqual(kg.edges["provided_by"].nunique(), 4)
+        self.assertEqual(kg.nodes["id"].str.split(":").str[0].nunique(), 3)
+        self.assertEqual(len(qc.duplicate_nodes), 20)
+        self.assertEqual(len(qc.duplicate_edges), 100)
+        self.assertEqual(qc.dangling_edges["id"].nunique(), 250)
+
+        ids = set(kg.nodes["id"])
+        dangling = ~kg.edges["subject"].isin(ids) | ~kg.edges["object"].isin(ids)
+        self.assertEqual(len(qc.dangling_edges), dangling.sum())
+        pd.testing.assert_frame_equal(kg.duplicate_nodes(), qc.duplicate_nodes)
+        pd.testing.assert_frame_equal(kg.duplicate_edges(), qc.duplicate_edges)
+
+        same_kg, same_qc = make_kg(nodes=1000, edges=5000, sources=4, predicates=6, namespaces=3, seed=7)
+        pd.testing.assert_frame_equal(kg.edges, same_kg.edges)
+        pd.testing.assert_frame_equal(qc.duplicate_nodes, same_qc.duplicate_nodes)
+        other_kg, _ = make_kg(nodes=1000, edges=5000, sources=4, predicates=6, namespaces=3, seed=8)
+        self.assertFalse(kg.edges.equals(other_kg.edges))
+
+    def test_write_kg(self):
+        """Both layouts are read back as the generated graph."""
+        kg, qc = make_kg(nodes=200, edges=1000, seed=1)
+        expected = create_qc_report(kg, qc)
+        for layout in KG_LAYOUTS:
+            with self.subTest(layout=layout), tempfile.TemporaryDirectory() as tmp_dir:
+                kg_path, qc_dir = write_kg(kg, qc, tmp_dir, layout=layout)
+                read = read_kg(kg_path)
+                pd.testing.assert_frame_equal(read.edges, kg.edges, check_dtype=False)
+                self.assertEqual(len(read.nodes), len(kg.nodes))
+                read_merge_qc = read_qc(qc_dir)
+                self.assertEqual(len(read_merge_qc.dangling_edges), len(qc.dangling_edges))
+                self.assertEqual(create_qc_report(read, qc).keys(), expected.keys())
+        with self.assertRaises(ValueError), tempfile.TemporaryDirectory() as tmp_dir:
+            write_kg(kg, qc, tmp_dir, layout="zip")
+